@@ -59,7 +59,6 @@ May 2022
 
 import os
 import numpy as np
-from scipy.fft import rfftfreq
 import matplotlib.pyplot as plt
 import time
 from datetime import datetime
@@ -69,7 +68,7 @@ from pyripherals.peripherals.DAC80508 import DAC80508
 from pyripherals.peripherals.ADS8686 import ADS8686
 from pyripherals.peripherals.AD7961 import AD7961
 from pyripherals.peripherals.AD5453 import AD5453
-from pyripherals.utils import calc_impedance, from_voltage, to_voltage, read_h5
+from pyripherals.utils import calc_impedance_at, from_voltage, read_h5, ChannelConverter
 
 
 # USER SET CONSTANTS
@@ -86,6 +85,7 @@ ADS8686_UPDATE_PERIOD = 1e-6    # Time (seconds) between ADS8686 voltage reads
 DAC80508_OUT_CHAN = 7                   # DAC80508 sine wave output channel
 ADS8686_A_CHAN = 7                      # ADS8686 input from side A reading DAC80508 output voltage
 ADS8686_B_CHAN = 3                      # ADS8686 input from side B reading unknown impedance voltage
+ads_converter = ChannelConverter(num_bits=16, voltage_range=10, signed=True)  # ADS8686 codes to volts
 
 
 # --- Set up FPGA, DDR3, DAC80508, ADS8686 ---
@@ -214,22 +214,15 @@ v_in_code = data_stream[input_side][initial_cutoff:]
 v_out_code = data_stream[output_side][initial_cutoff:]
 
 
-# --- Calculate impedance across frequencies ---
+# --- Calculate impedance at the input frequency ---
 # Convert back to voltage
-v_in_voltage = to_voltage(data=np.array(v_in_code, dtype=int), num_bits=16, voltage_range=10, use_twos_comp=True)
-v_out_voltage = to_voltage(data=np.array(v_out_code, dtype=int), num_bits=16, voltage_range=10, use_twos_comp=True)
-impedance_arr = calc_impedance(v_in=v_in_voltage, v_out=v_out_voltage, resistance=RESISTANCE)
-
-# --- Set up x frequencies ---
-x_freq = rfftfreq(len(v_in_voltage), ADS8686_UPDATE_PERIOD)
-
-# --- Find nearest x frequency to input frequency ---
-distances_from_actual = [abs(x - actual_freq) for x in x_freq]
-desired_index = distances_from_actual.index(min(distances_from_actual))
-frequency_found = x_freq[desired_index]
+v_in_voltage = ads_converter.to_voltage(np.asarray(v_in_code))
+v_out_voltage = ads_converter.to_voltage(np.asarray(v_out_code))
+# Only the frequency bin nearest to the input frequency is calculated
+z, frequency_found = calc_impedance_at(v_in=v_in_voltage, v_out=v_out_voltage, resistance=RESISTANCE,
+                                       freqs=actual_freq, fs=1 / ADS8686_UPDATE_PERIOD)
 
 # --- Print impedance at that frequency ---
-z = impedance_arr[desired_index]
 print(f'Impedance of {z} Ohms found at {frequency_found} Hz')
 print(f'Phasor Notation Impedance: {np.abs(z)}\N{ANGLE}{np.angle(z, deg=True)}\N{DEGREE SIGN}')
 
@@ -260,10 +253,8 @@ if PLOT:
         ddr_data_from_names = ddr.data_to_names(chan_data)
         adc_data, timestamp, dac_data, ads, ads_seq_cnt, read_check = ddr_data_from_names
         data_stream = ads
-        v_in = to_voltage(
-            data=np.array(data_stream['A'], dtype=int), num_bits=16, voltage_range=10, use_twos_comp=True)
-        v_out = to_voltage(
-            data=np.array(data_stream['B'], dtype=int), num_bits=16, voltage_range=10, use_twos_comp=True)
+        v_in = ads_converter.to_voltage(np.asarray(data_stream['A']))
+        v_out = ads_converter.to_voltage(np.asarray(data_stream['B']))
         x = [len(v_out) + j for j in range(len(v_out))]
         ax.plot(x, v_in, color='blue', scalex=True, scaley=False, label='v_in')
         ax.plot(x, v_out, color='red', scalex=True, scaley=False, label='v_out')
@@ -7,12 +7,24 @@ Abe Stroschein, ajstroschein@stthomas.edu
 Lucas Koerner, koer2434@stthomas.edu
 """
 
-import pandas as pd
+import numpy as np
+import io
 import os
+import re
 import sys
 import copy
+import pickle
+import time
+import json
 import yaml
-from .utils import gen_mask, str_bitfile_version
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections.abc import Mapping, MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from .utils import str_bitfile_version
+from .instrumentation import Instrumentation, InstrumentedFrontPanel
+from .trace import TraceRecorder
 from warnings import warn
 
 home_dir = os.path.join(os.path.expanduser('~'), '.pyripherals')
@@ -40,6 +52,12 @@ else:
     configs = DEFAULT_CONFIGS
 
 
+# `define NAME VALUE // key=value key=value ...
+_EP_DEFINE_RE = re.compile(r'^`define[ \t]+(\S+)[ \t]+(\S+)([^\n]*)', re.MULTILINE)
+DEFINES_CACHE_VERSION = 1
+REGISTERS_CACHE_VERSION = 1
+
+
 class Register:
     """Class for internal registers on a device.
 
@@ -55,8 +73,15 @@ class Register:
         Index of the LSB in the register.
     bit_width : int
         Width of the register in bits.
+    registers_cache_dir : str or None
+        Class attribute. Directory where the register maps read from Excel
+        workbooks are cached. None to not cache them on disk.
     """
 
+    registers_cache_dir = os.path.join(home_dir, 'cache')  # Where parsed register workbooks are cached, None to not cache
+    _workbooks = {}  # (absolute path, size, mtime) -> {sheet: rows}, workbooks already loaded by this process
+    _workbooks_lock = threading.Lock()
+
     def __init__(self, address, default, bit_index_high, bit_index_low, bit_width):
         self.address = address
         self.default = default
@@ -75,20 +100,489 @@ class Register:
 
     @staticmethod
     def get_chip_registers(sheet, workbook_path=configs['registers_path']):
-        """Return a dictionary of Registers from a page in an Excel spreadsheet."""
-
-        reg_dict = {}
-        sheet_data = pd.read_excel(workbook_path, sheet)
-        for row in range(len(sheet_data)):
-            row_data = sheet_data.iloc[row]
-            reg_dict[row_data['Name']] = Register(
-                address=int(row_data['Hex Address'], 16),
-                default=int(row_data['Default Value'], 16),
-                bit_width=int(row_data['Bit Width']),
-                bit_index_high=(None if row_data['Bit Index (High)'] == 'None' else int(
-                    row_data['Bit Index (High)'])),  # Bit Index of None means the register takes up the whole endpoint
-                bit_index_low=(None if row_data['Bit Index (Low)'] == 'None' else int(row_data['Bit Index (Low)'])))
-        return reg_dict
+        """Return a dictionary of Registers from a page in an Excel spreadsheet.
+
+        All sheets of the workbook are read at once and kept (see
+        _load_workbook), so later calls for other sheets do not read it again.
+        """
+
+        rows = Register._load_workbook(workbook_path).get(sheet)
+        if rows is None:
+            raise ValueError(f'Worksheet named \'{sheet}\' not found in "{workbook_path}"')
+        if isinstance(rows, Exception):
+            # The sheet could not be read as registers
+            raise rows
+        return {name: Register(address=address, default=default, bit_index_high=bit_index_high,
+                               bit_index_low=bit_index_low, bit_width=bit_width)
+                for name, address, default, bit_index_high, bit_index_low, bit_width in rows}
+
+    @staticmethod
+    def _parse_sheet(sheet_data):
+        """Return (name, address, default, bit_index_high, bit_index_low, bit_width) of each row of a sheet."""
+
+        rows = []
+        for name, address, default, bit_width, bit_index_high, bit_index_low in zip(
+                sheet_data['Name'], sheet_data['Hex Address'], sheet_data['Default Value'], sheet_data['Bit Width'],
+                sheet_data['Bit Index (High)'], sheet_data['Bit Index (Low)']):
+            rows.append((
+                name,
+                int(address, 16),
+                int(default, 16),
+                # Bit Index of None means the register takes up the whole endpoint
+                None if bit_index_high == 'None' else int(bit_index_high),
+                None if bit_index_low == 'None' else int(bit_index_low),
+                int(bit_width)))
+        return rows
+
+    @staticmethod
+    def _load_workbook(workbook_path):
+        """Return {sheet: rows} of every sheet in an Excel workbook of registers.
+
+        Rows are the tuples of _parse_sheet, or the exception raised parsing
+        the sheet if it is not a sheet of registers. The workbook is read once per
+        process, and the parsed sheets are cached in registers_cache_dir
+        keyed by the absolute path of the workbook and checked against its
+        size and SHA-256, so only the first process to read a new or edited
+        workbook needs pandas to parse it.
+        """
+
+        if workbook_path is None:
+            raise ValueError(f'No registers_path set in your {config_path} file')
+
+        abs_path = os.path.abspath(workbook_path)
+        stat = os.stat(abs_path)
+        memo_key = (abs_path, stat.st_size, stat.st_mtime_ns)
+        with Register._workbooks_lock:
+            sheets = Register._workbooks.get(memo_key)
+            if sheets is not None:
+                return sheets
+
+            with open(abs_path, 'rb') as file:
+                data = file.read()
+            digest = hashlib.sha256(data).hexdigest()
+
+            cache_path = None
+            if Register.registers_cache_dir is not None:
+                key = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()
+                cache_path = os.path.join(Register.registers_cache_dir, f'registers_{key}.pickle')
+                try:
+                    with open(cache_path, 'rb') as file:
+                        cached = pickle.load(file)
+                    if cached['version'] == REGISTERS_CACHE_VERSION and cached['path'] == abs_path \
+                            and cached['size'] == len(data) and cached['sha256'] == digest:
+                        sheets = cached['sheets']
+                except (OSError, EOFError, pickle.UnpicklingError, KeyError, TypeError, AttributeError):
+                    # No cache or unreadable cache, parse again
+                    pass
+
+            if sheets is None:
+                import pandas as pd
+                sheets = {}
+                for name, sheet_data in pd.read_excel(io.BytesIO(data), sheet_name=None).items():
+                    try:
+                        sheets[name] = Register._parse_sheet(sheet_data)
+                    except (KeyError, TypeError, ValueError) as e:
+                        sheets[name] = e
+
+                if cache_path is not None:
+                    try:
+                        os.makedirs(Register.registers_cache_dir, exist_ok=True)
+                        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+                        with open(tmp_path, 'wb') as file:
+                            pickle.dump({'version': REGISTERS_CACHE_VERSION, 'path': abs_path, 'size': len(data),
+                                         'sha256': digest, 'sheets': sheets}, file, protocol=pickle.HIGHEST_PROTOCOL)
+                        os.replace(tmp_path, cache_path)
+                    except OSError as e:
+                        print('Could not cache the register workbook:', e)
+
+            Register._workbooks[memo_key] = sheets
+            return sheets
+
+
+class ChipRegisters:
+    """Class attribute of the Registers of a chip, read on first access.
+
+    Use in a peripheral class as
+
+        registers = ChipRegisters('TCA9555')
+
+    The sheet is read with Register.get_chip_registers the first time the
+    attribute is accessed, so importing a peripheral does not read the
+    workbook. Loading happens once even if several threads access it at the
+    same time.
+
+    Attributes
+    ----------
+    sheet : str
+        Name of the sheet in the workbook.
+    workbook_path : str or None
+        Path of the workbook. None (default) for registers_path in
+        config.yaml at the time of the first access.
+    """
+
+    def __init__(self, sheet, workbook_path=None):
+        self.sheet = sheet
+        self.workbook_path = workbook_path
+        self._registers = None
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner=None):
+        registers = self._registers
+        if registers is None:
+            with self._lock:
+                if self._registers is None:
+                    workbook_path = configs['registers_path'] if self.workbook_path is None else self.workbook_path
+                    self._registers = Register.get_chip_registers(self.sheet, workbook_path)
+                registers = self._registers
+        return registers
+
+
+class RegisterMap:
+    """Pack and unpack many fields of a chip's Registers at once.
+
+    Registers with the same address are fields of one register word. A field
+    with bits past the end of its word continues in the words at the next
+    addresses (e.g. a 32 bit count in 4 byte-wide registers).
+
+    Example usage:
+        register_map = RegisterMap(DAC53401.registers, word_bytes=2)
+        words = register_map.pack({'REF_EN': 1, 'DAC_SPAN': 0b01})
+        for address, data in register_map.blocks(words):
+            ...  # one write of data starting at address
+
+    Attributes
+    ----------
+    registers : dict
+        Name-Register pairs of the fields.
+    word_bytes : int
+        Number of bytes in the register at each address.
+    byte_order : str
+        Order of the bytes of a word, or of a field across words, on the bus.
+        'big' for most significant byte first, 'little' for least
+        significant byte first.
+    names : list
+        Field names in the order of the arrays below.
+    address : numpy.ndarray
+        Address of the first word of each field.
+    shift : numpy.ndarray
+        Index of the LSB of each field in its words.
+    field_max : numpy.ndarray
+        Largest value of each field.
+    num_bytes : numpy.ndarray
+        Number of bytes in the words of each field, at most 8.
+    defaults : dict
+        address -> default word of every address used by the fields.
+    """
+
+    def __init__(self, registers, word_bytes=1, byte_order='big'):
+        self.registers = registers
+        self.word_bytes = word_bytes
+        self.byte_order = byte_order
+        self.names = list(registers)
+        self._rows = {name: i for i, name in enumerate(self.names)}
+
+        address, shift, width, num_words = [], [], [], []
+        for name, register in registers.items():
+            # Bit Index of None means the register takes up the whole word
+            low = 0 if register.bit_index_low is None else register.bit_index_low
+            high = low + register.bit_width - 1 if register.bit_index_high is None else register.bit_index_high
+            if (high // (8 * word_bytes) + 1) * word_bytes > 8:
+                # Fields are packed as 64 bit integers
+                raise ValueError(f'RegisterMap field {name} spans more than 8 bytes of words')
+            address.append(register.address)
+            shift.append(low)
+            width.append(high - low + 1)
+            num_words.append(high // (8 * word_bytes) + 1)
+        self.address = np.array(address, dtype=np.int64)
+        self.shift = np.array(shift, dtype=np.uint64)
+        self.field_max = np.array([(1 << w) - 1 for w in width], dtype=np.uint64)
+        self.num_bytes = np.array(num_words, dtype=np.int64) * word_bytes
+
+        # The first field at an address gives the default of its words
+        self.defaults = {}
+        for name, first, num_bytes in zip(self.names, address, self.num_bytes.tolist()):
+            data = registers[name].default.to_bytes(num_bytes, byte_order)
+            for address, word in self.words(data, first).items():
+                self.defaults.setdefault(address, word)
+
+    def _rows_of(self, names):
+        if names is None:
+            return np.arange(len(self.names))
+        return np.array([self._rows[name] for name in names], dtype=np.int64)
+
+    def _byte_positions(self, rows):
+        """Return the byte positions of fields, their byte significance, and a mask of used positions."""
+
+        num_bytes = self.num_bytes[rows][:, None]
+        significance = np.arange(8)
+        used = significance < num_bytes
+        if self.byte_order == 'big':
+            position = np.where(used, num_bytes - 1 - significance, 0)
+        else:
+            position = np.where(used, significance, 0)
+        return self.address[rows][:, None] * self.word_bytes + position, significance, used
+
+    def addresses(self, names=None):
+        """Return the sorted addresses of the words holding the named fields (default all)."""
+
+        rows = self._rows_of(names)
+        positions, _, used = self._byte_positions(rows)
+        return np.unique(positions[used] // self.word_bytes).tolist()
+
+    @staticmethod
+    def ranges(addresses, max_words=None):
+        """Return (start_address, number_of_words) of each run of contiguous addresses.
+
+        max_words limits the words in a run, e.g. 1 for chips that do not
+        advance the register address during a transfer.
+        """
+
+        ranges = []
+        for address in sorted(addresses):
+            if ranges and ranges[-1][0] + ranges[-1][1] == address \
+                    and (max_words is None or ranges[-1][1] < max_words):
+                ranges[-1][1] += 1
+            else:
+                ranges.append([address, 1])
+        return [tuple(r) for r in ranges]
+
+    def words(self, data, start_address):
+        """Return {address: word} of a block of raw register bytes starting at start_address."""
+
+        data = bytes(data)
+        return {start_address + i: int.from_bytes(data[i * self.word_bytes:(i + 1) * self.word_bytes], self.byte_order)
+                for i in range(len(data) // self.word_bytes)}
+
+    def blocks(self, words, max_words=None):
+        """Return (start_address, bytes) of each run of contiguous addresses in {address: word}."""
+
+        return [(start, b''.join(words[address].to_bytes(self.word_bytes, self.byte_order)
+                                 for address in range(start, start + count)))
+                for start, count in self.ranges(words, max_words)]
+
+    def pack(self, values, words=None):
+        """Return the register words with new values for several fields.
+
+        Parameters
+        ----------
+        values : dict
+            Field name -> new value. Values are masked to the field width.
+        words : dict
+            address -> current word, e.g. read from the chip. Addresses not
+            in words start from defaults.
+
+        Returns
+        -------
+        dict
+            address -> new word of only the addresses the fields use.
+        """
+
+        if not values:
+            return {}
+        rows = self._rows_of(values)
+        values = np.array([int(v) for v in values.values()], dtype=np.uint64)
+        shift = self.shift[rows]
+        bits = (values & self.field_max[rows]) << shift
+        masks = self.field_max[rows] << shift
+
+        # Combine the bytes of all fields at each byte position
+        positions, significance, used = self._byte_positions(rows)
+        byte_shift = (8 * significance).astype(np.uint64)
+        positions = positions[used]
+        byte_bits = ((bits[:, None] >> byte_shift) & np.uint64(0xff))[used].astype(np.uint8)
+        byte_masks = ((masks[:, None] >> byte_shift) & np.uint64(0xff))[used].astype(np.uint8)
+        positions, inverse = np.unique(positions, return_inverse=True)
+        new_bits = np.zeros(len(positions), dtype=np.uint8)
+        new_masks = np.zeros(len(positions), dtype=np.uint8)
+        np.bitwise_or.at(new_bits, inverse, byte_bits)
+        np.bitwise_or.at(new_masks, inverse, byte_masks)
+
+        # Apply them to the current bytes of the words they are in
+        addresses = np.unique(positions // self.word_bytes).tolist()
+        current = {} if words is None else words
+        image = np.frombuffer(b''.join(current.get(address, self.defaults.get(address, 0)).to_bytes(
+            self.word_bytes, self.byte_order) for address in addresses), dtype=np.uint8).copy()
+        offset = np.searchsorted(addresses, positions // self.word_bytes) * self.word_bytes \
+            + positions % self.word_bytes
+        image[offset] = (image[offset] & ~new_masks) | new_bits
+        return dict(zip(addresses, self.words(image.tobytes(), 0).values()))
+
+    def unpack(self, data, start_address, names=None):
+        """Return {name: value} of the fields in a block of raw register bytes.
+
+        Parameters
+        ----------
+        data : bytes or list
+            Register bytes read starting at start_address.
+        start_address : int
+            Address of the first word in data.
+        names : list
+            Fields to return, default all. Fields not entirely in data are
+            left out.
+        """
+
+        buffer = np.frombuffer(bytes(data), dtype=np.uint8)
+        rows = self._rows_of(names)
+        positions, significance, used = self._byte_positions(rows)
+        offset = self.address[rows] * self.word_bytes - start_address * self.word_bytes
+        inside = (offset >= 0) & (offset + self.num_bytes[rows] <= len(buffer))
+        rows, positions, used = rows[inside], positions[inside], used[inside]
+        if len(rows) == 0:
+            return {}
+
+        positions = positions - start_address * self.word_bytes
+        field_bytes = np.where(used, buffer[np.where(used, positions, 0)], 0).astype(np.uint64)
+        words = np.bitwise_or.reduce(field_bytes << (8 * significance).astype(np.uint64), axis=1)
+        values = (words >> self.shift[rows]) & self.field_max[rows]
+        return {self.names[row]: value for row, value in zip(rows.tolist(), values.tolist())}
+
+    def decode(self, words, names=None):
+        """Return {name: value} of the fields in {address: word}."""
+
+        values = {}
+        for start, data in self.blocks(words):
+            values.update(self.unpack(data, start, names))
+        if names is not None:
+            return {name: values[name] for name in names if name in values}
+        return values
+
+
+class ChipRegisterMap:
+    """Class attribute of a RegisterMap of a class's registers, made on first access.
+
+    Use in a peripheral class after its registers as
+
+        register_map = ChipRegisterMap(word_bytes=2)
+
+    The map is made from the registers attribute of the class it is accessed
+    through and made again if that attribute changes.
+
+    Attributes
+    ----------
+    word_bytes : int
+        See RegisterMap.
+    byte_order : str
+        See RegisterMap.
+    """
+
+    def __init__(self, word_bytes=1, byte_order='big'):
+        self.word_bytes = word_bytes
+        self.byte_order = byte_order
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner=None):
+        if owner is None:
+            owner = type(instance)
+        registers = owner.registers
+        cached = self._maps.get(owner)
+        if cached is None or cached[0] is not registers:
+            with self._lock:
+                cached = self._maps.get(owner)
+                if cached is None or cached[0] is not registers:
+                    cached = self._maps[owner] = (registers, RegisterMap(registers, self.word_bytes, self.byte_order))
+        return cached[1]
+
+
+class EndpointIndex:
+    """Reverse index from endpoint bits to the Endpoints that use them.
+
+    Built by Endpoint.update_endpoints_from_defines for the groups of
+    Endpoint.endpoints_from_defines. When a group is advanced (by
+    Endpoint.advance_endpoints or EndpointTable.advance) the positions of the
+    new instance are added, so chips made from the group are also found.
+
+    Attributes
+    ----------
+    slots : dict
+        (address, bit) -> list of (group, name, instance). bit is None for
+        Endpoints that only define an address.
+    groups : dict
+        id of each tracked group dictionary -> [group, dictionary, instance],
+        where instance is the number of times the dictionary was advanced.
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self.groups = {}
+
+    def clear(self):
+        """Remove all entries and tracked groups."""
+
+        self.slots = {}
+        self.groups = {}
+
+    def add(self, group, name, instance, address, bit_index_low, bit_width):
+        """Add the bits of one Endpoint position to the index."""
+
+        entry = (group, name, instance)
+        if bit_index_low is None:
+            keys = [(address, None)]
+        else:
+            keys = [(address, bit) for bit in range(bit_index_low, bit_index_low + max(bit_width, 1))]
+        for key in keys:
+            entries = self.slots.get(key)
+            if entries is None:
+                self.slots[key] = [entry]
+            elif entry not in entries:
+                entries.append(entry)
+
+    def track(self, group, endpoints, instance=0):
+        """Add a group dictionary and follow it when it is advanced."""
+
+        self.groups[id(endpoints)] = [group, endpoints, instance]
+        for name, ep in endpoints.items():
+            self.add(group, name, instance, ep.address, ep.bit_index_low, ep.bit_width)
+
+    def tracked(self, endpoints):
+        """Return (group, instance) of a tracked dictionary, or None."""
+
+        tracked = self.groups.get(id(endpoints))
+        if tracked is None or tracked[1] is not endpoints:
+            return None
+        return tracked[0], tracked[2]
+
+    def advanced(self, endpoints, advance_num=1):
+        """Add the positions of a tracked dictionary after it was advanced."""
+
+        tracked = self.groups.get(id(endpoints))
+        if tracked is None or tracked[1] is not endpoints:
+            return
+        tracked[2] += advance_num
+        for name, ep in endpoints.items():
+            self.add(tracked[0], name, tracked[2], ep.address, ep.bit_index_low, ep.bit_width)
+
+    def lookup(self, address, mask=None):
+        """Return the (group, name, instance) of the Endpoints using address and mask.
+
+        Parameters
+        ----------
+        address : int
+            Endpoint address, e.g. from a debug print or a trace.
+        mask : int or None
+            Bits of the address. None for the Endpoints that only define the
+            address (pipes and whole wires).
+
+        Returns
+        -------
+        list
+            (group, name, instance) of each Endpoint using any bit in mask,
+            in order of bit.
+        """
+
+        if mask is None:
+            return list(self.slots.get((address, None), []))
+
+        found = []
+        bit = 0
+        while mask:
+            if mask & 1:
+                for entry in self.slots.get((address, bit), ()):
+                    if entry not in found:
+                        found.append(entry)
+            mask >>= 1
+            bit += 1
+        return found
 
 
 class Endpoint:
@@ -96,6 +590,9 @@ class Endpoint:
 
     Attributes
     ----------
+    defines_cache_dir : str or None
+        Class attribute. Directory where update_endpoints_from_defines caches
+        each parsed ep_defines.v. None to always parse.
     endpoints_from_defines : dict
         Class attribute. Dictionary of each group of endpoints paired with inner dictionaries
         of endpoint names to Endpoint objects, starts empty.
@@ -103,6 +600,9 @@ class Endpoint:
         Class attribute. Dictionary of Endpoints for the level shifted I2CDAQ bus.
     I2CDAQ_QW : dict
         Class attribute. Dictionary of Endpoints for QW 3.3V I2CDAQ bus.
+    index : EndpointIndex
+        Class attribute. Reverse index of endpoints_from_defines from
+        (address, bit) to (group, name, instance).
     address : int
         Address location of the Endpoint.
     bit_index_low : int
@@ -117,12 +617,24 @@ class Endpoint:
         Whether to increment the address when incrementing the Endpoint.
     addr_step : int
         How much to add to the address when using advance_endpoints if gen_address is True.
+    shift : int
+        Cached bit_index_low, the left shift of the Endpoint's field in its word.
+    field_max : int
+        Cached largest value the bit_width bits of the Endpoint can hold.
+    mask : int
+        Cached mask of the bit_width bits of the Endpoint in its word.
+    span_mask : int
+        Cached mask of bits bit_index_low through bit_index_high inclusive,
+        written by FPGA.set_endpoint, clear_endpoint, toggle_low, and
+        toggle_high.
     """
 
     MAX_WIDTH = configs['endpoint_max_width']  # Maximum bit width of an Endpoint. Used to wrap Endpoints to the next address when incrementing
+    defines_cache_dir = os.path.join(home_dir, 'cache')  # Where parsed ep_defines.v files are cached, None to not cache
     endpoints_from_defines = dict()
     I2CDAQ_level_shifted = dict()
     I2CDAQ_QW = dict()
+    index = EndpointIndex()
 
     def __init__(self, address, bit_index_low, bit_width, gen_bit, gen_address, addr_step=1):
         self.address = address
@@ -136,6 +648,38 @@ class Endpoint:
         self.gen_bit = gen_bit
         self.gen_address = gen_address
         self.addr_step = addr_step
+        self.update_masks()
+
+    def update_masks(self):
+        """Recompute the cached shift, field_max, mask, and span_mask.
+
+        Called by advance_endpoints. Call after changing bit_index_low or
+        bit_width directly.
+        """
+
+        self.field_max = (1 << self.bit_width) - 1 if self.bit_width is not None else None
+        if self.bit_index_low is None or self.field_max is None:
+            # Address only Endpoint
+            self.shift = None
+            self.mask = None
+            self.span_mask = None
+        else:
+            self.shift = self.bit_index_low
+            self.mask = self.field_max << self.shift
+            self.span_mask = ((self.field_max << 1) | 1) << self.shift
+
+    def encode(self, value, word=0):
+        """Return word with the Endpoint's bits replaced by value.
+
+        Bits of value that do not fit in bit_width are dropped.
+        """
+
+        return (word & ~self.mask) | ((value << self.shift) & self.mask)
+
+    def decode(self, word):
+        """Return the value of the Endpoint's bits in word."""
+
+        return (word & self.mask) >> self.shift
 
     def __str__(self):
         str_rep = '0x{:0x}[{}:{}]'.format(
@@ -148,11 +692,20 @@ class Endpoint:
         else:
             return False
 
+    def __copy__(self):
+        # All attributes are immutable so a shallow copy is independent
+        ep = Endpoint.__new__(Endpoint)
+        ep.__dict__.update(self.__dict__)
+        return ep
+
     @staticmethod
     def update_endpoints_from_defines(ep_defines_path=configs['ep_defines_path']):
         """Store and return a dictionary of Endpoints for each chip in ep_defines.v.
 
-        Returns -1 if there is a naming collision in ep_defines.v
+        The dictionary is returned even if Endpoints share bits, since
+        ep_defines.v has intentional overlaps such as the _LEN and
+        REGBRIDGE_OFFSET definitions. Use find_collisions to check for
+        naming collisions.
         """
 
         # Leave as None if there is no ep_defines.v
@@ -162,56 +715,104 @@ class Endpoint:
         elif not os.path.exists(ep_defines_path):
             raise FileNotFoundError(f'ep_defines_path = {ep_defines_path} not found')
 
-        # Get all lines
-        with open(ep_defines_path, 'r') as file:
-            lines = file.readlines()
+        entries = Endpoint._load_defines(ep_defines_path)
 
-        # Get all the endpoints from the lines
-        for line in lines:
-            # Check if the line defines an endpoint
-            pieces = line.split(' ')
-            # Ex. line = "`define AD7961_PIPE_OUT_GEN_ADDR 8'hA1 // address=TEST_ADDRESS bit_width=32"
-            #   pieces = ["`define", "AD7961_PIPE_OUT_GEN_ADDR", "8'hA1", "//", "address=TEST_ADDRESS", "bit_width=32"]
-            if pieces[0] != '`define':
-                # Line does not define an endpoint, skip
-                continue
+        # Put defined endpoints in endpoints_from_defines dictionary, indexed
+        # by their full name to resolve address references
+        index = {}
+        references = []
+        for class_name, ep_name, address, bit, bit_width, gen_bit, gen_address, addr_step in entries:
+            endpoint = Endpoint(address=address, bit_index_low=bit,
+                                bit_width=bit_width, gen_bit=gen_bit, gen_address=gen_address, addr_step=addr_step)
+            group = Endpoint.endpoints_from_defines.get(class_name)
+            if group is None:
+                # Class doesn't exist yet in the dictionary
+                group = Endpoint.endpoints_from_defines[class_name] = {}
+            group[ep_name] = endpoint
+            index[f'{class_name}_{ep_name}'] = endpoint
+            if type(address) == str:
+                references.append((class_name, ep_name, endpoint))
+
+        # Find hex addresses for the endpoints with endpoint name references
+        for group_name, endpoint_name, endpoint in references:
+            referenced_endpoint = index.get(endpoint.address)
+            if referenced_endpoint is None:
+                # Defined by an earlier ep_defines.v
+                class_name, ep_name = endpoint.address.split('_', maxsplit=1)
+                referenced_group = Endpoint.endpoints_from_defines.get(class_name)
+                if referenced_group is None:
+                    print(
+                        f'{group_name}[{endpoint_name}]: Referenced group "{class_name}" not found.')
+                    continue
+                referenced_endpoint = referenced_group.get(ep_name)
+                if referenced_endpoint is None:
+                    print(
+                        f'{group_name}[{endpoint_name}]: Referenced endpoint "{class_name}_{ep_name}" not found.')
+                    continue
+            endpoint.address = referenced_endpoint.address
+
+        # Rebuild the reverse index
+        Endpoint.index.clear()
+        for group_name, group in Endpoint.endpoints_from_defines.items():
+            if type(group) == dict:
+                Endpoint.index.track(group_name, group)
 
-            # Grab "addr_step" and remove from pieces to leave later steps the same
-            shortened_pieces = [x[:len('addr_step')] for x in pieces]
-            if 'addr_step' in shortened_pieces:
-                addr_step_text = pieces.pop(shortened_pieces.index('addr_step'))
+        return Endpoint.endpoints_from_defines
+
+    @staticmethod
+    def _parse_defines(text, ep_defines_path=''):
+        """Return the endpoint definitions in the text of an ep_defines.v.
+
+        Returns
+        -------
+        list
+            (class_name, ep_name, address, bit_index_low, bit_width, gen_bit,
+            gen_address, addr_step) for each definition, in file order.
+            address is the name of the referenced endpoint (without _GEN_BIT
+            or _GEN_ADDR) if the definition gives a name instead of a hex
+            address. bit_index_low is None for address definitions.
+        """
+
+        entries = []
+        for match in _EP_DEFINE_RE.finditer(text):
+            # Ex. line = "`define AD7961_PIPE_OUT_GEN_ADDR 8'hA1 // address=TEST_ADDRESS bit_width=32"
+            #   name = "AD7961_PIPE_OUT_GEN_ADDR", value = "8'hA1", rest = " // address=TEST_ADDRESS bit_width=32"
+            name, value, rest = match.groups()
+
+            # Fields in the comment
+            comment_address = bit_width = None
+            addr_step = 1
+            for token in rest.partition('//')[2].split():
+                key, _, field = token.partition('=')
+                if key == 'bit_width':
+                    bit_width = field
+                elif key == 'address':
+                    comment_address = field
+                elif key == 'addr_step':
+                    addr_step = field
+            if addr_step != 1:
                 try:
-                    addr_step = addr_step_text[len('addr_step='):]
                     addr_step = int(addr_step)
-                except ValueError as e:
-                    raise ValueError(f'addr_step not assigned to int in line {lines.index(line) + 1} of "{ep_defines_path}". Got addr_step={addr_step} instead.')
-            else:
-                # No addr_step assigned, default to 1
-                addr_step = 1
+                except ValueError:
+                    line_number = text.count('\n', 0, match.start()) + 1
+                    raise ValueError(f'addr_step not assigned to int in line {line_number} of "{ep_defines_path}". Got addr_step={addr_step} instead.')
 
-            # Extract data from definition
             # Class name
-            class_name_end = pieces[1].find('_')
-            if class_name_end == -1:
-                # .find() returns -1 if not found, without an underscore we cannot
-                # tell where the class and endpoint names are separated
+            class_name, sep, remaining_name = name.partition('_')
+            if not sep:
+                # Without an underscore we cannot tell where the class and
+                # endpoint names are separated
                 print('FAIL: no endpoint name found')
-                print(line)
+                print(match.group(0))
                 continue
-            class_name = pieces[1][:class_name_end]
-
-            # Whether to generate bits
-            remaining_name = pieces[1][class_name_end + 1:]
-            previous_len = len(remaining_name)
-            remaining_name = remaining_name.replace('_GEN_BIT', '')
-            # If the remaining name is shorter it is because GEN_BIT was replaced
-            gen_bit = len(remaining_name) < previous_len
 
-            # Whether to generate address
-            previous_len = len(remaining_name)
-            remaining_name = remaining_name.replace('_GEN_ADDR', '')
-            # If the remaining name is shorter it is because GEN_ADDR was replaced
-            gen_address = len(remaining_name) < previous_len
+            # Whether to generate bits and address
+            gen_bit = '_GEN_BIT' in remaining_name
+            if gen_bit:
+                remaining_name = remaining_name.replace('_GEN_BIT', '')
+            gen_address = '_GEN_ADDR' in remaining_name
+            if gen_address:
+                remaining_name = remaining_name.replace('_GEN_ADDR', '')
 
             # Endpoint name
             ep_name = remaining_name
@@ -220,134 +821,88 @@ class Endpoint:
                 # format of the others so we skip it
                 continue
 
-            # Address, bit, and bit_width
-            if "8'h" in pieces[2]:
-                # Definition holds an address, take that value
-                address = int(pieces[2][3:], base=16)
-                bit = None
-                bit_width = int(pieces[4].split('=')[1])
-            else:
-                # Definition holds a bit, take address from comment
-                comment_address = pieces[4].split('=')[1]
-                if '0x' in comment_address:
-                    # Address comment has a hex value
-                    address = int(comment_address[2:], 16)
+            try:
+                bit_width = int(bit_width)
+                if "8'h" in value:
+                    # Definition holds an address, take that value
+                    address = int(value[3:], base=16)
+                    bit = None
                 else:
-                    # Address comment has the name of another endpoint so store
-                    # the interfaces.py name of that endpoint so we can look it
-                    # up going through all lines
-                    address_name = pieces[4].split('=')[1]
-                    address_name_no_gen = address_name.split(
-                        '_GEN', maxsplit=1)[0]
-                    address = address_name_no_gen
-                bit = int(pieces[2])
-                bit_width = int(pieces[5].split('=')[1])
+                    # Definition holds a bit, take address from comment. The
+                    # address is either a hex value or the name of another
+                    # endpoint, resolved after all definitions are read
+                    if '0x' in comment_address:
+                        address = int(comment_address[2:], 16)
+                    else:
+                        address = comment_address.split('_GEN', maxsplit=1)[0]
+                    bit = int(value)
+            except (TypeError, ValueError) as e:
+                line_number = text.count('\n', 0, match.start()) + 1
+                raise ValueError(f'Could not read the definition in line {line_number} of "{ep_defines_path}": {e}')
 
-            endpoint = Endpoint(address=address, bit_index_low=bit,
-                                bit_width=bit_width, gen_bit=gen_bit, gen_address=gen_address, addr_step=addr_step)
+            entries.append((class_name, ep_name, address, bit, bit_width, gen_bit, gen_address, addr_step))
+        return entries
 
-            # Put defined endpoint in endpoints_from_defines dictionary
-            if Endpoint.endpoints_from_defines.get(class_name) is None:
-                # Class doesn't exist yet in the dictionary
-                Endpoint.endpoints_from_defines[class_name] = {
-                    ep_name: endpoint}
-            else:
-                # Class already exists in the dictionary
-                Endpoint.endpoints_from_defines[class_name][ep_name] = endpoint
-
-        # Go through endpoints_from_defines and find hex addresses for those with endpoint
-        # name references instead
-        for group_name in Endpoint.endpoints_from_defines:
-            group = Endpoint.endpoints_from_defines[group_name]
-            for endpoint_name in group:
-                endpoint = group[endpoint_name]
-                if type(endpoint.address) == str:
-                    # Address is a name
-                    class_name, ep_name = endpoint.address.split(
-                        '_', maxsplit=1)
-                    referenced_group = Endpoint.endpoints_from_defines.get(
-                        class_name)
-                    if referenced_group is None:
-                        print(
-                            f'{group_name}[{endpoint_name}]: Referenced group "{class_name}" not found.')
-                        continue
-                    referenced_endpoint = referenced_group.get(ep_name)
-                    if referenced_endpoint is None:
-                        print(
-                            f'{group_name}[{endpoint_name}]: Referenced endpoint "{class_name}_{ep_name}" not found.')
-                        continue
-                    endpoint.address = referenced_endpoint.address
-
-        # At this point the dictionary should be built
-        # Check for naming collisions (2+ names sharing same address or bit within address)
-        # Collect all top level endpoints
-        top_level_eps = [
-            x for x in Endpoint.endpoints_from_defines.values() if type(x) == Endpoint]
-        # Collect all endpoints in dictionaries
-        lower_level_eps = []
-        for eps in [d.values() for d in Endpoint.endpoints_from_defines.values() if type(d) == dict]:
-            lower_level_eps += list(eps)
-        none_to_neg_1 = {None: -1}
-        # Make tuples of (address, bit) from each list, then concatenate the lists
-        # The none_to_neg_1.get() translates None values of bit_index_low to -1 for sorting later
-        list_eps = [(ep.address, none_to_neg_1.get(
-            ep.bit_index_low, ep.bit_index_low)) for ep in top_level_eps]
-        list_len = len(list_eps)
-        set_len = len(set(list_eps))  # A set removes duplicates
-
-        if list_len != set_len:
-            # There may be duplicates. May not, because different groups can have endpoints of the same name.
-            print('Checking for naming collisions in ep_defines.v ...')
-
-            # Search through to find duplicates
-            # Copy the list to keep order in the original
-            sorted_list_eps = list(list_eps)
-            sorted_list_eps.sort()  # Put duplicates next to one another in new list
-            top_level_names = [x for x in Endpoint.endpoints_from_defines.keys() if type(
-                Endpoint.endpoints_from_defines[x]) == Endpoint]
-            lower_level_names = []
-            for sub_dicts in [x for x in Endpoint.endpoints_from_defines.values() if type(x) == dict]:
-                lower_level_names += list(sub_dicts.keys())
-            list_names = top_level_names + lower_level_names
-
-            collision = False  # Keep track of whether there was a collision for return value
-            for ep_index in range(len(sorted_list_eps) - 1):
-                ep = sorted_list_eps[ep_index]
-                next_ep = sorted_list_eps[ep_index + 1]
-                name = list_names[list_eps.index(sorted_list_eps[ep_index])]
-                next_name = list_names[list_eps.index(
-                    sorted_list_eps[ep_index])]
-                if (ep == next_ep) and (name != next_name):
-                    # Need different names because otherwise they are from different groups and do not actually conflict
-
-                    # The name part of this uses a list of names created in the same order as the original list_eps (list_names)
-                    # then finds the index of the current endpoint in list_eps and uses that to find the corresponding
-                    # name in list_names
-                    print(
-                        f'Collision found at address={ep[0]} bit={ep[1]}: {name} with {next_name}')
-                    collision = True
-            if collision:
-                return -1
-            else:
-                print('No collisions found.')
+    @staticmethod
+    def _load_defines(ep_defines_path):
+        """Return _parse_defines of the file, from the cache if unchanged.
 
-        # If the list and set match length, no duplicates
-        return Endpoint.endpoints_from_defines
+        The cache in defines_cache_dir is keyed by the absolute path of the
+        file and checked against its size and SHA-256, so only the first
+        process to read a new or edited ep_defines.v parses it.
+        """
+
+        with open(ep_defines_path, 'rb') as file:
+            data = file.read()
+
+        cache_path = None
+        if Endpoint.defines_cache_dir is not None:
+            abs_path = os.path.abspath(ep_defines_path)
+            digest = hashlib.sha256(data).hexdigest()
+            key = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()
+            cache_path = os.path.join(Endpoint.defines_cache_dir, f'ep_defines_{key}.pickle')
+            try:
+                with open(cache_path, 'rb') as file:
+                    cached = pickle.load(file)
+                if cached['version'] == DEFINES_CACHE_VERSION and cached['path'] == abs_path \
+                        and cached['size'] == len(data) and cached['sha256'] == digest:
+                    return cached['entries']
+            except (OSError, EOFError, pickle.UnpicklingError, KeyError, TypeError, AttributeError):
+                # No cache or unreadable cache, parse again
+                pass
+
+        entries = Endpoint._parse_defines(data.decode('utf-8'), ep_defines_path)
+
+        if cache_path is not None:
+            try:
+                os.makedirs(Endpoint.defines_cache_dir, exist_ok=True)
+                tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as file:
+                    pickle.dump({'version': DEFINES_CACHE_VERSION, 'path': abs_path, 'size': len(data),
+                                 'mtime': os.path.getmtime(ep_defines_path), 'sha256': digest,
+                                 'entries': entries}, file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                print('Could not cache the endpoint definitions:', e)
+        return entries
 
     @staticmethod
     def get_chip_endpoints(chip_name):
-        """Return a copy of the dictionary of Endpoints for a specific chip or group."""
+        """Return a copy of the dictionary of Endpoints for a specific chip or group.
+
+        The copy is an EndpointOverlay: each Endpoint is copied from the shared
+        definitions the first time it is used, so changes to it (e.g. by
+        advance_endpoints) do not affect other chips, and later changes to
+        the shared definitions do not affect it.
+        """
 
         if Endpoint.endpoints_from_defines == dict():
             Endpoint.update_endpoints_from_defines()
 
-        # copy.deepcopy() is important here because it makes a copy of the
-        # dictionary so that when we increment it for multiple instantiations
-        # of the chip, each previously instantiated chip will not have its
-        # endpoints affected by the increment, only future instantiations.
-        # Using deepcopy() ensures that any dictionaries inside the dictionary
-        # we copy also get copied, not left as references.
-        return copy.deepcopy(Endpoint.endpoints_from_defines.get(chip_name))
+        group = Endpoint.endpoints_from_defines.get(chip_name)
+        if group is None:
+            return None
+        return EndpointOverlay(group, origin=Endpoint.index.tracked(group))
 
     @staticmethod
     def excel_to_defines(excel_path, defines_path, sheet=0):
@@ -368,6 +923,7 @@ class Endpoint:
         str : the text written to the Verilog file.
         """
 
+        import pandas as pd
         sheet_data = pd.read_excel(excel_path, sheet)
         text = '\n'.join(sheet_data['Generated Line'])
         with open(defines_path, 'w') as file:
@@ -402,8 +958,13 @@ class Endpoint:
         dict : the same dict of Endpoints given in endpoints_dict, now advanced
         """
 
+        shared = Endpoint.index.tracked(endpoints_dict) is not None
         for key in endpoints_dict:
             endpoint = endpoints_dict[key]
+            if shared:
+                # Replace rather than change the shared Endpoints, which
+                # EndpointOverlays may still be reading
+                endpoint = endpoints_dict[key] = copy.copy(endpoint)
             if endpoint.gen_bit:
                 endpoint.bit_index_low += (endpoint.bit_width * advance_num)
                 if endpoint.bit_index_low > Endpoint.MAX_WIDTH:
@@ -418,8 +979,100 @@ class Endpoint:
                     endpoint.bit_index_high = endpoint.bit_index_low + endpoint.bit_width
             if endpoint.gen_address:
                 endpoint.address += advance_num * endpoint.addr_step
+            endpoint.update_masks()
+        Endpoint.index.advanced(endpoints_dict, advance_num)
         return endpoints_dict
 
+    @staticmethod
+    def _flatten_dict(d, prefix=''):
+        '''Make all values of subdictionaries values of a new single dictionary.
+
+        Keys are dictionary keys separated by '/' as we go down subdictionaries.
+
+        Parameters
+        ----------
+        d : dict
+            The dictionary to flatten.
+        prefix : str
+            The prefix for the new dictionary keys. Used recursively.
+        '''
+
+        dn = {}
+        for i in d:
+            k = prefix + str(i)
+            if isinstance(d[i], Mapping):
+                dn.update(Endpoint._flatten_dict(d[i], prefix=k + '/'))
+            else:
+                dn[k] = d[i]
+        return dn
+
+    @classmethod
+    def find_collisions(cls, endpoints_dict=None, print_output=True):
+        '''Find Endpoints with different names that use the same bits.
+
+        Endpoints collide if they have the same address and overlapping bits
+        (bit_index_low through bit_index_low + bit_width - 1), or if both
+        only define the same address. The Endpoints are grouped by address
+        and each group swept in order of bit_index_low instead of comparing
+        every pair.
+
+        Parameters
+        ----------
+        endpoints_dict : dict
+            The dictionary of (str, Endpoint) pairs to check for collisions
+            in. (str, dict) pairs are also allowed for nested dictionaries.
+            Defaults to Endpoint.endpoints_from_defines.
+        print_output : bool
+            Whether to print the discovered collisions.
+
+        Returns
+        -------
+        dict : (address, low, high) -> list of the names ('/' separated keys)
+            of the colliding Endpoints. low and high are the first and last
+            bit of the overlapping Endpoints, None for address only Endpoints.
+        '''
+
+        if endpoints_dict is None:
+            endpoints_dict = cls.endpoints_from_defines
+
+        by_address = {}
+        for name, ep in cls._flatten_dict(endpoints_dict).items():
+            if not isinstance(ep, Endpoint):
+                continue
+            if ep.bit_index_low is None:
+                by_address.setdefault((ep.address, None), []).append((None, None, name))
+            else:
+                high = ep.bit_index_low + max(ep.bit_width, 1) - 1
+                by_address.setdefault((ep.address, 'bits'), []).append((ep.bit_index_low, high, name))
+
+        collisions = {}
+        for (address, kind), slots in by_address.items():
+            if len(slots) < 2:
+                continue
+            if kind is None:
+                collisions[(address, None, None)] = [name for _, _, name in slots]
+                continue
+            # Sweep the bit ranges, merging those that overlap
+            slots.sort(key=lambda slot: slot[0])
+            low, high, names = slots[0][0], slots[0][1], [slots[0][2]]
+            for slot_low, slot_high, name in slots[1:] + [(None, None, None)]:
+                if slot_low is not None and slot_low <= high:
+                    high = max(high, slot_high)
+                    names.append(name)
+                    continue
+                if len(names) > 1:
+                    collisions[(address, low, high)] = names
+                low, high, names = slot_low, slot_high, [name]
+
+        if print_output:
+            print(f'{len(collisions)} collisions found.')
+            for (address, low, high), names in collisions.items():
+                print(f'{hex(address) if isinstance(address, int) else address}[{low}:{high}]')
+                for name in names:
+                    print('\t', name)
+
+        return collisions
+
     @classmethod
     def check_duplicates(cls, endpoints_dict=endpoints_from_defines, print_output=True):
         '''Check for duplicate Endpoints.
@@ -438,48 +1091,21 @@ class Endpoint:
         dict : A new dictionary of (str(Endpoint), str) pairs.
         '''
 
-        # Flatten the dictionary so all Endpoints appear as values.
-
-        def flatten_dict(d, prefix=''):
-            '''Make all values of subdictionaries values of a new single dictionary.
-            
-            Keys are dictionary keys separated by '/' as we go down subdictionaries.
-            
-            Parameters
-            ----------
-            d : dict
-                The dictionary to flatten.
-            prefix : str
-                The prefix for the new dictionary keys. Used recursively.
-            '''
-
-            dn = {}
-            for i in d:
-                    k = prefix + str(i)
-                    if type(d[i]) is dict:
-                            dn.update(flatten_dict(d[i], prefix=k + '/'))
-                    else:
-                            dn[k] = d[i]
-            return dn
-
-        flat_eps = flatten_dict(endpoints_dict)
+        # Group the Endpoints by their attributes so equal Endpoints share a key
+        grouped = {}
+        for k, v in Endpoint._flatten_dict(endpoints_dict).items():
+            key = tuple(sorted(v.__dict__.items())) if hasattr(v, '__dict__') else v
+            group = grouped.get(key)
+            if group is None:
+                grouped[key] = (v, [k])
+            else:
+                group[1].append(k)
 
         # Now create a dictionary of (str(Endpoint), str) pairs for any duplicate Endpoints.
         dup_eps = {}
-        prev_k = set()
-        for k in flat_eps:
-                v = flat_eps[k]
-                prev_k.add(k)
-                for k2 in flat_eps:
-                        if k2 in prev_k:
-                                continue
-                        else:
-                                v2 = flat_eps[k2]
-                                if v == v2:
-                                        try:
-                                                dup_eps[str(v)].append(k2)
-                                        except KeyError:
-                                                dup_eps[str(v)] = [k, k2]
+        for v, names in grouped.values():
+            if len(names) > 1:
+                dup_eps.setdefault(str(v), []).extend(names)
 
         # Print the output if desired
         if print_output:
@@ -492,6 +1118,320 @@ class Endpoint:
         return dup_eps
 
 
+class EndpointTable:
+    """Endpoints of every instance of a chip family in a NumPy structured array.
+
+    Instance k has the Endpoints of the base dictionary advanced k times by
+    Endpoint.advance_endpoints(endpoints, 1), as each new chip of
+    create_chips gets, but computed directly from the base values instead of
+    copying and advancing dictionaries.
+
+    Attributes
+    ----------
+    names : list
+        Endpoint names in the order of the table rows.
+    rows : dict
+        Endpoint name -> row in table.
+    origin : tuple or None
+        (group, instance) of the endpoints in Endpoint.index if they are an
+        EndpointOverlay from get_chip_endpoints. Instances are then added to
+        the index as they are made.
+    table : numpy.ndarray
+        One row of DTYPE per name with the base (instance 0) values. bit_low
+        is -1 for Endpoints that only define an address.
+    """
+
+    DTYPE = np.dtype([('address', np.int64), ('bit_low', np.int64), ('bit_width', np.int64),
+                      ('gen_bit', np.bool_), ('gen_address', np.bool_), ('addr_step', np.int64)])
+
+    def __init__(self, endpoints):
+        self.names = list(endpoints)
+        self.rows = {name: i for i, name in enumerate(self.names)}
+        self.origin = getattr(endpoints, 'origin', None)
+        self.table = np.array([(ep.address, -1 if ep.bit_index_low is None else ep.bit_index_low, ep.bit_width,
+                                ep.gen_bit, ep.gen_address, ep.addr_step) for ep in endpoints.values()],
+                              dtype=self.DTYPE)
+
+        t = self.table
+        max_width = Endpoint.MAX_WIDTH
+        moves = t['gen_bit'] & (t['bit_low'] >= 0)
+        # Rows whose bits fill each address up to MAX_WIDTH then restart at
+        # bit 0 of the next address. Others are advanced step by step.
+        self._regular = moves & (t['bit_width'] > 0) & (t['bit_low'] + t['bit_width'] <= max_width)
+        self._irregular = np.flatnonzero(moves & ~self._regular)
+        width = np.where(self._regular, t['bit_width'], 1)
+        self._width = width
+        # Instances on the first address and on each later address
+        self._first_count = (max_width - t['bit_low'] - width) // width + 1
+        self._per_address = max_width // width
+
+    def __len__(self):
+        return len(self.names)
+
+    def positions(self, k):
+        """Return the addresses and bit_index_lows of instance k.
+
+        Parameters
+        ----------
+        k : int or array_like of int
+            Instance number(s), 0 for the base Endpoints.
+
+        Returns
+        -------
+        address, bit_low : numpy.ndarray
+            Shape (len(names),) for a single k, otherwise k's shape plus
+            (len(names),). bit_low is -1 for address only Endpoints.
+        """
+
+        t = self.table
+        k = np.asarray(k, dtype=np.int64)[..., None]
+        address = t['address'] + np.where(t['gen_address'], k * t['addr_step'], 0)
+        bit_low = np.broadcast_to(t['bit_low'], address.shape)
+
+        first = k < self._first_count
+        later = k - self._first_count
+        bit_address = np.where(first, 0, (1 + later // self._per_address) * t['addr_step'])
+        bit_bit_low = np.where(first, t['bit_low'] + k * self._width, (later % self._per_address) * self._width)
+        address = address + np.where(self._regular, bit_address, 0)
+        bit_low = np.where(self._regular, bit_bit_low, bit_low)
+
+        for row in self._irregular:
+            steps = k[..., 0]
+            ep = Endpoint(address=0, bit_index_low=int(t['bit_low'][row]), bit_width=int(t['bit_width'][row]),
+                          gen_bit=True, gen_address=False, addr_step=int(t['addr_step'][row]))
+            path = [(0, ep.bit_index_low)]
+            for _ in range(int(steps.max(initial=0))):
+                Endpoint.advance_endpoints({'': ep})
+                path.append((ep.address, ep.bit_index_low))
+            path = np.array(path, dtype=np.int64)
+            address[..., row] += path[steps, 0]
+            bit_low[..., row] = path[steps, 1]
+        return address, bit_low
+
+    def instance(self, k):
+        """Return an EndpointView of the Endpoints of instance k."""
+
+        view = EndpointView(self, k)
+        if self.origin is not None and k > 0:
+            group, instance = self.origin
+            address, bit_low = view.positions()
+            for i, name in enumerate(self.names):
+                Endpoint.index.add(group, name, instance + k, address[i], None if bit_low[i] < 0 else bit_low[i],
+                                   int(self.table['bit_width'][i]))
+        return view
+
+    def advance(self, endpoints, k):
+        """Move the base Endpoints of this table in endpoints to instance k, in place.
+
+        The same as calling Endpoint.advance_endpoints(endpoints, 1) k times
+        on the dictionary the table was made from.
+        """
+
+        tracked = Endpoint.index.tracked(endpoints)
+        if tracked is not None and k > 0:
+            # Index every instance passed over, not only the last
+            group, instance = tracked
+            addresses, bit_lows = self.positions(np.arange(1, k))
+            for step, (address, bit_low) in enumerate(zip(addresses.tolist(), bit_lows.tolist()), start=1):
+                for name, a, b in zip(self.names, address, bit_low):
+                    Endpoint.index.add(group, name, instance + step, a, None if b < 0 else b,
+                                       endpoints[name].bit_width)
+
+        address, bit_low = self.positions(k)
+        for name, a, b in zip(self.names, address.tolist(), bit_low.tolist()):
+            ep = endpoints[name]
+            if tracked is not None:
+                # Replace rather than change the shared Endpoints, which
+                # EndpointOverlays may still be reading
+                ep = endpoints[name] = copy.copy(ep)
+            ep.address = a
+            if b >= 0:
+                ep.bit_index_low = b
+                ep.bit_index_high = b + ep.bit_width
+            ep.update_masks()
+        Endpoint.index.advanced(endpoints, k)
+        return endpoints
+
+
+class EndpointView(MutableMapping):
+    """Dictionary of the Endpoints of one instance in an EndpointTable.
+
+    Each Endpoint is made the first time it is used. Endpoints set in the
+    view replace those of the table. copy.deepcopy returns a plain dict.
+    """
+
+    def __init__(self, table, instance):
+        self.table = table
+        self.instance = instance
+        self._names = dict.fromkeys(table.names)
+        self._endpoints = {}
+        self._positions = None
+
+    def __getitem__(self, name):
+        ep = self._endpoints.get(name)
+        if ep is not None:
+            return ep
+        if name not in self._names:
+            raise KeyError(name)
+        address, bit_low = self.positions()
+        i = self.table.rows[name]
+        row = self.table.table[i]
+        ep = Endpoint(address=address[i], bit_index_low=None if bit_low[i] < 0 else bit_low[i],
+                      bit_width=int(row['bit_width']), gen_bit=bool(row['gen_bit']),
+                      gen_address=bool(row['gen_address']), addr_step=int(row['addr_step']))
+        self._endpoints[name] = ep
+        return ep
+
+    def positions(self):
+        """Return lists of the addresses and bit_index_lows of this instance."""
+
+        if self._positions is None:
+            address, bit_low = self.table.positions(self.instance)
+            self._positions = (address.tolist(), bit_low.tolist())
+        return self._positions
+
+    def __setitem__(self, name, ep):
+        self._names[name] = None
+        self._endpoints[name] = ep
+
+    def __delitem__(self, name):
+        del self._names[name]
+        self._endpoints.pop(name, None)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __repr__(self):
+        return '{' + ', '.join(f'{name!r}: {str(self[name])}' for name in self._names) + '}'
+
+    def __deepcopy__(self, memo):
+        return {name: copy.deepcopy(self[name], memo) for name in self._names}
+
+
+class EndpointOverlay(MutableMapping):
+    """Copy-on-write dictionary of Endpoints over shared definitions.
+
+    Made by Endpoint.get_chip_endpoints. Holds a shallow snapshot of the
+    shared group dictionary and copies each Endpoint the first time it is
+    used, so making one does not copy every Endpoint of the group.
+
+    Attributes
+    ----------
+    origin : tuple or None
+        (group, instance) of the shared dictionary in Endpoint.index when the
+        overlay was made, None if it is not indexed.
+    """
+
+    def __init__(self, endpoints, origin=None):
+        self._source = dict(endpoints)
+        self._endpoints = {}
+        self.origin = origin
+
+    def __getitem__(self, name):
+        ep = self._endpoints.get(name)
+        if ep is None:
+            ep = self._endpoints[name] = copy.copy(self._source[name])
+        return ep
+
+    def __setitem__(self, name, ep):
+        if name not in self._source:
+            self._source[name] = None
+        self._endpoints[name] = ep
+
+    def __delitem__(self, name):
+        del self._source[name]
+        self._endpoints.pop(name, None)
+
+    def __iter__(self):
+        return iter(self._source)
+
+    def __len__(self):
+        return len(self._source)
+
+    def __contains__(self, name):
+        return name in self._source
+
+    def __repr__(self):
+        return '{' + ', '.join(f'{name!r}: {str(self[name])}' for name in self._source) + '}'
+
+    def copy(self):
+        """Return an independent EndpointOverlay with the same Endpoints."""
+
+        return copy.deepcopy(self)
+
+    def __deepcopy__(self, memo):
+        overlay = EndpointOverlay.__new__(EndpointOverlay)
+        overlay._source = dict(self._source)
+        overlay._endpoints = {name: copy.copy(ep) for name, ep in self._endpoints.items()}
+        overlay.origin = self.origin
+        return overlay
+
+
+class FPGATimeoutError(TimeoutError):
+    """Raised by FPGA.wait_for when the condition is not met in time."""
+
+
+class BufferPool:
+    """Reusable bytearrays for pipe reads, kept by size.
+
+    Get a buffer, fill it with FPGA.read_pipe_out or DDR3.read_adc_block, and
+    release it when its data is no longer needed so the next read of the same
+    size does not allocate.
+
+    Attributes
+    ----------
+    max_free : int
+        Most released buffers of one size to keep.
+    """
+
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self._free = {}
+
+    def get(self, num_bytes):
+        """Return a bytearray of num_bytes, reused if one has been released."""
+
+        free = self._free.get(num_bytes)
+        if free:
+            return free.pop()
+        return bytearray(num_bytes)
+
+    def release(self, buf):
+        """Return buf to the pool. Do not use buf afterwards."""
+
+        free = self._free.setdefault(len(buf), [])
+        if len(free) < self.max_free:
+            free.append(buf)
+
+    @contextmanager
+    def borrow(self, num_bytes):
+        """Context manager for a buffer that is released on exit."""
+
+        buf = self.get(num_bytes)
+        try:
+            yield buf
+        finally:
+            self.release(buf)
+
+
+# Host-side record of the bitfile last loaded on each FPGA, by serial number
+BITFILE_RECORD_PATH = os.path.join(home_dir, 'loaded_bitfiles.json')
+_bitfile_record_lock = threading.Lock()
+
+
+def hash_bitfile(path):
+    """Return the SHA-256 hex digest of the bitfile at path."""
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 # Class for the FPGA itself. Handles FPGA configuration, setting wire values,
 # and other FPGA specific functions.
 
@@ -508,10 +1448,47 @@ class FPGA:
         Opal Kelly API connection to the FPGA.
     device_info : ok.okTDeviceInfo
         General information about the FPGA.
+    serial : str
+        Serial number of the device to open. '' (default) opens the first
+        device found.
+    frontpanel : module or None
+        Module (or object) providing okCFrontPanel and okTDeviceInfo. None
+        (default) uses the Opal Kelly ok module. Use pyripherals.simulator to
+        run without a board.
+    debug : bool
+        Whether to print each WireIn write.
+    skip_unchanged_wire_ins : bool
+        Whether to drop WireIn writes that would not change any bit of the
+        value last written to that WireIn (see get_wire_in_shadow).
+    wire_out_max_age : float or None
+        Seconds a WireOut snapshot may be reused by read_wire, read_ep, and
+        read_wire_bit before it is refreshed from the FPGA. None (default)
+        refreshes on every read.
+    instrumentation : Instrumentation or None
+        Statistics of the xem calls, set by enable_instrumentation.
+    trace : TraceRecorder or None
+        Recorder of the xem calls, set by start_trace.
+    buffer_pool : BufferPool
+        Reusable buffers for pipe reads.
+    wait_spin_time : float
+        Seconds wait_for polls without sleeping before backing off.
+    wait_initial_delay : float
+        First sleep in seconds of wait_for after the spin time. Each later
+        sleep doubles, up to wait_max_delay.
+    wait_max_delay : float
+        Longest sleep in seconds between wait_for polls.
+    fast_start : bool
+        Whether init_device skips ConfigureFPGA when the board is already
+        running the bitfile. The bitfile hash and BITFILE_VERSION recorded
+        when this FPGA last configured the board (by serial number) must
+        match the bitfile and the BITFILE_VERSION read from the board.
+    bitfile_record_path : str
+        JSON file of the bitfile loaded on each board, used by fast_start.
     """
 
 
-    def __init__(self, bitfile='default', endpoints=None, debug=False):
+    def __init__(self, bitfile='default', endpoints=None, debug=False, wire_out_max_age=None, frontpanel=None, serial='',
+                 fast_start=False):
         if bitfile == 'default':
             # Use bitfile from config.yaml fpga_bitfile_path
             self.bitfile = configs['fpga_bitfile_path']
@@ -524,72 +1501,286 @@ class FPGA:
             self.endpoints = endpoints
 
         self.debug = debug
+        self.frontpanel = frontpanel
+        self.serial = serial
         self.bitfile_version = None
 
+        # WireIn writes staged inside transaction(), address -> (value, mask)
+        self._transaction_depth = 0
+        self._pending_wire_ins = {}
+
+        # Last value written to each WireIn, address -> (value, mask of known bits)
+        self.skip_unchanged_wire_ins = True
+        self._wire_in_shadow = {}
 
-    def init_device(self):
+        # Time of the last UpdateWireOuts, None when the snapshot is invalid
+        self.wire_out_max_age = wire_out_max_age
+        self._wire_outs_time = None
+
+        # TriggerOut bits latched by update_trigger_outs, address -> mask
+        self._trigger_out_watch = {}
+        self._trigger_out_pending = {}
+
+        self.instrumentation = None
+        self.trace = None
+        self.buffer_pool = BufferPool()
+
+        self.wait_spin_time = 200e-6
+        self.wait_initial_delay = 10e-6
+        self.wait_max_delay = 10e-3
+
+        self.fast_start = fast_start
+        self.bitfile_record_path = BITFILE_RECORD_PATH
+
+    def init_device(self, file=None):
         """Initialize the FPGA for use and print device information.
 
         Connect to the FPGA and load the bitfile. Return False on any errors.
-        Only run this once or the FPGA connection will fail.
+        Only run this once or the FPGA connection will fail. With fast_start,
+        loading the bitfile is skipped if the board is already running it.
+
+        Parameters
+        ----------
+        file : file object
+            Where the device information and errors are printed. Defaults to
+            sys.stdout.
         """
 
-        # Open the first device we find.
-        self.xem = ok.okCFrontPanel()
-        if (self.xem.NoError != self.xem.OpenBySerial("")):
-            print("A device could not be opened.  Is one connected?")
+        if self.frontpanel is None:
+            self.frontpanel = ok
+
+        # Open the device with our serial number, or the first we find.
+        self.xem = self.frontpanel.okCFrontPanel()
+        if self.trace is not None:
+            self.trace.attach(self.xem)
+            self.xem = self.trace
+        if self.instrumentation is not None:
+            self.xem = InstrumentedFrontPanel(self.xem, self.instrumentation)
+        if (self.xem.NoError != self.xem.OpenBySerial(self.serial)):
+            print("A device could not be opened.  Is one connected?", file=file)
             return(False)
 
         # Get some general information about the device.
-        self.device_info = ok.okTDeviceInfo()
+        self.device_info = self.frontpanel.okTDeviceInfo()
         if (self.xem.NoError != self.xem.GetDeviceInfo(self.device_info)):
-            print("Unable to retrieve device information.")
+            print("Unable to retrieve device information.", file=file)
             return(False)
-        print("         Product: " + self.device_info.productName)
+        print("         Product: " + self.device_info.productName, file=file)
         print("Firmware version: %d.%d" %
-              (self.device_info.deviceMajorVersion, self.device_info.deviceMinorVersion))
-        print("   Serial Number: %s" % self.device_info.serialNumber)
-        print("       Device ID: %s" % self.device_info.deviceID)
-        print("       USB Speed: %d" % self.device_info.usbSpeed)
+              (self.device_info.deviceMajorVersion, self.device_info.deviceMinorVersion), file=file)
+        print("   Serial Number: %s" % self.device_info.serialNumber, file=file)
+        print("       Device ID: %s" % self.device_info.deviceID, file=file)
+        print("       USB Speed: %d" % self.device_info.usbSpeed, file=file)
 
         self.xem.LoadDefaultPLLConfiguration()
 
         try:
             self.bitfile_version = self.read_wire(self.endpoints['BITFILE_VERSION'].address)
         except KeyError:
-            print('No Endpoint BITFILE_VERSION in Endpoints read from', configs['ep_defines_path'])
+            print('No Endpoint BITFILE_VERSION in Endpoints read from', configs['ep_defines_path'], file=file)
             # Default to version 1
             self.bitfile_version = 1
         if self.bitfile_version < 0:
             # An error occurred in the read
-            print('Error reading BITFILE_VERSION endpoint:', self.bitfile_version)
+            print('Error reading BITFILE_VERSION endpoint:', self.bitfile_version, file=file)
             self.bitfile_version = 1    # 00.00.01
-        print('Bitfile Version:', str_bitfile_version(self.bitfile_version))
+        print('Bitfile Version:', str_bitfile_version(self.bitfile_version), file=file)
 
         # Download the configuration file.
         if self.bitfile is not None:
-            if (self.xem.NoError != self.xem.ConfigureFPGA(self.bitfile)):
-                print("FPGA configuration failed.")
+            if self.fast_start and self._bitfile_is_loaded():
+                print('Bit-file already loaded: {}'.format(self.bitfile), file=file)
+            elif (self.xem.NoError != self.xem.ConfigureFPGA(self.bitfile)):
+                print("FPGA configuration failed.", file=file)
+                self._forget_bitfile(file)
                 return(False)
             else:
-                print('Loaded bit-file: {}'.format(self.bitfile))
+                print('Loaded bit-file: {}'.format(self.bitfile), file=file)
+                if self.fast_start:
+                    self._record_bitfile(file)
+                else:
+                    # Any recorded bit-file is no longer the one loaded
+                    self._forget_bitfile(file)
         else:
-            print('Skipped bit-file update')
+            print('Skipped bit-file update', file=file)
+        self.reset_wire_in_shadow()
 
         # Check for FrontPanel support in the FPGA configuration.
         if (False == self.xem.IsFrontPanelEnabled()):
-            print("FrontPanel support is not available.")
+            print("FrontPanel support is not available.", file=file)
             return(False)
 
-        print("FrontPanel support is available.")
+        print("FrontPanel support is available.", file=file)
         return self
 
-    def read_pipe_out(self, addr, data_len=1024):
+    def _read_bitfile_record(self):
+        try:
+            with open(self.bitfile_record_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _bitfile_is_loaded(self):
+        """Return whether the board is running self.bitfile per the record."""
+
+        with _bitfile_record_lock:
+            record = self._read_bitfile_record().get(self.device_info.serialNumber)
+        if record is None or not os.path.exists(self.bitfile):
+            return False
+        if record.get('bitfile_version') != self.bitfile_version:
+            return False
+        if record.get('sha256') != hash_bitfile(self.bitfile):
+            return False
+        # An unconfigured (e.g. power cycled) board has no FrontPanel support
+        return bool(self.xem.IsFrontPanelEnabled())
+
+    def _write_bitfile_record(self, records):
+        record_dir = os.path.dirname(self.bitfile_record_path)
+        if record_dir and not os.path.exists(record_dir):
+            os.makedirs(record_dir)
+        tmp_path = self.bitfile_record_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(records, file, indent=2)
+        os.replace(tmp_path, self.bitfile_record_path)
+
+    def _forget_bitfile(self, file=None):
+        """Remove the fast_start record of this board, if there is one."""
+
+        try:
+            with _bitfile_record_lock:
+                records = self._read_bitfile_record()
+                if records.pop(self.device_info.serialNumber, None) is not None:
+                    self._write_bitfile_record(records)
+        except OSError as e:
+            print('Could not update the loaded bit-file record:', e, file=file)
+
+    def _record_bitfile(self, file=None):
+        """Record self.bitfile as loaded on this board for fast_start."""
+
+        if 'BITFILE_VERSION' in self.endpoints:
+            self._wire_outs_time = None
+            self.bitfile_version = self.read_wire(self.endpoints['BITFILE_VERSION'].address)
+        try:
+            with _bitfile_record_lock:
+                records = self._read_bitfile_record()
+                records[self.device_info.serialNumber] = {
+                    'bitfile': os.path.abspath(self.bitfile),
+                    'sha256': hash_bitfile(self.bitfile),
+                    'bitfile_version': self.bitfile_version,
+                }
+                self._write_bitfile_record(records)
+        except OSError as e:
+            print('Could not record the loaded bit-file:', e, file=file)
+
+    def enable_instrumentation(self, report_interval=None, file=None):
+        """Record the count, bytes, and latency of every xem call.
+
+        Calls are grouped by API method, endpoint address, and the calling
+        pyripherals method. Stays enabled across init_device.
+
+        Parameters
+        ----------
+        report_interval : float
+            Seconds between text reports printed as calls are made. None
+            (default) for no periodic reports.
+        file : file object
+            Where periodic reports are printed. Defaults to sys.stdout.
+
+        Returns
+        -------
+        Instrumentation
+            The statistics, also kept in the instrumentation attribute.
+        """
+
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation()
+        self.instrumentation.report_interval = report_interval
+        self.instrumentation.file = file
+        xem = getattr(self, 'xem', None)
+        if xem is not None and not any(isinstance(w, InstrumentedFrontPanel) for w in self._xem_wrappers()):
+            self.xem = InstrumentedFrontPanel(xem, self.instrumentation)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        """Stop recording xem calls and return the statistics recorded."""
+
+        instrumentation = self.instrumentation
+        for wrapper in self._xem_wrappers():
+            if isinstance(wrapper, InstrumentedFrontPanel):
+                self._remove_xem_wrapper(wrapper)
+        self.instrumentation = None
+        return instrumentation
+
+    def _xem_wrappers(self):
+        """Return the wrappers (InstrumentedFrontPanel, TraceRecorder) around the okCFrontPanel, outermost first."""
+
+        wrappers = []
+        xem = getattr(self, 'xem', None)
+        while isinstance(xem, (InstrumentedFrontPanel, TraceRecorder)):
+            wrappers.append(xem)
+            xem = xem.__dict__['_xem']
+        return wrappers
+
+    def _remove_xem_wrapper(self, wrapper):
+        """Take wrapper out of the chain of wrappers around the okCFrontPanel."""
+
+        inner = wrapper.__dict__['_xem']
+        if self.xem is wrapper:
+            self.xem = inner
+            return
+        for outer in self._xem_wrappers():
+            if outer.__dict__['_xem'] is wrapper:
+                outer.attach(inner)
+                return
+
+    def start_trace(self, path, read_payloads=True, write_payloads=False):
+        """Record every xem call to a trace file for pyripherals.trace.TraceReplay.
+
+        Call before init_device to record the whole session.
+
+        Parameters
+        ----------
+        path : str
+            Trace file to write.
+        read_payloads : bool
+            Whether to record the data of pipe reads. Needed to replay reads.
+        write_payloads : bool
+            Whether to record the data of pipe writes, otherwise only a digest.
+
+        Returns
+        -------
+        TraceRecorder
+            The recorder, also kept in the trace attribute.
+        """
+
+        self.stop_trace()
+        xem = getattr(self, 'xem', None)
+        self.trace = TraceRecorder(xem, path, read_payloads=read_payloads, write_payloads=write_payloads)
+        if xem is not None:
+            self.xem = self.trace
+        return self.trace
+
+    def stop_trace(self):
+        """Stop recording xem calls and close the trace file."""
+
+        if self.trace is None:
+            return
+        self.trace.close()
+        if any(wrapper is self.trace for wrapper in self._xem_wrappers()):
+            self._remove_xem_wrapper(self.trace)
+        self.trace = None
+
+    def read_pipe_out(self, addr, data_len=1024, buf=None):
         """Return the filled buffer and error code after reading an OK PipeOut.
             data_len is length in bytes (must be multiple of 16)
-            returns: bytearray; error code
+            buf is a writable buffer (bytearray, memoryview, NumPy array) to
+                fill in place instead of a new bytearray of data_len bytes.
+                See buffer_pool for reusable bytearrays.
+            returns: bytearray (or buf); error code
         """
-        buf = bytearray(data_len)
+        if buf is None:
+            buf = bytearray(data_len)
+        self.flush()
         e = self.xem.ReadFromPipeOut(addr, buf)
         # print('read_pipe_out:', addr, buf)
 
@@ -597,63 +1788,184 @@ class FPGA:
             print('Error code {}'.format(e))
         return buf, e
 
+    def _write_wire_in(self, address, value, mask):
+        """Send a masked WireIn write, or stage it if inside a transaction.
+
+        A write that matches the WireIn shadow in every masked bit is dropped.
+        A staged write that would change a bit already staged with a different
+        value flushes the staged writes first, so pulses such as a set then a
+        clear of a reset bit still reach the FPGA as two separate updates.
+        """
+
+        known_value, known_mask = self._wire_in_shadow.get(address, (0, 0))
+        if self.skip_unchanged_wire_ins and (known_mask & mask) == mask and not ((known_value ^ value) & mask):
+            return self.xem.NoError
+        self._wire_in_shadow[address] = ((known_value & ~mask) | (value & mask), known_mask | mask)
+
+        if self._transaction_depth == 0:
+            error_code = self.xem.SetWireInValue(address, value, mask)
+            self.xem.UpdateWireIns()
+            self._wire_outs_time = None
+            return error_code
+
+        pending = self._pending_wire_ins.get(address)
+        if pending is not None and ((pending[0] ^ value) & pending[1] & mask):
+            self.flush()
+            pending = None
+        if pending is None:
+            self._pending_wire_ins[address] = (value & mask, mask)
+        else:
+            pending_value, pending_mask = pending
+            self._pending_wire_ins[address] = (
+                (pending_value & ~mask) | (value & mask), pending_mask | mask)
+        return self.xem.NoError
+
+    def flush(self):
+        """Send all staged WireIn writes with a single UpdateWireIns.
+
+        Returns
+        -------
+        int
+            The first error code from SetWireInValue, or NoError. NoError is
+            also returned when nothing was staged.
+        """
+
+        if not self._pending_wire_ins:
+            return self.xem.NoError
+
+        pending = self._pending_wire_ins
+        self._pending_wire_ins = {}
+        error_code = self.xem.NoError
+        for address, (value, mask) in pending.items():
+            e = self.xem.SetWireInValue(address, value, mask)
+            if e != self.xem.NoError and error_code == self.xem.NoError:
+                error_code = e
+        self.xem.UpdateWireIns()
+        self._wire_outs_time = None
+        return error_code
+
+    def get_wire_in_shadow(self):
+        """Return a copy of the host-side record of the WireIn values.
+
+        Returns
+        -------
+        dict
+            address -> (value, mask) pairs. Only bits set in mask have been
+            written since the shadow was last reset; the other bits of value
+            are 0 and unknown.
+        """
+
+        return dict(self._wire_in_shadow)
+
+    def reset_wire_in_shadow(self, address=None):
+        """Forget the recorded WireIn values so the next writes are all sent.
+
+        Called by init_device. Call it after anything that changes the WireIns
+        without going through this class, such as writing with xem directly.
+
+        Parameters
+        ----------
+        address : int
+            The WireIn address to forget. None forgets all of them.
+        """
+
+        if address is None:
+            self._wire_in_shadow.clear()
+        else:
+            self._wire_in_shadow.pop(address, None)
+
+    @contextmanager
+    def transaction(self):
+        """Context manager that coalesces WireIn writes into one UpdateWireIns.
+
+        Every set_wire, set_endpoint, clear_endpoint, set_wire_bit,
+        clear_wire_bit, and set_ep_simultaneous call inside the block is
+        staged on the host and sent together when the block exits. Staged
+        writes are also sent before any read, trigger, or pipe transfer made
+        through this class so the FPGA sees operations in order. Transactions
+        may be nested, only the outermost one flushes.
+
+        Example usage:
+            with fpga.transaction():
+                ddr.clear_dac_read()
+                ddr.clear_adc_write()
+        """
+
+        self._transaction_depth += 1
+        try:
+            yield self
+        finally:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.flush()
+
     def set_wire(self, address, value, mask=0xFFFFFFFF):
         """Return the error code after setting an OK WireIn value."""
         if self.debug:
             print(
                 f'set_wire(address={hex(address)}, value={hex(value)}, mask={hex(mask)})')
-        error_code = self.xem.SetWireInValue(address, value, mask)
-        self.xem.UpdateWireIns()
-        return error_code
+        return self._write_wire_in(address, value, mask)
+
+    def refresh(self):
+        """Update the host copy of all WireOuts with one UpdateWireOuts."""
+
+        self.flush()
+        self.xem.UpdateWireOuts()
+        self._wire_outs_time = time.monotonic()
+
+    def _update_wire_outs(self):
+        """Refresh the WireOut snapshot unless it is younger than wire_out_max_age.
+
+        Any WireIn update or TriggerIn sent through this class invalidates the
+        snapshot because it may change what the FPGA reports.
+        """
+
+        self.flush()
+        if (self.wire_out_max_age is None or self._wire_outs_time is None
+                or time.monotonic() - self._wire_outs_time > self.wire_out_max_age):
+            self.refresh()
 
     def read_wire(self, address):
         """Return the read data after reading an OK WireOut."""
 
-        self.xem.UpdateWireOuts()
+        self._update_wire_outs()
         return self.xem.GetWireOutValue(address)
 
     def set_endpoint(self, ep_bit):
         """Set all bits in an Endpoint high."""
 
-        mask = gen_mask(
-            list(range(ep_bit.bit_index_low, ep_bit.bit_index_high + 1)))
+        mask = ep_bit.span_mask
         if self.debug:
             print(
                 f'set_endpoint(address={hex(ep_bit.address)}, value={hex(mask)}, mask={hex(mask)})')
-        self.xem.SetWireInValue(ep_bit.address, mask, mask)  # set
-        self.xem.UpdateWireIns()
+        self._write_wire_in(ep_bit.address, mask, mask)  # set
 
     def clear_endpoint(self, ep_bit):
         """Set all bits in an Endpoint low."""
 
-        mask = gen_mask(
-            list(range(ep_bit.bit_index_low, ep_bit.bit_index_high + 1)))
+        mask = ep_bit.span_mask
         if self.debug:
             print(
                 f'clear_endpoint(address={hex(ep_bit.address)}, value={hex(0)}, mask={hex(mask)})')
-        self.xem.SetWireInValue(ep_bit.address, 0x0000, mask)  # clear
-        self.xem.UpdateWireIns()
+        self._write_wire_in(ep_bit.address, 0x0000, mask)  # clear
 
     def toggle_low(self, ep_bit):
         """Toggle all bits in an Endpoint low then back to high."""
 
-        mask = gen_mask(
-            list(range(ep_bit.bit_index_low, ep_bit.bit_index_high + 1)))
-        self.xem.SetWireInValue(
-            ep_bit.address, 0x0000, mask)  # toggle low
-        self.xem.UpdateWireIns()
-        self.xem.SetWireInValue(ep_bit.address, mask, mask)   # back high
-        self.xem.UpdateWireIns()
+        mask = ep_bit.span_mask
+        self._write_wire_in(ep_bit.address, 0x0000, mask)  # toggle low
+        self.flush()
+        self._write_wire_in(ep_bit.address, mask, mask)   # back high
+        self.flush()
 
     def toggle_high(self, ep_bit):
         """Toggle all bits in an Endpoint high then back to low."""
 
-        mask = gen_mask(
-            list(range(ep_bit.bit_index_low, ep_bit.bit_index_high + 1)))
-        self.xem.SetWireInValue(ep_bit.address, mask, mask)  # toggle high
-        self.xem.UpdateWireIns()
-        self.xem.SetWireInValue(ep_bit.address, 0x0000, mask)   # back low
-        self.xem.UpdateWireIns()
+        mask = ep_bit.span_mask
+        self._write_wire_in(ep_bit.address, mask, mask)  # toggle high
+        self.flush()
+        self._write_wire_in(ep_bit.address, 0x0000, mask)   # back low
+        self.flush()
 
     def send_trig(self, ep_bit):
         """Return the error code after activating an OK TriggerIn Endpoint.
@@ -663,9 +1975,64 @@ class FPGA:
         """
 
         # print(f'send_trig(address={hex(ep_bit.address)},bit={ep_bit.bit_index_low})')
+        self.flush()
+        self._wire_outs_time = None
         return self.xem.ActivateTriggerIn(ep_bit.address, ep_bit.bit_index_low)
 
-    def read_trig(self, ep_bit):
+    def update_trigger_outs(self):
+        """Call UpdateTriggerOuts and latch every watched TriggerOut that fired.
+
+        Each UpdateTriggerOuts replaces the FrontPanel copy of the
+        TriggerOuts, so an edge that is not checked before the next update is
+        lost. Watched bits (any bit passed to read_trig or read_trigs) that
+        fired are kept here until a caller reads them.
+        """
+
+        self.flush()
+        self.xem.UpdateTriggerOuts()
+        for address, mask in self._trigger_out_watch.items():
+            if not self.xem.IsTriggered(address, mask):
+                continue
+            bits = mask
+            while bits:
+                bit = bits & -bits  # Lowest set bit
+                if self.xem.IsTriggered(address, bit):
+                    self._trigger_out_pending[address] = self._trigger_out_pending.get(address, 0) | bit
+                bits ^= bit
+
+    def read_trigs(self, ep_bits, update=True):
+        """Read several OK TriggerOut Endpoints from a single update.
+
+        Reading a TriggerOut consumes its latched edge. Edges of other
+        watched TriggerOuts stay pending until they are read.
+
+        Parameters
+        ----------
+        ep_bits : list of Endpoint
+            The endpoints containing the bit_index_low and address of the
+            TriggerOuts to read.
+        update : bool
+            Whether to call update_trigger_outs first. False only returns
+            edges latched by earlier updates.
+
+        Returns
+        -------
+        list of bool
+            Whether each TriggerOut has been triggered, in the order of ep_bits.
+        """
+
+        for ep_bit in ep_bits:
+            self._trigger_out_watch[ep_bit.address] = (self._trigger_out_watch.get(ep_bit.address, 0)
+                                                       | (1 << ep_bit.bit_index_low))
+        if update:
+            self.update_trigger_outs()
+
+        triggered = [bool(self._trigger_out_pending.get(ep_bit.address, 0) & (1 << ep_bit.bit_index_low))
+                     for ep_bit in ep_bits]
+        self.clear_trigs(ep_bits)
+        return triggered
+
+    def read_trig(self, ep_bit, update=True):
         """Read an OK TriggerOut Endpoint.
         
         Parameters
@@ -673,6 +2040,8 @@ class FPGA:
         ep_bit : Endpoint
             The endpoint containing the bit_index_low and address of the
             TriggerOut to read.
+        update : bool
+            Whether to call update_trigger_outs first.
 
         Returns
         -------
@@ -680,12 +2049,85 @@ class FPGA:
             Whether the TriggerOut has been triggered.
         """
 
-        self.xem.UpdateTriggerOuts()
-        return self.xem.IsTriggered(ep_bit.address, (1 << ep_bit.bit_index_low))
+        return self.read_trigs([ep_bit], update=update)[0]
+
+    def clear_trigs(self, ep_bits=None):
+        """Discard latched TriggerOut edges.
+
+        Parameters
+        ----------
+        ep_bits : list of Endpoint
+            The TriggerOuts to discard. None discards all of them.
+        """
+
+        if ep_bits is None:
+            self._trigger_out_pending.clear()
+            return
+        for ep_bit in ep_bits:
+            pending = self._trigger_out_pending.get(ep_bit.address)
+            if pending is not None:
+                self._trigger_out_pending[ep_bit.address] = pending & ~(1 << ep_bit.bit_index_low)
+
+    def wait_for(self, condition, timeout=1.0, spin_time=None, initial_delay=None, max_delay=None):
+        """Wait until a TriggerOut fires, a WireOut is set, or a function returns True.
+
+        Polls without sleeping for spin_time, then sleeps between polls for
+        initial_delay, doubling up to max_delay.
+
+        Parameters
+        ----------
+        condition : Endpoint or callable
+            A TriggerOut Endpoint (checked with read_trig), a WireOut Endpoint
+            (met when any of its bits is 1), or a function of no arguments
+            returning True when the wait is over.
+        timeout : float
+            Seconds to wait before raising FPGATimeoutError.
+        spin_time : float
+            Defaults to wait_spin_time.
+        initial_delay : float
+            Defaults to wait_initial_delay.
+        max_delay : float
+            Defaults to wait_max_delay.
+
+        Returns
+        -------
+        float
+            Seconds waited.
+        """
+
+        if isinstance(condition, Endpoint):
+            ep_bit = condition
+            if 0x60 <= ep_bit.address < 0x80:
+                def check():
+                    return self.read_trig(ep_bit)
+            else:
+                mask = 0xFFFFFFFF if ep_bit.mask is None else ep_bit.mask
+
+                def check():
+                    # Every poll must see a new WireOut value
+                    self._wire_outs_time = None
+                    return bool(self.read_wire(ep_bit.address) & mask)
+        else:
+            check = condition
+        spin_time = self.wait_spin_time if spin_time is None else spin_time
+        delay = self.wait_initial_delay if initial_delay is None else initial_delay
+        max_delay = self.wait_max_delay if max_delay is None else max_delay
+
+        self.flush()
+        start = time.perf_counter()
+        while True:
+            if check():
+                return time.perf_counter() - start
+            elapsed = time.perf_counter() - start
+            if elapsed >= timeout:
+                raise FPGATimeoutError(f'Condition not met after {elapsed:.6f} s: {condition}')
+            if elapsed >= spin_time:
+                time.sleep(min(delay, timeout - elapsed))
+                delay = min(delay * 2, max_delay)
 
     def read_ep(self, ep_bit):
         """Return the error code after reading an OK WireOut Endpoint."""
-        self.xem.UpdateWireOuts()
+        self._update_wire_outs()
         read_out = self.xem.GetWireOutValue(ep_bit.address)
         return read_out
 
@@ -725,6 +2167,105 @@ class FPGA:
         return (value & (1 << bit)) >> bit
 
 
+class FPGAPool:
+    """Several Opal Kelly FPGAs on one host, opened by serial number and
+    brought up in parallel.
+
+    Each FPGA gets its own copy of the endpoints so peripherals on one board
+    do not share Endpoint objects with another.
+
+    Attributes
+    ----------
+    fpgas : dict
+        Serial number -> FPGA.
+    max_workers : int or None
+        Threads used by init_devices and map. None for one per FPGA.
+    """
+
+    def __init__(self, serials=None, bitfile='default', endpoints=None, frontpanel=None, max_workers=None, **kwargs):
+        """Make an FPGA for each serial number. Other keyword arguments are passed to FPGA.
+
+        Parameters
+        ----------
+        serials : list
+            Serial numbers of the devices to use. None (default) for every
+            connected device.
+        bitfile : str or dict
+            Bitfile for every FPGA, or a dict of serial number -> bitfile.
+        endpoints : dict
+            GP endpoints, copied for each FPGA. None for
+            Endpoint.get_chip_endpoints('GP').
+        frontpanel : module or None
+            See FPGA.
+        """
+
+        if serials is None:
+            serials = FPGAPool.list_serials(frontpanel)
+        self.max_workers = max_workers
+        self.fpgas = {}
+        for serial in serials:
+            fpga_bitfile = bitfile.get(serial, 'default') if isinstance(bitfile, dict) else bitfile
+            fpga_endpoints = Endpoint.get_chip_endpoints('GP') if endpoints is None else copy.deepcopy(endpoints)
+            self.fpgas[serial] = FPGA(bitfile=fpga_bitfile, endpoints=fpga_endpoints, frontpanel=frontpanel,
+                                      serial=serial, **kwargs)
+
+    @staticmethod
+    def list_serials(frontpanel=None):
+        """Return the serial numbers of all connected devices."""
+
+        if frontpanel is None:
+            frontpanel = ok
+        xem = frontpanel.okCFrontPanel()
+        return [xem.GetDeviceListSerial(i) for i in range(xem.GetDeviceCount())]
+
+    def __getitem__(self, serial):
+        return self.fpgas[serial]
+
+    def __iter__(self):
+        return iter(self.fpgas.values())
+
+    def __len__(self):
+        return len(self.fpgas)
+
+    def map(self, func, parallel=True):
+        """Call func(fpga) for every FPGA and return serial number -> result.
+
+        Use to make the peripherals of each board, e.g.
+        pool.map(lambda f: DDR3(f)).
+        """
+
+        if not parallel:
+            return {serial: func(fpga) for serial, fpga in self.fpgas.items()}
+        with ThreadPoolExecutor(max_workers=self.max_workers or max(len(self.fpgas), 1)) as executor:
+            futures = {serial: executor.submit(func, fpga) for serial, fpga in self.fpgas.items()}
+            return {serial: future.result() for serial, future in futures.items()}
+
+    def init_devices(self, quiet=False):
+        """Open, configure, and initialize every FPGA at the same time.
+
+        The messages of each init_device are collected and printed together
+        per device once all are done, so they do not interleave.
+
+        Parameters
+        ----------
+        quiet : bool
+            True to not print the messages.
+
+        Returns
+        -------
+        dict
+            Serial number -> the FPGA, or False if its init_device failed.
+        """
+
+        messages = {serial: io.StringIO() for serial in self.fpgas}
+        results = self.map(lambda fpga: fpga.init_device(file=messages[fpga.serial]))
+        if not quiet:
+            for serial, output in messages.items():
+                print(f'--- {serial} ---')
+                print(output.getvalue(), end='')
+        return results
+
+
 # TODO: should there be a 'device' or similar class that all controllers are subclasses of?
 def disp_device(dev, reg=True):
     """Display endpoints and registers for a chip.
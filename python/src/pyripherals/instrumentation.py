@@ -0,0 +1,250 @@
+"""Count and time the Opal Kelly API calls made through an FPGA.
+
+Enable with FPGA.enable_instrumentation(). Every xem call is then recorded by
+API method, endpoint address, and the pyripherals method that made it (the
+outermost pyripherals method on the call stack, e.g. TCA9555.write or
+DDR3.read_adc).
+
+Abe Stroschein, ajstroschein@stthomas.edu
+
+Lucas Koerner, koer2434@stthomas.edu
+"""
+
+import gc
+import os
+import sys
+import time
+from bisect import bisect_right
+
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Upper edges of the latency histogram bins in seconds: 1 us, 2 us, 4 us, ... 8.4 s
+HISTOGRAM_EDGES = [1e-6 * 2**i for i in range(24)]
+
+# API methods whose first argument is an endpoint address
+ADDRESS_METHODS = {
+    'SetWireInValue', 'GetWireInValue', 'GetWireOutValue', 'ActivateTriggerIn', 'IsTriggered',
+    'ReadFromPipeOut', 'ReadFromBlockPipeOut', 'WriteToPipeIn', 'WriteToBlockPipeIn',
+    'WriteRegister', 'ReadRegister',
+}
+
+# API methods that move a data buffer
+DATA_METHODS = {'ReadFromPipeOut', 'ReadFromBlockPipeOut', 'WriteToPipeIn', 'WriteToBlockPipeIn'}
+
+
+class CallStats:
+    """Count, bytes moved, and latency of a set of calls.
+
+    Attributes
+    ----------
+    count : int
+        Number of calls.
+    bytes : int
+        Pipe data bytes moved by the calls.
+    total_time : float
+        Sum of call latencies in seconds.
+    max_time : float
+        Longest call latency in seconds.
+    histogram : list
+        Number of calls with latency up to each edge of HISTOGRAM_EDGES. The
+        last entry counts calls longer than the last edge.
+    """
+
+    __slots__ = ('count', 'bytes', 'total_time', 'max_time', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_EDGES) + 1)
+
+    def add(self, num_bytes, seconds):
+        self.count += 1
+        self.bytes += num_bytes
+        self.total_time += seconds
+        if seconds > self.max_time:
+            self.max_time = seconds
+        self.histogram[bisect_right(HISTOGRAM_EDGES, seconds)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.bytes += other.bytes
+        self.total_time += other.total_time
+        self.max_time = max(self.max_time, other.max_time)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'bytes': self.bytes,
+            'total_time': self.total_time,
+            'mean_time': self.total_time / self.count if self.count else 0.0,
+            'max_time': self.max_time,
+            'histogram': list(self.histogram),
+        }
+
+
+class Instrumentation:
+    """Statistics of the API calls made through an InstrumentedFrontPanel.
+
+    Attributes
+    ----------
+    stats : dict
+        (caller, method, address) -> CallStats. address is None for methods
+        without an endpoint address.
+    report_interval : float or None
+        Seconds between reports printed to file as calls are recorded. None
+        (default) to only report when report() is called.
+    file : file object
+        Where periodic reports are printed. None for sys.stdout.
+    """
+
+    def __init__(self, report_interval=None, file=None):
+        self.stats = {}
+        self.report_interval = report_interval
+        self.file = file
+        self._last_report = time.perf_counter()
+        self._caller_names = {}
+
+    def reset(self):
+        """Clear all recorded statistics."""
+
+        self.stats = {}
+        self._last_report = time.perf_counter()
+
+    def record(self, caller, method, address, num_bytes, seconds):
+        """Add one call to the statistics."""
+
+        key = (caller, method, address)
+        call_stats = self.stats.get(key)
+        if call_stats is None:
+            call_stats = self.stats[key] = CallStats()
+        call_stats.add(num_bytes, seconds)
+
+        if self.report_interval is not None:
+            now = time.perf_counter()
+            if now - self._last_report >= self.report_interval:
+                self._last_report = now
+                print(self.report(), file=sys.stdout if self.file is None else self.file)
+
+    def caller(self, frame):
+        """Return the name of the outermost pyripherals method calling from frame."""
+
+        name = None
+        while frame is not None:
+            code = frame.f_code
+            if not code.co_filename.startswith(PACKAGE_DIR):
+                break
+            name = self._caller_names.get(code)
+            if name is None:
+                name = self._name(code)
+            frame = frame.f_back
+        if name is None:
+            # Called directly from outside pyripherals
+            return self._name(frame.f_code) if frame is not None else '<unknown>'
+        return name
+
+    def _name(self, code):
+        """Return and cache the qualified name of the function of code."""
+
+        name = getattr(code, 'co_qualname', None)
+        if name is None:
+            # Before Python 3.11, look up the function of the code once
+            functions = [f for f in gc.get_referrers(code) if getattr(f, '__code__', None) is code]
+            name = functions[0].__qualname__ if functions else code.co_name
+        self._caller_names[code] = name
+        return name
+
+    def _group(self, key_index):
+        grouped = {}
+        for key, call_stats in self.stats.items():
+            group = grouped.setdefault(key[key_index], CallStats())
+            group.merge(call_stats)
+        return grouped
+
+    def as_dict(self):
+        """Return the statistics grouped by method, by address, and by caller.
+
+        Returns
+        -------
+        dict
+            'method': {method: stats}, 'address': {address: stats}, and
+            'caller': {caller: {method: stats}}, where each stats is a dict of
+            count, bytes, total_time, mean_time, max_time, and histogram
+            (see CallStats).
+        """
+
+        by_caller = {}
+        for (caller, method, address), call_stats in self.stats.items():
+            group = by_caller.setdefault(caller, {}).setdefault(method, CallStats())
+            group.merge(call_stats)
+        return {
+            'method': {k: v.as_dict() for k, v in self._group(1).items()},
+            'address': {k: v.as_dict() for k, v in self._group(2).items() if k is not None},
+            'caller': {c: {m: v.as_dict() for m, v in methods.items()} for c, methods in by_caller.items()},
+        }
+
+    def report(self):
+        """Return a text table of the statistics by caller and method."""
+
+        lines = [f'{"caller":<40} {"method":<24} {"count":>8} {"bytes":>12} {"total ms":>10} {"mean us":>9} {"max us":>9}']
+        by_caller = {}
+        for (caller, method, address), call_stats in self.stats.items():
+            by_caller.setdefault((caller, method), CallStats()).merge(call_stats)
+        for (caller, method), call_stats in sorted(by_caller.items(), key=lambda item: -item[1].total_time):
+            lines.append(f'{caller:<40} {method:<24} {call_stats.count:>8} {call_stats.bytes:>12} '
+                         f'{call_stats.total_time*1e3:>10.3f} {call_stats.total_time/call_stats.count*1e6:>9.1f} '
+                         f'{call_stats.max_time*1e6:>9.1f}')
+        return '\n'.join(lines)
+
+
+class InstrumentedFrontPanel:
+    """Wrapper for an okCFrontPanel that records every call in an Instrumentation.
+
+    Attributes are passed through to the wrapped okCFrontPanel, so it can be
+    used in its place.
+    """
+
+    def __init__(self, xem, instrumentation):
+        self.__dict__['_xem'] = xem
+        self.__dict__['_instrumentation'] = instrumentation
+
+    def __getattr__(self, name):
+        attr = getattr(self._xem, name)
+        if not callable(attr):
+            return attr
+
+        instrumentation = self._instrumentation
+        is_address_method = name in ADDRESS_METHODS
+        is_data_method = name in DATA_METHODS
+
+        def wrapped(*args, **kwargs):
+            start = time.perf_counter()
+            result = attr(*args, **kwargs)
+            seconds = time.perf_counter() - start
+
+            address = None
+            if is_address_method:
+                address = args[0] if args else kwargs.get('epAddr', kwargs.get('ep', kwargs.get('addr')))
+            num_bytes = 0
+            if is_data_method:
+                data = args[-1] if args else kwargs.get('data')
+                num_bytes = len(memoryview(data).cast('B'))
+            instrumentation.record(instrumentation.caller(sys._getframe(1)), name, address, num_bytes, seconds)
+            return result
+
+        # Cache so later lookups skip __getattr__
+        self.__dict__[name] = wrapped
+        return wrapped
+
+    def attach(self, xem):
+        """Record the calls to xem from now on."""
+
+        for name in [k for k, v in self.__dict__.items() if callable(v)]:
+            del self.__dict__[name]
+        self.__dict__['_xem'] = xem
+
+    def __setattr__(self, name, value):
+        setattr(self._xem, name, value)
@@ -0,0 +1,154 @@
+"""Streaming digital lock-in amplifier for ADC data read from the DDR.
+
+LockIn measures the amplitude and phase of a signal at a reference frequency,
+such as the frequency of a DDR3 sine wave. Each chunk of samples is mixed with
+the reference, low-pass filtered, and decimated. The reference phase, filter
+state, and decimation position carry over between chunks, so a stream can be
+processed one read at a time, in fixed memory, with the same results as
+processing the whole record at once:
+
+    lockin = LockIn.from_ddr3(frequency=20e3, source='ADS8686', time_constant=1e-3)
+    while True:
+        adc_data, timestamp, dac_data, ads, ads_seq_cnt, error = ddr.data_to_names(
+            ddr.deswizzle(ddr.read_adc(blk_multiples=40)[0]))
+        times, iq = lockin.process(ads)
+        print(np.abs(iq['A'][-1]), np.angle(iq['B'][-1] / iq['A'][-1]))
+
+Abe Stroschein, ajstroschein@stthomas.edu
+
+Lucas Koerner, koer2434@stthomas.edu
+"""
+
+import numpy as np
+from scipy.signal import sosfilt
+from .peripherals.DDR3 import DDR3
+
+
+# Sample period of each ADC in the data from DDR3.data_to_names
+SOURCE_PERIODS = {
+    'AD7961': DDR3.ADC_PERIOD,  # adc_data, 5 MSPS
+    'ADS8686': 5 * DDR3.ADC_PERIOD,  # ads, 1 MSPS
+}
+
+
+class LockIn:
+    """Streaming lock-in amplifier at one reference frequency.
+
+    The outputs are I/Q estimates as complex numbers, I + jQ. For a signal
+    A * cos(2 * pi * frequency * t + phi) the output settles to
+    A * exp(j * (phi - phase)) in the units of the data, so np.abs gives the
+    amplitude and np.angle the phase. The low-pass filter is a cascade of
+    order identical single pole filters, so the outputs take several
+    time_constants to settle after the first chunk.
+
+    Attributes
+    ----------
+    frequency : float
+        The reference frequency in Hertz.
+    fs : float
+        The sample rate of the data in Hertz.
+    time_constant : float
+        The time constant of each pole of the low-pass filter in seconds.
+    order : int
+        The number of poles of the low-pass filter.
+    decimation : int
+        Number of input samples per output.
+    phase : float
+        Phase of the reference in radians at the first sample.
+    samples : int
+        Number of samples per channel processed so far.
+    """
+
+    def __init__(self, frequency, fs, time_constant=1e-3, order=4, decimation=None, phase=0.0):
+        if not 0 < frequency < fs / 2:
+            raise ValueError(f'LockIn frequency {frequency} Hz must be between 0 and fs/2 = {fs / 2} Hz')
+        self.frequency = frequency
+        self.fs = fs
+        self.time_constant = time_constant
+        self.order = order
+        if decimation is None:
+            # About 10 outputs per time constant
+            decimation = max(1, int(fs * time_constant / 10))
+        self.decimation = decimation
+        self.phase = phase
+
+        alpha = np.exp(-1 / (time_constant * fs))
+        self._sos = np.tile([1 - alpha, 0, 0, 1, -alpha, 0], (order, 1))
+        self.reset()
+
+    @classmethod
+    def from_ddr3(cls, frequency, source='ADS8686', **kwargs):
+        """Return a LockIn for data_to_names data of source at a DDR3 sine wave frequency.
+
+        The frequency is changed to DDR3.closest_frequency(frequency), the
+        frequency of the sine wave made by DDR3.make_sine_wave.
+
+        Parameters
+        ----------
+        frequency : float
+            The requested frequency of the DDR3 sine wave in Hertz.
+        source : str
+            'ADS8686' for the ads data or 'AD7961' for the adc_data.
+        **kwargs
+            Other LockIn arguments.
+        """
+
+        if source not in SOURCE_PERIODS:
+            raise ValueError(f'Unknown source "{source}", use one of {list(SOURCE_PERIODS)}')
+        ddr_frequency = DDR3.closest_frequency(frequency)
+        if ddr_frequency is None:
+            raise ValueError(f'Frequency {frequency} Hz is too high for the DDR update rate')
+        return cls(frequency=ddr_frequency, fs=1 / SOURCE_PERIODS[source], **kwargs)
+
+    def reset(self):
+        """Start over as if no samples were processed."""
+
+        self.samples = 0
+        # Reference phase at the next sample in turns, filter state, and
+        # index in the next chunk of the next output
+        self._turns = (self.phase / (2 * np.pi)) % 1
+        self._zi = None
+        self._next = 0
+
+    def process(self, data):
+        """Process the next chunk of samples.
+
+        Parameters
+        ----------
+        data : np.ndarray or list or dict
+            The next samples, either one channel, an array of shape
+            (channels, samples), or a dict of equal length channels such as
+            the ads or adc_data from DDR3.data_to_names. Each call must have
+            the same channels.
+
+        Returns
+        -------
+        times : np.ndarray
+            The time in seconds of each output, measured from the first
+            sample processed.
+        iq : np.ndarray(complex) or dict
+            The I/Q outputs, I + jQ, in the same form as data.
+        """
+
+        if isinstance(data, dict):
+            times, iq = self.process(np.vstack(list(data.values())))
+            return times, dict(zip(data, iq))
+
+        data = np.asarray(data, dtype=np.float64)
+        n = data.shape[-1]
+        if self._zi is None:
+            self._zi = np.zeros((self.order,) + data.shape[:-1] + (2,), dtype=complex)
+        if n == 0:
+            return np.empty(0), np.empty(data.shape, dtype=complex)
+
+        # Twice the reference so the outputs are amplitudes
+        step = self.frequency / self.fs
+        mixed = data * (2 * np.exp(-2j * np.pi * (self._turns + step * np.arange(n))))
+        filtered, self._zi = sosfilt(self._sos, mixed, axis=-1, zi=self._zi)
+
+        iq = filtered[..., self._next::self.decimation]
+        times = (self.samples + self._next + self.decimation * np.arange(iq.shape[-1])) / self.fs
+        self._next = (self._next - n) % self.decimation
+        self.samples += n
+        self._turns = (self._turns + step * n) % 1
+        return times, iq
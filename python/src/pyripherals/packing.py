@@ -0,0 +1,149 @@
+"""Pack integers into bytes for I2C writes, EEPROM images, and pipe payloads.
+
+pack_int converts one integer with int.to_bytes. pack_array converts a whole
+array of integers in one NumPy step by viewing it as bytes, so building a
+large payload does not loop in Python.
+
+Abe Stroschein, ajstroschein@stthomas.edu
+
+Lucas Koerner, koer2434@stthomas.edu
+"""
+
+import numpy as np
+
+
+# Output types: 'list' of ints, 'bytes', 'bytearray', or 'array' (NumPy uint8)
+OUTPUTS = ('list', 'bytes', 'bytearray', 'array')
+
+
+def _check(byteorder, out):
+    if byteorder not in ('little', 'big'):
+        raise ValueError(f'Unknown byteorder "{byteorder}", use "little" or "big"')
+    if out not in OUTPUTS:
+        raise ValueError(f'Unknown out "{out}", use one of {OUTPUTS}')
+
+
+def _convert(data, out):
+    """Return bytes data as out."""
+
+    if out == 'bytes':
+        return data
+    if out == 'bytearray':
+        return bytearray(data)
+    if out == 'list':
+        return list(data)
+    return np.frombuffer(data, dtype=np.uint8).copy()
+
+
+def pack_int(integer, num_bytes=None, byteorder='little', out='list'):
+    """Convert a non-negative integer to bytes.
+
+    Parameters
+    ----------
+    integer : int
+        The integer to convert.
+    num_bytes : int
+        The number of bytes to convert the integer into. None means the
+        minimum number of bytes necessary to represent it (at least 1).
+    byteorder : str
+        Either 'little' for little Endian (LSB first) or 'big' for big Endian
+        (MSB first).
+    out : str
+        'list' of ints, 'bytes', 'bytearray', or 'array' for a NumPy uint8
+        array.
+
+    Returns
+    -------
+    list, bytes, bytearray, numpy.ndarray, or bool
+        The bytes, or False if the integer does not fit in num_bytes.
+    """
+
+    _check(byteorder, out)
+    integer = int(integer)
+    if integer < 0:
+        return False
+    min_bytes = max((integer.bit_length() + 7) // 8, 1)
+    if num_bytes is None:
+        num_bytes = min_bytes
+    elif num_bytes < min_bytes:
+        return False
+    return _convert(integer.to_bytes(num_bytes, byteorder), out)
+
+
+def pack_array(values, num_bytes, byteorder='little', out='bytes'):
+    """Convert each integer of an array to num_bytes bytes, concatenated.
+
+    Parameters
+    ----------
+    values : array_like
+        Non-negative integers to convert.
+    num_bytes : int
+        Bytes for each integer, 1 to 8.
+    byteorder : str
+        Either 'little' or 'big', the order of the bytes of each integer.
+    out : str
+        'bytes', 'bytearray', 'list' of ints, or 'array' for a NumPy uint8
+        array.
+
+    Returns
+    -------
+    bytes, bytearray, list, numpy.ndarray, or bool
+        len(values) * num_bytes bytes, or False if any integer does not fit
+        in num_bytes.
+    """
+
+    _check(byteorder, out)
+    if not 1 <= num_bytes <= 8:
+        raise ValueError(f'num_bytes must be 1 to 8, not {num_bytes}')
+    if not isinstance(values, np.ndarray):
+        try:
+            values = np.array(values, dtype=np.int64)
+        except OverflowError:
+            # Python ints past the int64 range
+            try:
+                values = np.array(values, dtype=np.uint64)
+            except OverflowError:
+                return False
+    if values.dtype.kind not in 'iub':
+        values = values.astype(np.int64)
+    if values.size and not (values.dtype.kind in 'ub' and values.dtype.itemsize <= num_bytes):
+        if values.dtype.kind == 'i' and values.min() < 0:
+            return False
+        if num_bytes < 8 and int(values.max()) >> (8 * num_bytes):
+            return False
+
+    order = '<' if byteorder == 'little' else '>'
+    if num_bytes in (1, 2, 4, 8):
+        data = values.astype(f'{order}u{num_bytes}', copy=False).reshape(-1)
+    else:
+        # Take the num_bytes low bytes of each 8 byte integer
+        columns = slice(0, num_bytes) if byteorder == 'little' else slice(8 - num_bytes, 8)
+        data = values.astype(f'{order}u8').reshape(-1, 1).view(np.uint8)[:, columns]
+    data = np.ascontiguousarray(data).view(np.uint8).reshape(-1)
+    if out == 'array':
+        # Do not return a view of values
+        return data.copy() if np.may_share_memory(data, values) else data
+    if out == 'list':
+        return data.tolist()
+    # bytes and bytearray copy through the buffer protocol
+    return bytes(data) if out == 'bytes' else bytearray(data)
+
+
+def unpack_array(data, num_bytes, byteorder='little'):
+    """Return the integers of num_bytes bytes each in data as a NumPy uint64 array.
+
+    The inverse of pack_array. Extra bytes at the end of data are ignored.
+    """
+
+    _check(byteorder, 'bytes')
+    if not 1 <= num_bytes <= 8:
+        raise ValueError(f'num_bytes must be 1 to 8, not {num_bytes}')
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    count = len(buffer) // num_bytes
+    order = '<' if byteorder == 'little' else '>'
+    if num_bytes in (1, 2, 4, 8):
+        return buffer[:count * num_bytes].view(f'{order}u{num_bytes}').astype(np.uint64)
+    padded = np.zeros((count, 8), dtype=np.uint8)
+    columns = slice(0, num_bytes) if byteorder == 'little' else slice(8 - num_bytes, 8)
+    padded[:, columns] = buffer[:count * num_bytes].reshape(count, num_bytes)
+    return padded.view(f'{order}u8').reshape(-1).astype(np.uint64)
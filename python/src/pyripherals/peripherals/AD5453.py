@@ -80,8 +80,7 @@ class AD5453(SPIFifoDriven):
         loop_thru = np.arange(self.filter_offset, 1
                               + self.filter_offset + self.filter_len)
 
-        # ok should already be imported from Endpoint import
-        regs = ok.okTRegisterEntries((len(loop_thru)))
+        regs = self.fpga.frontpanel.okTRegisterEntries((len(loop_thru)))
 
         for i in loop_thru:  # TODO is this correct? and how to parameterize?
             if (i-self.filter_offset) in self.filter_coeff:
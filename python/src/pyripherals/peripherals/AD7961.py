@@ -1,8 +1,6 @@
-from ..core import Endpoint
+from ..core import Endpoint, EndpointTable, FPGATimeoutError
 from ..utils import gen_mask
 from .ADCDATA import ADCDATA
-import copy
-import time
 
 class AD7961(ADCDATA):
     """An interface to the AD7961 ADC
@@ -44,11 +42,10 @@ class AD7961(ADCDATA):
         if endpoints is None:
             endpoints = Endpoint.endpoints_from_defines.get('AD7961')
 
-        chips = []
-        for i in range(number_of_chips):
-            # Use deepcopy here to keep the endpoints for different instances separate
-            chips.append(AD7961(fpga=fpga, endpoints=copy.deepcopy(endpoints)))
-            Endpoint.advance_endpoints(endpoints)
+        # Each instance is a view of the table, advanced from endpoints
+        table = EndpointTable(endpoints)
+        chips = [AD7961(fpga=fpga, endpoints=table.instance(i)) for i in range(number_of_chips)]
+        table.advance(endpoints, number_of_chips)
         return chips
 
     def get_status(self):
@@ -81,12 +78,8 @@ class AD7961(ADCDATA):
         """Get fullness status of the FIFO."""
 
         flags = ['FULL', 'HALFFULL', 'EMPTY']
-        fifo_status = {}
-        self.fpga.xem.UpdateTriggerOuts()
-        for k in flags:
-            fifo_status[k] = self.fpga.xem.IsTriggered(self.endpoints['FIFO_{}'.format(k)].address,
-                                                       self.endpoints['FIFO_{}'.format(k)].bit_index_low)
-        return fifo_status
+        triggered = self.fpga.read_trigs([self.endpoints['FIFO_{}'.format(k)] for k in flags])
+        return dict(zip(flags, triggered))
 
     # Enable pins:
     # 0000 - power down
@@ -127,8 +120,7 @@ class AD7961(ADCDATA):
     def reset_pll(self):
         """Reset the phase locked loop."""
 
-        return self.fpga.xem.ActivateTriggerIn(self.endpoints['PLL_RESET'].address,
-                                               self.endpoints['PLL_RESET'].bit_index_low)
+        return self.fpga.send_trig(self.endpoints['PLL_RESET'])
 
     def reset_trig(self):
         """Reset the FPGA controller for the ADC.
@@ -137,8 +129,7 @@ class AD7961(ADCDATA):
         ads8686 timing) 
         """
 
-        return self.fpga.xem.ActivateTriggerIn(self.endpoints['RESET'].address,
-                                               self.endpoints['RESET'].bit_index_low)
+        return self.fpga.send_trig(self.endpoints['RESET'])
 
     def reset_wire(self, value):
         """Set the value of the wire to reset the FPGA controller for the ADC.
@@ -209,13 +200,11 @@ class AD7961(ADCDATA):
         if reset_pll:
             # reset PLL
             self.reset_pll()
-            pll_cnt = 0
-            while not self.get_pll_status():
-                time.sleep(0.01)
-                pll_cnt += 1
-                if pll_cnt > 20:
-                    print('PLL lock timeout')
-                    return -1
+            try:
+                self.fpga.wait_for(self.endpoints['PLL_LOCKED'], timeout=0.2)
+            except FPGATimeoutError:
+                print('PLL lock timeout')
+                return -1
         # enable ADC
         self.power_up_adc()
         # now that PLL is locked and ADC is ready
@@ -1,5 +1,5 @@
 from ..core import Endpoint
-from ..utils import custom_signed_to_int
+from ..utils import sign_extend
 import numpy as np
 import time
 
@@ -34,15 +34,25 @@ class ADCDATA():
             c['B'] = d2
         return c
 
-    def convert_twos(self, d):
-        """Convert data to integer two's complement representation."""
+    def convert_twos(self, d, out=None):
+        """Convert data to integer two's complement representation.
 
-        return custom_signed_to_int(d, self.num_bits)
+        out is an optional signed integer array for the result, e.g.
+        d.view(np.int32) to convert uint32 data in place (see
+        utils.sign_extend). By default the result is the narrowest signed
+        dtype for num_bits.
+        """
+
+        return sign_extend(d, self.num_bits, out=out)
 
     def convert_data(self, buf):
         """Deswizle and convert the twos complement representation."""
 
-        return self.convert_twos(self.deswizzle(buf))
+        d = self.deswizzle(buf)
+        if type(d) is np.ndarray and d.dtype == np.uint32:
+            # deswizzle made a new array, convert it in place
+            return self.convert_twos(d, out=d.view(np.int32))
+        return self.convert_twos(d)
 
     # TODO: test composite ADC function that enables, reads, converts and plots
     # TODO: incorporate/connect QT graphing (UIscript.py)
@@ -60,8 +70,8 @@ class ADCDATA():
         # TODO: add method docstring
         print('ADC stream multiple')
         cnt = 0
-        st = bytearray(np.asarray(np.ones(0, np.uint8)))
-        self.fpga.xem.UpdateTriggerOuts()
+        st = bytearray(swps * data_len)
+        st_view = memoryview(st)
 
         start_time = time.time()
         timeout_time = 1*swps  # seconds
@@ -69,15 +79,13 @@ class ADCDATA():
 
         while ((cnt < swps) and timeout_flg):
             # check the FIFO half-full flag
-            if (self.fpga.xem.IsTriggered(self.endpoints['FIFO_HALFFULL'].address,
-                                          self.endpoints['FIFO_HALFFULL'].bit_index_low)):
-                s, e = self.fpga.read_pipe_out(self.endpoints['PIPE_OUT'].address,
-                                               data_len)
-                st += s
+            if self.fpga.read_trig(self.endpoints['FIFO_HALFFULL']):
+                # Read straight into this sweep's slice of st
+                self.fpga.read_pipe_out(self.endpoints['PIPE_OUT'].address,
+                                        buf=st_view[cnt * data_len:(cnt + 1) * data_len])
                 cnt = cnt + 1
                 if self.fpga.debug:
                     print(cnt)
-            self.fpga.xem.UpdateTriggerOuts()
             timeout_flg = (time.time() < (start_time + timeout_time))
         if not timeout_flg:
             print('ADC stream_mult timed out')
@@ -1,4 +1,4 @@
-from ..core import Endpoint, Register
+from ..core import Endpoint, ChipRegisters
 from ..utils import custom_signed_to_int
 from .SPIController import SPIController
 from .ADCDATA import ADCDATA
@@ -6,7 +6,7 @@ from .ADCDATA import ADCDATA
 class ADS8686(SPIController, ADCDATA):
     # TODO: add class docstring
 
-    registers = Register.get_chip_registers('ADS8686')
+    registers = ChipRegisters('ADS8686')
     msg_w = 0x8000
     range = {10:  0b00,
              2.5: 0b01,
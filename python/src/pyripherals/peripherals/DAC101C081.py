@@ -1,4 +1,4 @@
-from ..core import Register
+from ..core import ChipRegisters
 from .I2CController import I2CController
 
 
@@ -24,7 +24,7 @@ class DAC101C081(I2CController):
     # The device address table in the data sheet is strange
     # see here:
     #   https://e2e.ti.com/support/data-converters-group/data-converters/f/data-converters-forum/955893/dac101c081-dac101c081-i2c-address-selection
-    registers = Register.get_chip_registers('DAC101C081')
+    registers = ChipRegisters('DAC101C081')
     addr_pins = 0
     dac_res_bits = 10
 
@@ -1,5 +1,5 @@
-from ..core import Register
-from ..utils import int_to_list, from_voltage
+from ..core import ChipRegisters, ChipRegisterMap
+from ..utils import ChannelConverter
 from .I2CController import I2CController
 
 class DAC53401(I2CController):
@@ -15,13 +15,19 @@ class DAC53401(I2CController):
         to this chip. The rest is left as 0 to be filled in later.
     registers : dict
         Name-Register pairs for the internal registers of the TCA9555 chip.
+    register_map : RegisterMap
+        Packs and unpacks the fields of the 16-bit registers.
+    converter : ChannelConverter
+        Converts output voltages to 10-bit DAC_DATA codes.
     addr_pins : int
         3 LSBs of the 7-bit device address formed alongside the address header
         used to differentiate between different instances of the TCA9555 chip.
     """
 
     ADDRESS_HEADER = 0b10010000
-    registers = Register.get_chip_registers('DAC53401')
+    registers = ChipRegisters('DAC53401')
+    register_map = ChipRegisterMap(word_bytes=2, byte_order='big')
+    converter = ChannelConverter(num_bits=10, voltage_range=5)
 
     #        Address Pins Guide
     # Slave Address   |   A0 Pin
@@ -33,65 +39,55 @@ class DAC53401(I2CController):
     def write(self, data, register_name='DAC_DATA'):
         """Write data to any register on the chip."""
 
-        dev_addr = DAC53401.ADDRESS_HEADER | (self.addr_pins << 1)
-        register = DAC53401.registers[register_name]
-        data <<= register.bit_index_low
+        return self.write_fields({register_name: data})
+
+    def write_fields(self, values):
+        """Write several registers on the chip, one write per register word.
+
+        Reads the register words holding the fields so other fields keep
+        their values.
 
-        # Mask only the bits for the specified register.
-        mask = 0
-        for bit in range(register.bit_index_high, register.bit_index_low - 1, -1):
-            mask |= 0x1 << bit
+        Parameters
+        ----------
+        values : dict
+            Register name -> data.
+        """
 
-        # Compare with current data to mask unchanged values
-        read_out = self.read(register_name)
-        if read_out == None:
+        dev_addr = DAC53401.ADDRESS_HEADER | (self.addr_pins << 1)
+        # The chip takes one 16-bit register per transfer
+        words = self.i2c_read_words(dev_addr, self.register_map, self.register_map.addresses(values),
+                                    max_words=1)
+        if words is None:
             print('Read for masking FAILED')
             return False
-        new_data = (data & mask) | (read_out & ~mask)
-
-        # Turn data into a list of bytes for i2c_write method
-        # Essentially round up to the closest byte
-        #number_of_bytes = (register.bit_width + 7) // 8
-        list_data = int_to_list(new_data)
-        number_of_bytes = len(list_data)
-        self.i2c_write_long(
-            dev_addr, [register.address], number_of_bytes, list_data)
+        words = self.register_map.pack(values, words)
+        self.i2c_write_words(dev_addr, self.register_map, words, max_words=1)
 
     def read(self, register_name='DAC_DATA'):
         """Return data from any register on the chip."""
 
+        values = self.read_fields([register_name])
+        if values is None:
+            return None
+        return values[register_name]
+
+    def read_fields(self, names=None):
+        """Return {name: data} of several registers on the chip (default all).
+
+        Each register word is read once. Returns None if a read failed.
+        """
+
         dev_addr = DAC53401.ADDRESS_HEADER | (self.addr_pins << 1)
-        register = DAC53401.registers[register_name]
-        # Ex. 16-bit register: | Byte 1 [15:8] | Byte 0 [7:0] |
-        byte_number = register.bit_index_high // 8
-        # 16-bit register = 2 bytes, i2c_read_long starts at the MSB so we read 2 bytes to get Byte 0
-        number_of_bytes = 2 - byte_number
-        read_back_list = self.i2c_read_long(
-            dev_addr, [register.address], number_of_bytes)
-
-        # Turn the list into an integer
-        read_back_data = 0
-        if read_back_list == None:
+        words = self.i2c_read_words(dev_addr, self.register_map, self.register_map.addresses(names),
+                                    max_words=1)
+        if words is None:
             return None
-        # First byte in the list is the MSB, shift and append the next byte
-        for byte in read_back_list:
-            print('Readback byte of {:02X}'.format(byte))
-            read_back_data <<= 8
-            read_back_data |= byte
-        # Get only the bits for the specified register from what was read back.
-        desired_bits = 0
-        for bit in range(register.bit_index_high, register.bit_index_low - 1, -1):
-            desired_bits += 0x1 << bit
-        desired_data = (read_back_data
-                        & desired_bits) >> register.bit_index_low
-
-        return desired_data
+        return self.register_map.decode(words, names)
 
     def write_voltage(self, voltage):
         """Write a voltage output from the DAC."""
 
-        voltage_data = from_voltage(
-            voltage=voltage, num_bits=10, voltage_range=5, with_negatives=False)
+        voltage_data = self.converter.from_voltage(voltage)
 
         self.write(voltage_data, 'DAC_DATA')
 
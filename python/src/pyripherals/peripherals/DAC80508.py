@@ -1,5 +1,5 @@
-from ..core import Endpoint, Register
-from ..utils import from_voltage
+from ..core import Endpoint, ChipRegisters
+from ..utils import ChannelConverter
 from .SPIFifoDriven import SPIFifoDriven
 
 class DAC80508(SPIFifoDriven):
@@ -17,6 +17,8 @@ class DAC80508(SPIFifoDriven):
         Name-Register pairs for the internal registers of the DAC80508.
     data_mux : dict
         Matches data source names in the MUX to their select values.
+    converter : ChannelConverter
+        Converts output voltages to 16-bit DAC codes at gain 1.
     """
 
     default_data_mux = {
@@ -33,7 +35,8 @@ class DAC80508(SPIFifoDriven):
     WRITE_OPERATION = 0x000000
     READ_OPERATION = 0x800000
 
-    registers = Register.get_chip_registers('DAC80508')
+    registers = ChipRegisters('DAC80508')
+    converter = ChannelConverter(num_bits=16, voltage_range=2.5)
 
     def __init__(self, fpga, master_config=0x3218, endpoints=None, data_mux=default_data_mux):
         # master_config=0x3218 Sets CHAR_LEN=24, Rx_NEG, ASS, IE
@@ -97,8 +100,7 @@ class DAC80508(SPIFifoDriven):
         else:
             gain_info = {}
 
-        voltage_bin = from_voltage(
-            voltage=voltage, num_bits=16, voltage_range=2.5, with_negatives=False)
+        voltage_bin = self.converter.from_voltage(voltage)
         if type(outputs) is list:
             for output in outputs:
                 self.write_chip_reg('DAC' + str(output), voltage_bin)
@@ -1,5 +1,6 @@
 from ..core import Endpoint
-from ..utils import test_bit, gen_mask, custom_signed_to_int
+from ..utils import test_bit, gen_mask, sign_extend
+from ..packing import pack_array
 import numpy as np
 import time
 import os
@@ -284,7 +285,7 @@ class DDR3():
                 data[(7-i + 1)::8] = self.data_arrays[i]
 
         print('Length of data DDR data [2 byte words] = {}'.format(len(data)))
-        return self.write_buf(bytearray(data), set_ddr_read=set_ddr_read)
+        return self.write_buf(pack_array(data, 2, byteorder='little', out='bytearray'), set_ddr_read=set_ddr_read)
 
     def write_buf(self, buf, set_ddr_read=True):
         """Write a bytearray to the DDR3.
@@ -308,6 +309,7 @@ class DDR3():
         self.set_dac_write()
 
         print('Writing to DDR...')
+        self.fpga.flush()
         time1 = time.time()
         block_pipe_return = self.fpga.xem.WriteToBlockPipeIn(epAddr=self.endpoints['BLOCK_PIPE_IN'].address,
                                                              blockSize=DDR3.BLOCK_SIZE,
@@ -492,7 +494,7 @@ class DDR3():
                                self.endpoints['ADC_ADDR_SET'].bit_index_low)
         self.fpga.send_trig(self.endpoints['ADC_ADDR_RESET'])
 
-    def read_adc_block(self, sample_size=None, source='ADC', DEBUG_PRINT=False):
+    def read_adc_block(self, sample_size=None, source='ADC', DEBUG_PRINT=False, buf=None):
         """Read ADC (and other) DDR data. 
         Block size must be a power of two from 16 to 16384
         will automatically perform multiple transfers to complete the full LENGTH.
@@ -509,18 +511,24 @@ class DDR3():
             FIFO output buffer to read. Either 'ADC' or 'FG'. 'FG' just reads
             back what is written for DACs (as function generator) so not so
             useful.
+        buf : bytearray, memoryview, or np.ndarray
+            Writable buffer to fill in place. Its length is the read length
+            and sample_size is ignored. See FPGA.buffer_pool for reusable
+            buffers.
 
         Returns
         -------
         data_buf : byearray
-            adc data read as a bytearray
+            adc data read as a bytearray (buf if given)
         read_cnt : int
             The count (or error code) read from the OpalKelly interface
         """
 
-        if sample_size is None:
-            data = np.zeros((DDR3.SAMPLE_SIZE,), dtype=int)
-            data_buf = bytearray(data)
+        if buf is not None:
+            data_buf = buf
+        elif sample_size is None:
+            # Same length as a buffer of SAMPLE_SIZE ints
+            data_buf = bytearray(DDR3.SAMPLE_SIZE * np.dtype(int).itemsize)
         else:
             data_buf = bytearray(sample_size)
 
@@ -533,6 +541,7 @@ class DDR3():
             print('Error in read adc. Block size is greater than 16384')
             return -2, -2
 
+        self.fpga.flush()
         if source == 'ADC':
             read_cnt = self.fpga.xem.ReadFromBlockPipeOut(epAddr=self.endpoints['BLOCK_PIPE_OUT'].address,
                                                           blockSize=block_size,
@@ -584,7 +593,9 @@ class DDR3():
             chan_data[3] = chan_data_swz[1]
             if convert_twos:
                 for i in range(4):
-                    chan_data[i] = custom_signed_to_int(chan_data[i], bits)
+                    # The channel arrays are new, convert uint32 data (from read_adc) in place
+                    out = chan_data[i].view(np.int32) if chan_data[i].dtype == np.uint32 else None
+                    chan_data[i] = sign_extend(chan_data[i], bits, out=out)
 
         # first version of ADC data before DACs + timestamps are stored
         if self.data_version == 'TIMESTAMPS':
@@ -665,7 +676,7 @@ class DDR3():
 
             adc_data = {}
             for i in range(4):
-                # adc_data[i] = custom_signed_to_int(chan_data[i], 16)
+                # adc_data[i] = sign_extend(chan_data[i], 16)
                 adc_data[i] = chan_data[i]
 
             if bitfile_version < 2: # 00.00.02 -> 2
@@ -696,11 +707,11 @@ class DDR3():
             # dac channels 4,5 are available but not every sample. skip for now. TODO: add channels 4,5
 
             ads = {}
-            ads['A'] = custom_signed_to_int(chan_data[7][0::5], 16)
+            ads['A'] = sign_extend(chan_data[7][0::5], 16)
             if bitfile_version < 2: # 00.00.02 -> 2
-                ads['B'] = custom_signed_to_int(chan_data[7][1::5], 16)
+                ads['B'] = sign_extend(chan_data[7][1::5], 16)
             else:
-                ads['B'] = custom_signed_to_int(chan_data[6][0::5], 16)
+                ads['B'] = sign_extend(chan_data[6][0::5], 16)
             error = False
             # check that the constant values are constant
             constant_values = {0: 0xaa55, 1: (0x28b<<5), 2: 0x77bb, 3: (0x28c<<5)}
@@ -784,8 +795,11 @@ class DDR3():
                 data_set.attrs['bitfile_version'] = self.fpga.bitfile_version
                 new_data_index = 0
 
+            # Reuse the same buffers for each read
+            buf = bytearray(DDR3.BLOCK_SIZE * blk_multiples)
+            d = np.empty(len(buf), dtype=np.uint32)
             while repeat < num_repeats:
-                d, bytes_read_error = self.read_adc(blk_multiples)
+                d, bytes_read_error = self.read_adc(blk_multiples, buf=buf, out=d)
                 if self.data_version == 'ADC_NO_TIMESTAMPS':
                     chan_data = self.deswizzle(d)
 
@@ -813,7 +827,7 @@ class DDR3():
         print(f'Done with DDR reading: saved as {full_data_name}')
         return new_data
 
-    def read_adc(self, blk_multiples=2048):
+    def read_adc(self, blk_multiples=2048, buf=None, out=None):
         """ 
         read DDR data into a numpy buffer of bytes
 
@@ -821,19 +835,29 @@ class DDR3():
         ----------
         blk_multiples : int
             total size of the read is blk_multiples * block_size  
+        buf : bytearray
+            Buffer of blk_multiples * block_size bytes to read into instead
+            of a new one.
+        out : np.ndarray
+            uint32 array of blk_multiples * block_size to put the data in
+            instead of a new one.
 
         Returns
         -------
         d : bytearray
-            data as uint32    
+            data as uint32 (out if given)
         bytes_read_error : int 
             bytes read or error code          
         """
 
         t, bytes_read_error = self.read_adc_block(  # just reads from the block pipe out
-            sample_size=DDR3.BLOCK_SIZE * blk_multiples
+            sample_size=DDR3.BLOCK_SIZE * blk_multiples, buf=buf
         )
-        d = np.frombuffer(t, dtype=np.uint8).astype(np.uint32)
+        if out is None:
+            d = np.frombuffer(t, dtype=np.uint8).astype(np.uint32)
+        else:
+            d = out
+            np.copyto(d, np.frombuffer(t, dtype=np.uint8))
         print(f'Bytes read: {bytes_read_error}')
         return d, bytes_read_error
 
@@ -848,29 +872,33 @@ class DDR3():
     def write_setup(self, data_driven_clock=True):
         """Set up DDR for writing."""
 
-        if data_driven_clock:
-            self.set_adcs_connected()
-        else:
-            self.clear_adcs_connected()
-        self.clear_dac_read()
-        self.clear_adc_write()
-        self.clear_adc_read()    # Stop putting data in outgoing FIFO for Pipe read
-        self.reset_fifo(name='ALL')
+        with self.fpga.transaction():
+            if data_driven_clock:
+                self.set_adcs_connected()
+            else:
+                self.clear_adcs_connected()
+            self.clear_dac_read()
+            self.clear_adc_write()
+            self.clear_adc_read()    # Stop putting data in outgoing FIFO for Pipe read
+            self.reset_fifo(name='ALL')
         self.reset_mig_interface()
 
     def repeat_setup(self):
         """Setup for reading new data without writing to the DDR again."""
 
         # stop access to the FIFOs so that after reset of the FIFO(s) no new data is added/extracted
-        self.clear_adc_read()
-        self.clear_adc_write()
-        self.clear_dac_read()
-        self.reset_fifo(name='ALL')
+        with self.fpga.transaction():
+            self.clear_adc_read()
+            self.clear_adc_write()
+            self.clear_dac_read()
+            self.reset_fifo(name='ALL')
         # self.fpga.send_trig(self.endpoints['UI_RESET'])
         self.reset_mig_interface()
         # note that the MIG interface addresses are driven by the FIFOs so will idle
         # until the FIFOs are reenable with write_finish()
         self.write_finish()
+        # Let the FIFOs and MIG interface settle. reset_mig_interface does not
+        # reset the MIG controller, so there is no status to wait on.
         time.sleep(0.01)
 
     def write_finish(self):
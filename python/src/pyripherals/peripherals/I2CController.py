@@ -1,5 +1,5 @@
 import numpy as np
-import time
+from ..core import FPGATimeoutError
 
 
 class I2CController:
@@ -91,31 +91,26 @@ class I2CController:
             self.i2c['m_pBuf'].append(data[i])
 
         # Reset the memory pointer and transfer the buffer.
-        self.fpga.xem.ActivateTriggerIn(
-            self.endpoints['MEMSTART'].address, self.endpoints['MEMSTART'].bit_index_low)
+        self.fpga.send_trig(self.endpoints['MEMSTART'])
+        ep_in = self.endpoints['IN']
+        shift = ep_in.shift
+        mask = 0xff << shift
         for i in range(data_length + self.i2c['m_nDataStart']):
             # print('(transmit) WireIn Value = {}'.format(self.i2c['m_pBuf'][i]))
-            mask = 0xff << self.endpoints['IN'].bit_index_low
-            value = self.i2c['m_pBuf'][i] << self.endpoints['IN'].bit_index_low
-            self.fpga.xem.SetWireInValue(
-                self.endpoints['IN'].address, value, mask)
-            self.fpga.xem.UpdateWireIns()
-            self.fpga.xem.ActivateTriggerIn(
-                self.endpoints['MEMWRITE'].address, self.endpoints['MEMWRITE'].bit_index_low)
-
-        # Start I2C transaction
-        self.fpga.xem.ActivateTriggerIn(
-            self.endpoints['START'].address, self.endpoints['START'].bit_index_low)
+            self.fpga.set_wire(ep_in.address, self.i2c['m_pBuf'][i] << shift, mask)
+            self.fpga.send_trig(self.endpoints['MEMWRITE'])
 
-        # Wait for transaction to finish
-        for i in range(int(I2CController.I2C_MAX_TIMEOUT_MS)):
-            self.fpga.xem.UpdateTriggerOuts()
-            # change to waiting for True
-            if self.fpga.xem.IsTriggered(self.endpoints['DONE'].address, (1 << self.endpoints['DONE'].bit_index_low)):
-                return True
-            time.sleep(0.001)
+        # Start I2C transaction, discarding any DONE left from an earlier one
+        self.fpga.clear_trigs([self.endpoints['DONE']])
+        self.fpga.send_trig(self.endpoints['START'])
 
-        print('Timeout error in transmit')
+        # Wait for transaction to finish
+        try:
+            self.fpga.wait_for(self.endpoints['DONE'], timeout=I2CController.I2C_MAX_TIMEOUT_MS / 1000)
+        except FPGATimeoutError:
+            print('Timeout error in transmit')
+            return None
+        return True
 
     def i2c_receive(self, data_length, data_transfer='wire'):
         """Take in data from the SCL and SDA lines.
@@ -141,56 +136,48 @@ class I2CController:
             except KeyError as e:
                 raise KeyError('i2c_receive requires the I2C endpoints FIFO_RESET and PIPE_OUT. One or both are missing.')
 
-            self.fpga.xem.ActivateTriggerIn(self.endpoints['FIFO_RESET'].address, self.endpoints['FIFO_RESET'].bit_index_low)
+            self.fpga.send_trig(self.endpoints['FIFO_RESET'])
 
         self.i2c['m_pBuf'][0] |= 0x80
         self.i2c['m_pBuf'][3] = data_length
 
         # Reset the memory pointer and transfer the buffer.
-        self.fpga.xem.ActivateTriggerIn(
-            self.endpoints['MEMSTART'].address, self.endpoints['MEMSTART'].bit_index_low)
+        self.fpga.send_trig(self.endpoints['MEMSTART'])
 
+        ep_in = self.endpoints['IN']
+        shift = ep_in.shift
+        mask = 0xff << shift
         for i in range(self.i2c['m_nDataStart']):
             # print('WireIn Value = {}'.format(self.i2c['m_pBuf'][i]))
-            mask = 0xff << self.endpoints['IN'].bit_index_low
-            value = self.i2c['m_pBuf'][i] << self.endpoints['IN'].bit_index_low
-            self.fpga.xem.SetWireInValue(
-                self.endpoints['IN'].address, value, mask)
-            self.fpga.xem.UpdateWireIns()
-            self.fpga.xem.ActivateTriggerIn(
-                self.endpoints['MEMWRITE'].address, self.endpoints['MEMWRITE'].bit_index_low)
-
-        # Start I2C transaction
-        self.fpga.xem.ActivateTriggerIn(
-            self.endpoints['START'].address,
-            self.endpoints['START'].bit_index_low)
+            self.fpga.set_wire(ep_in.address, self.i2c['m_pBuf'][i] << shift, mask)
+            self.fpga.send_trig(self.endpoints['MEMWRITE'])
+
+        # Start I2C transaction, discarding any DONE left from an earlier one
+        self.fpga.clear_trigs([self.endpoints['DONE']])
+        self.fpga.send_trig(self.endpoints['START'])
 
         # Wait for transaction to finish
-        for _ in range(int(I2CController.I2C_MAX_TIMEOUT_MS / 10)):
-            self.fpga.xem.UpdateTriggerOuts()
-
-            if self.fpga.xem.IsTriggered(self.endpoints['DONE'].address,
-                                         (1 << self.endpoints['DONE'].bit_index_low)):
-                if data_transfer.lower() == 'wire':
-                    # Read data: Reset the memory pointer
-                    self.fpga.xem.ActivateTriggerIn(
-                        self.endpoints['MEMSTART'].address, self.endpoints['MEMSTART'].bit_index_low)
-                    data = [None]*data_length
-                    for i in range(data_length):  # for each byte we have three API calls
-                        self.fpga.xem.UpdateWireOuts()
-                        data_tmp = self.fpga.xem.GetWireOutValue(
-                            self.endpoints['OUT'].address)
-                        mask = 0xff << self.endpoints['OUT'].bit_index_low
-                        data[i] = (
-                            data_tmp & mask) >> self.endpoints['OUT'].bit_index_low
-                        self.fpga.xem.ActivateTriggerIn(
-                            self.endpoints['MEMREAD'].address, self.endpoints['MEMREAD'].bit_index_low)
-                    return data
-                if data_transfer.lower() == 'pipe':
-                    return self.fpga.read_pipe_out(self.endpoints['PIPE_OUT'].address, data_length)
-            time.sleep(0.01)
-
-        print('Timeout Exception in Rx')
+        try:
+            self.fpga.wait_for(self.endpoints['DONE'], timeout=I2CController.I2C_MAX_TIMEOUT_MS / 1000)
+        except FPGATimeoutError:
+            print('Timeout Exception in Rx')
+            return None
+
+        if data_transfer.lower() == 'wire':
+            # Read data: Reset the memory pointer
+            self.fpga.send_trig(self.endpoints['MEMSTART'])
+            data = [None]*data_length
+            ep_out = self.endpoints['OUT']
+            shift = ep_out.shift
+            mask = 0xff << shift
+            for i in range(data_length):  # for each byte we have three API calls
+                self.fpga.xem.UpdateWireOuts()
+                data_tmp = self.fpga.xem.GetWireOutValue(ep_out.address)
+                data[i] = (data_tmp & mask) >> shift
+                self.fpga.send_trig(self.endpoints['MEMREAD'])
+            return data
+        if data_transfer.lower() == 'pipe':
+            return self.fpga.read_pipe_out(self.endpoints['PIPE_OUT'].address, data_length)
 
     # def i2c_write8(self, devAddr, regAddr, data_length, data):
 
@@ -248,9 +235,45 @@ class I2CController:
 
         return data
 
+    def i2c_read_words(self, devAddr, register_map, addresses, max_words=None):
+        """Read register words from devAddr with one read per contiguous range.
+
+        Parameters
+        ----------
+        devAddr : int
+            8 bit device address.
+        register_map : RegisterMap
+            Register layout of the device.
+        addresses : list
+            Register addresses to read.
+        max_words : int
+            Most words to read at once. None (default) for no limit, 1 for
+            devices that do not advance the register address.
+
+        Returns
+        -------
+        dict or None
+            address -> word, None if a read failed.
+        """
+
+        words = {}
+        for start, count in register_map.ranges(addresses, max_words):
+            data = self.i2c_read_long(devAddr, [start], count * register_map.word_bytes)
+            if data is None:
+                return None
+            words.update(register_map.words(data, start))
+        return words
+
+    def i2c_write_words(self, devAddr, register_map, words, max_words=None):
+        """Write register words to devAddr with one write per contiguous range.
+
+        See i2c_read_words for the parameters; words is {address: word}.
+        """
+
+        for start, data in register_map.blocks(words, max_words):
+            self.i2c_write_long(devAddr, [start], len(data), list(data))
+
     def reset_device(self):
         """Reset the I2C controller using an OK TriggerIn."""
 
-        return self.fpga.xem.ActivateTriggerIn(
-            self.endpoints['RESET'].address,
-            self.endpoints['RESET'].bit_index_low)
+        return self.fpga.send_trig(self.endpoints['RESET'])
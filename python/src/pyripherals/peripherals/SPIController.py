@@ -1,4 +1,4 @@
-from ..core import Endpoint, Register
+from ..core import EndpointTable, ChipRegisters, ChipRegisterMap
 import copy
 
 
@@ -23,6 +23,8 @@ class SPIController:
         Value of the CTRL register in the Wishbone.
     registers : dict
         Name-Register pairs for the internal registers of the Wishbone.
+    register_map : RegisterMap
+        Packs the fields of the 32-bit Wishbone registers.
     """
 
     WB_SET_ADDRESS = 0x80000000  # These 3 are from the SPI core manual
@@ -31,10 +33,14 @@ class SPIController:
     # ACK=0x200000000
     WB_CLK_FREQ = 200  # clk_sys = 200 MHz in the top_level_module.v comments
 
-    registers = Register.get_chip_registers('SPI')
+    registers = ChipRegisters('SPI')
+    register_map = ChipRegisterMap(word_bytes=4)
 
-    def __init__(self, fpga, endpoints, master_config=registers.get('CTRL').default):
+    def __init__(self, fpga, endpoints, master_config=None):
         self.fpga = fpga
+        if master_config is None:
+            # Default value of the CTRL register
+            master_config = SPIController.registers['CTRL'].default
         self.master_config = master_config
         self.endpoints = endpoints
 
@@ -42,49 +48,30 @@ class SPIController:
     def create_chips(cls, fpga, number_of_chips, endpoints=None, master_config=None):
         """Instantiate a number of new chips.
 
-        The number must be an integer greater than zero. The endpoints between
-        each instance will be incremented. If the endpoints argument is left
-        as None, then we will use copies of the endpoints_from_defines
-        dictionary for the endpoints for each instance, and update that
-        original dictionary when we increment the endpoints. This way, the
-        endpoints there are ready for another instantiation if needed.
+        The number must be an integer greater than zero. The first chip gets
+        the endpoints argument (or the class default endpoints if None) and
+        each later chip the endpoints of the one before advanced once, as
+        views of an EndpointTable.
         """
 
         if type(number_of_chips) is not int or number_of_chips <= 0:
             print('number_of_chips must be an integer greater than 0')
             return False
 
-        chips = []
         if master_config is None:
             # Use class default for master_config
-            for i in range(number_of_chips):
-                chips.append(cls(fpga=fpga, endpoints=endpoints))
-                # Use deepcopy to keep the endpoints for different instances separate
-                endpoints = copy.deepcopy(chips[-1].endpoints)
-                Endpoint.advance_endpoints(endpoints)
-        else:
-            for i in range(number_of_chips):
-                chips.append(cls(fpga=fpga, endpoints=copy.deepcopy(
-                    endpoints), master_config=master_config))
-                # Use deepcopy to keep the endpoints for different instances separate
-                endpoints = copy.deepcopy(chips[-1].endpoints)
-                Endpoint.advance_endpoints(endpoints)
-
-        if endpoints is None:
-            # Increment shared endpoints dictionary
-            # We need to get the shared endpoints in endpoints_from_defines to
-            # increment and we only have the endpoints given to us in the
-            # argument.
-            shared_full_eps = Endpoint.endpoints_from_defines
-            shared_chip_eps = shared_full_eps[
-                list(shared_full_eps.keys())[
-                    list(shared_full_eps.values()).index(chips[0].endpoints)
-                ]
-            ]
-            Endpoint.advance_endpoints(shared_chip_eps, number_of_chips)
+            chips = [cls(fpga=fpga, endpoints=endpoints)]
         else:
-            # Increment custom dictionary
-            Endpoint.advance_endpoints(endpoints, number_of_chips)
+            chips = [cls(fpga=fpga, endpoints=copy.deepcopy(endpoints), master_config=master_config)]
+
+        # Each later instance is a view of the table, advanced from the
+        # endpoints of the first
+        table = EndpointTable(chips[0].endpoints)
+        for i in range(1, number_of_chips):
+            if master_config is None:
+                chips.append(cls(fpga=fpga, endpoints=table.instance(i)))
+            else:
+                chips.append(cls(fpga=fpga, endpoints=table.instance(i), master_config=master_config))
 
         return chips
 
@@ -280,10 +267,8 @@ class SPIController:
         params = {'ASS': ASS, 'IE': IE, 'LSB': LSB,
                   'Tx_NEG': Tx_NEG, 'Rx_NEG': Rx_NEG, 'CHAR_LEN': CHAR_LEN}
 
-        configuration = SPIController.registers['CTRL'].default
-        for param in params:
-            configuration |= (
-                params[param] << SPIController.registers[param].bit_index_low)
+        ctrl = SPIController.registers['CTRL']
+        configuration = SPIController.register_map.pack(params, {ctrl.address: ctrl.default})[ctrl.address]
         self.configure_master_bin(configuration)
 
     def get_master_configuration(self):
@@ -301,9 +286,7 @@ class SPIController:
     def reset_master(self):
         """Reset the Wishbone Master and SPI Core."""
 
-        self.fpga.xem.ActivateTriggerIn(
-            self.endpoints['MASTER_RESET'].address,
-            self.endpoints['MASTER_RESET'].bit_index_low)
+        self.fpga.send_trig(self.endpoints['MASTER_RESET'])
 
     def set_host_mode(self):
         """ Configure SPI controller to be host driven."""
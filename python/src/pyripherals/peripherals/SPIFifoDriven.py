@@ -1,5 +1,4 @@
-from ..core import Endpoint
-from ..utils import gen_mask
+from ..core import EndpointTable
 import copy
 
 
@@ -48,50 +47,30 @@ class SPIFifoDriven():
     def create_chips(cls, fpga, number_of_chips, endpoints=None, master_config=None):
         """Instantiate a number of new chips.
 
-        The number must be an integer greater than zero. The endpoints between
-        each instance will be incremented. If the endpoints argument is left
-        as None, then we will use copies of the endpoints_from_defines
-        dictionary for the endpoints for each instance, and update that
-        original dictionary when we increment the endpoints. This way, the
-        endpoints there are ready for another instantiation if needed.
+        The number must be an integer greater than zero. The first chip gets
+        the endpoints argument (or the class default endpoints if None) and
+        each later chip the endpoints of the one before advanced once, as
+        views of an EndpointTable.
         """
 
         if type(number_of_chips) is not int or number_of_chips <= 0:
             print('number_of_chips must be an integer greater than 0')
             return False
 
-        chips = []
         if master_config is None:
             # Use class default for master_config
-            for i in range(number_of_chips):
-                chips.append(cls(fpga=fpga, endpoints=endpoints))
-                # Use deepcopy to keep the endpoints for different instances separate
-                endpoints = copy.deepcopy(chips[-1].endpoints)
-                Endpoint.advance_endpoints(endpoints)
+            chips = [cls(fpga=fpga, endpoints=endpoints)]
         else:
-            for i in range(number_of_chips):
-                chips.append(cls(fpga=fpga, endpoints=copy.deepcopy(
-                    endpoints), master_config=master_config))
-                # Use deepcopy to keep the endpoints for different instances separate
-                endpoints = copy.deepcopy(chips[-1].endpoints)
-                Endpoint.advance_endpoints(endpoints)
-
-        if endpoints is None:
-            # Increment shared endpoints dictionary
-            # TODO: is there a better way to do this?
-            # We need to get the shared endpoints in endpoints_from_defines to
-            # increment and we only have the endpoints given to us in the
-            # argument.
-            shared_full_eps = Endpoint.endpoints_from_defines
-            shared_chip_eps = shared_full_eps[
-                list(shared_full_eps.keys())[
-                    list(shared_full_eps.values()).index(chips[0].endpoints)
-                ]
-            ]
-            Endpoint.advance_endpoints(shared_chip_eps, number_of_chips)
-        else:
-            # Increment custom dictionary
-            Endpoint.advance_endpoints(endpoints, number_of_chips)
+            chips = [cls(fpga=fpga, endpoints=copy.deepcopy(endpoints), master_config=master_config)]
+
+        # Each later instance is a view of the table, advanced from the
+        # endpoints of the first
+        table = EndpointTable(chips[0].endpoints)
+        for i in range(1, number_of_chips):
+            if master_config is None:
+                chips.append(cls(fpga=fpga, endpoints=table.instance(i)))
+            else:
+                chips.append(cls(fpga=fpga, endpoints=table.instance(i), master_config=master_config))
 
         return chips
 
@@ -153,12 +132,8 @@ class SPIFifoDriven():
         else:
             endpoint = 'DATA_SEL'
 
-        mask = gen_mask(range(self.endpoints[endpoint].bit_index_low,
-                              self.endpoints[endpoint].bit_index_high))
-        data = (self.data_mux[source]
-                << self.endpoints[endpoint].bit_index_low)
-        self.fpga.set_wire(self.endpoints[endpoint].address, data,
-                           mask=mask)
+        ep = self.endpoints[endpoint]
+        self.fpga.set_wire(ep.address, ep.encode(select_val), mask=ep.mask)
         self.current_data_mux = source
 
     def set_clk_divider(self, divide_value):
@@ -166,16 +141,11 @@ class SPIFifoDriven():
 
         Tupdate = Tclk * divide_value
         """
-        mask = gen_mask(range(self.endpoints['PERIOD_ENABLE'].bit_index_low,
-                              self.endpoints['PERIOD_ENABLE'].bit_index_high))
-
-        self.fpga.set_wire(self.endpoints['PERIOD_ENABLE'].address,
-                           divide_value << self.endpoints['PERIOD_ENABLE'].bit_index_low,
-                           mask)
+        ep = self.endpoints['PERIOD_ENABLE']
+        self.fpga.set_wire(ep.address, ep.encode(divide_value), ep.mask)
 
         # resets the SPI state machine
-        self.fpga.xem.ActivateTriggerIn(self.endpoints['REG_TRIG'].address,
-                                        self.endpoints['REG_TRIG'].bit_index_low)
+        self.fpga.send_trig(self.endpoints['REG_TRIG'])
 
     def set_ctrl_reg(self, reg_value):
         """Configures the SPI Wishbone control register over the registerBridge.
@@ -188,8 +158,7 @@ class SPIFifoDriven():
 
         # resets the SPI state machine -- needed since these registers are only
         #   programmed at startup of the state machine
-        self.fpga.xem.ActivateTriggerIn(self.endpoints['REG_TRIG'].address,
-                                        self.endpoints['REG_TRIG'].bit_index_low)
+        self.fpga.send_trig(self.endpoints['REG_TRIG'])
 
     def set_spi_sclk_divide(self, divide_value=0x01):
         """Configures the SPI Wishbone clock divider register over the registerBridge.
@@ -205,8 +174,7 @@ class SPIFifoDriven():
 
         # resets the SPI state machine -- needed since these WishBone
         #   registers are only programmed at startup of the state machine
-        self.fpga.xem.ActivateTriggerIn(self.endpoints['REG_TRIG'].address,
-                                        self.endpoints['REG_TRIG'].bit_index_low)
+        self.fpga.send_trig(self.endpoints['REG_TRIG'])
 
     def write(self, data):
         """Host write 24 bits of data to the chip over SPI."""
@@ -214,5 +182,4 @@ class SPIFifoDriven():
         if self.current_data_mux != 'host':
             self.set_data_mux('host')
         self.fpga.set_wire(self.endpoints['HOST_WIRE_IN'].address, data)
-        self.fpga.xem.ActivateTriggerIn(self.endpoints['HOST_TRIG'].address,
-                                        self.endpoints['HOST_TRIG'].bit_index_low)
+        self.fpga.send_trig(self.endpoints['HOST_TRIG'])
@@ -1,4 +1,4 @@
-from ..core import Register
+from ..core import ChipRegisters
 from .I2CController import I2CController
 
 
@@ -21,7 +21,7 @@ class TCA9555(I2CController):
     """
 
     ADDRESS_HEADER = 0b0100_0000
-    registers = Register.get_chip_registers('TCA9555')
+    registers = ChipRegisters('TCA9555')
 
     def configure_pins(self, data):
         """Configure the chip's pins as inputs (1's) or outputs (0's)."""
@@ -1,5 +1,4 @@
-from ..core import Register
-from ..utils import int_to_list
+from ..core import ChipRegisters, ChipRegisterMap
 from .I2CController import I2CController
 import time
 
@@ -16,81 +15,76 @@ class TMF8801(I2CController):
         7-bit device address with R/W bit space 
     registers : dict
         Name-Register pairs for the internal registers of the chip.
+    register_map : RegisterMap
+        Packs and unpacks the fields of the byte-wide registers. Fields wider
+        than a byte are LSB first, as in MULTI_BYTE_ORDER.
     """
 
     ADDRESS = 0b0100_0001 << 1
-    registers = Register.get_chip_registers('TMF8801')
+    registers = ChipRegisters('TMF8801')
     apps = {'measure': 0xC0, 'bootloader': 0x80}
     MULTI_BYTE_ORDER = 'LSB_1st'
+    register_map = ChipRegisterMap(word_bytes=1, byte_order='little')
 
     def write(self, data, register_name):
         """Write data to any register on the chip.
             first reads to enable writing of (just) bit-fields within the register
         """
 
-        dev_addr = self.ADDRESS
-        register = self.registers[register_name]
-        data <<= register.bit_index_low
+        return self.write_fields({register_name: data})
 
-        # Mask only the bits for the specified register.
-        mask = 0
-        for bit in range(register.bit_index_high, register.bit_index_low - 1, -1):
-            mask |= 0x1 << bit
+    def write_fields(self, values):
+        """Write several registers on the chip, one write per contiguous address range.
 
-        # Compare with current data to mask unchanged values
-        read_out = self.read(register_name)
-        if read_out == None:
+        Reads the register bytes holding the fields so other fields keep
+        their values.
+
+        Parameters
+        ----------
+        values : dict
+            Register name -> data.
+        """
+
+        dev_addr = self.ADDRESS
+        words = self.i2c_read_words(dev_addr, self.register_map, self.register_map.addresses(values))
+        if words is None:
             print('Read for masking FAILED')
             return False
-        new_data = (data & mask) | (read_out & ~mask)
-
-        # Turn data into a list of bytes for i2c_write method
-        list_data = int_to_list(new_data)
-        number_of_bytes = len(list_data)
-        list_data_str = ''.join(" ".join(f'0x{x:02x}' for x in list_data))
-        print(
-            f'i2c write long: 0x{dev_addr:02x}, reg addr 0x{register.address:02x}, data {list_data_str}')
-        self.i2c_write_long(
-            dev_addr, [register.address], number_of_bytes, list_data)
+        words = self.register_map.pack(values, words)
+        for start, data in self.register_map.blocks(words):
+            list_data_str = ' '.join(f'0x{x:02x}' for x in data)
+            print(f'i2c write long: 0x{dev_addr:02x}, reg addr 0x{start:02x}, data {list_data_str}')
+        self.i2c_write_words(dev_addr, self.register_map, words)
 
     def read(self, register_name, number_of_bytes=None):
         """Return data from any register on the chip."""
 
-        dev_addr = self.ADDRESS
-        register = self.registers[register_name]
-        # This is the total number of bytes to read
-        byte_number = (register.bit_index_high // 8) + 1
-        # e.g. 16-bit register = 2 bytes, i2c_read_long starts at the MSB so we read 2 bytes to get Byte 0
         if number_of_bytes is None:
-            number_of_bytes = byte_number
-        # print(f'Read slave address: 0x{dev_addr:02x}, reg addr 0x{register.address:02x}')
-        read_back_list = self.i2c_read_long(
-            dev_addr, [register.address], number_of_bytes)
+            values = self.read_fields([register_name])
+            if values is None:
+                return None
+            return values[register_name]
 
-        # Turn the list into an integer
-        read_back_data = 0
+        register = self.registers[register_name]
+        read_back_list = self.i2c_read_long(self.ADDRESS, [register.address], number_of_bytes)
         if read_back_list == None:
             return None
+        # Bytes not read are taken as 0
+        num_bytes = (register.bit_index_high // 8) + 1
+        data = bytes(read_back_list[:num_bytes]).ljust(num_bytes, b'\x00')
+        return self.register_map.unpack(data, register.address, [register_name])[register_name]
+
+    def read_fields(self, names=None):
+        """Return {name: data} of several registers on the chip (default all).
 
-        if self.MULTI_BYTE_ORDER == 'MSB_1st':
-            for byte in read_back_list:
-                # print('Readback byte of 0x{:02X}'.format(byte))
-                read_back_data <<= 8
-                read_back_data |= byte
-        elif self.MULTI_BYTE_ORDER == 'LSB_1st':
-            for byte in read_back_list[::-1]:  # flip list order
-                # print('Readback byte of 0x{:02X}'.format(byte))
-                read_back_data <<= 8
-                read_back_data |= byte
-
-        # Get only the bits for the specified register from what was read back.
-        desired_bits = 0
-        for bit in range(register.bit_index_high, register.bit_index_low - 1, -1):
-            desired_bits += 0x1 << bit
-        desired_data = (read_back_data
-                        & desired_bits) >> register.bit_index_low
-
-        return desired_data
+        Reads each contiguous address range once. Returns None if a read
+        failed.
+        """
+
+        words = self.i2c_read_words(self.ADDRESS, self.register_map, self.register_map.addresses(names))
+        if words is None:
+            return None
+        return self.register_map.decode(words, names)
 
     def power_down_high_impedance(self):
         """Power down the DAC output to high impedance (default)."""
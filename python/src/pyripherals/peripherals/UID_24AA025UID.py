@@ -1,5 +1,5 @@
-from ..core import Register
-from ..utils import int_to_list
+from ..core import ChipRegisters
+from ..packing import pack_int
 from .I2CController import I2CController
 
 class UID_24AA025UID(I2CController):
@@ -21,48 +21,37 @@ class UID_24AA025UID(I2CController):
     """
 
     ADDRESS_HEADER = 0b10100000
-    registers = Register.get_chip_registers('24AA025UID')
+    registers = ChipRegisters('24AA025UID')
 
     def write(self, data, word_address=0x00, num_bytes=None):
         """Write data into memory at word_address."""
 
-        dev_addr = UID_24AA025UID.ADDRESS_HEADER | (self.addr_pins << 1)
         print(
             f'word_address: {hex(word_address)}\ndata: {hex(data)}\nnum_bytes: {num_bytes}')
 
-        # Convert data into a list
-        if num_bytes is None:
-            # User did not specify a number of bytes
-            list_data = int_to_list(integer=data)
-            num_bytes = len(list_data)
-        else:
-            # User specified a number of bytes
-            list_data = int_to_list(integer=data, num_bytes=num_bytes)
-
+        # Convert data into bytes, LSB first
+        list_data = pack_int(data, num_bytes=num_bytes, byteorder='little', out='list')
         if list_data is False:
-            # int_to_list returns False when the data is longer than the number of bytes
+            # pack_int returns False when the data is longer than the number of bytes
             print('ERROR: data exceeds given number of bytes')
             return False
+        return self.write_bytes(list_data, word_address)
+
+    def write_bytes(self, data, word_address=0x00):
+        """Write a block of bytes (e.g. a memory image) into memory at word_address.
 
-        if num_bytes > 16:
-            # After 16 bytes (1 page), the UID chip will rollover and overwrite data from ealier.
-            # To fix this, we start a new I2C write command at the next page
-            self.i2c_write_long(devAddr=dev_addr, regAddr=[
-                                word_address], data_length=16, data=list_data[:16])
-            # We can recursively call this function instead of looping through multiple times.
-            # recurse_data = data % (0x1 << (8 * (num_bytes - 16)))
-            recurse_data = data
-            for i in range(16):
-                recurse_data -= list_data[i] << (8 * i)
-            recurse_data >>= 16 * 8
-            # print(f'{data} % {(0x1 << (8 * (num_bytes - 16)))} = {recurse_data}')
-            self.write(data=recurse_data, word_address=(word_address
-                       + 16) % 0x80, num_bytes=num_bytes - 16)
-            return True
-
-        # Data is no more than 16 bytes (1 page) and can be written with 1 I2C command.
-        self.i2c_write_long(devAddr=dev_addr, regAddr=[
-                            word_address], data_length=num_bytes, data=list_data)
+        data can be a list of ints, bytes, bytearray, or NumPy uint8 array
+        (see pyripherals.packing.pack_array).
+        """
+
+        dev_addr = UID_24AA025UID.ADDRESS_HEADER | (self.addr_pins << 1)
+        data = list(bytes(data))
+        # After 16 bytes (1 page), the UID chip will rollover and overwrite data from ealier.
+        # To fix this, we start a new I2C write command for each 16 bytes
+        for start in range(0, len(data), 16):
+            page = data[start:start + 16]
+            self.i2c_write_long(devAddr=dev_addr, regAddr=[(word_address + start) % 0x80],
+                                data_length=len(page), data=page)
         return True
 
     def read(self, word_address=0x00, words_read=1):
@@ -0,0 +1,735 @@
+"""Software stand-in for the Opal Kelly FrontPanel API.
+
+Use in place of the ok module to run FPGA and the peripherals without a board:
+
+    from pyripherals import simulator
+    f = FPGA(bitfile=None, frontpanel=simulator)
+
+Endpoints are taken from ep_defines.v (Endpoint.endpoints_from_defines) unless
+given. I2C controllers and the DDR3 are found by their endpoint names. Each API
+call can be charged a latency and each pipe transfer a bandwidth with
+TimingModel so host-side throughput can be measured without hardware.
+
+Abe Stroschein, ajstroschein@stthomas.edu
+
+Lucas Koerner, koer2434@stthomas.edu
+"""
+
+import os
+import time
+import numpy as np
+from collections import Counter
+
+
+# FrontPanel endpoint address ranges
+WIRE_IN_ADDRESSES = range(0x00, 0x20)
+WIRE_OUT_ADDRESSES = range(0x20, 0x40)
+TRIGGER_IN_ADDRESSES = range(0x40, 0x60)
+TRIGGER_OUT_ADDRESSES = range(0x60, 0x80)
+PIPE_IN_ADDRESSES = range(0x80, 0xA0)
+PIPE_OUT_ADDRESSES = range(0xA0, 0xC0)
+
+I2C_ENDPOINT_NAMES = ('IN', 'OUT', 'START', 'DONE', 'MEMSTART', 'MEMWRITE', 'MEMREAD')
+
+
+def wait(seconds):
+    """Wait for seconds, spinning for the last millisecond for accuracy."""
+
+    deadline = time.perf_counter() + seconds
+    if seconds > 1e-3:
+        time.sleep(seconds - 1e-3)
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TimingModel:
+    """Per-call latency and pipe bandwidth charged by the simulated device.
+
+    Attributes
+    ----------
+    call_latency : float
+        Seconds charged for any call without an entry in latencies.
+    latencies : dict
+        API method name -> seconds charged for that method.
+    bandwidth : float or None
+        Bytes per second for pipe and block pipe transfers. None for no limit.
+    sleep : bool
+        Whether to actually wait for the charged time. If False the time is
+        only added to okCFrontPanel.sim_time.
+    """
+
+    def __init__(self, call_latency=0.0, latencies=None, bandwidth=None, sleep=True):
+        self.call_latency = call_latency
+        self.latencies = {} if latencies is None else latencies
+        self.bandwidth = bandwidth
+        self.sleep = sleep
+
+    @classmethod
+    def usb3(cls, sleep=True):
+        """Return a rough model of an XEM7310 over USB 3.0."""
+
+        return cls(call_latency=50e-6, latencies={'ConfigureFPGA': 0.5}, bandwidth=340e6, sleep=sleep)
+
+    def cost(self, method, num_bytes=0):
+        """Return the seconds charged for a call to method moving num_bytes."""
+
+        seconds = self.latencies.get(method, self.call_latency)
+        if num_bytes and self.bandwidth:
+            seconds += num_bytes / self.bandwidth
+        return seconds
+
+
+class okTDeviceInfo:
+    """Device information filled in by okCFrontPanel.GetDeviceInfo."""
+
+    def __init__(self):
+        self.productName = ''
+        self.deviceMajorVersion = 0
+        self.deviceMinorVersion = 0
+        self.serialNumber = ''
+        self.deviceID = ''
+        self.usbSpeed = 0
+
+
+class okTRegisterEntry:
+    """One register bridge address and data pair."""
+
+    def __init__(self, address=0, data=0):
+        self.address = address
+        self.data = data
+
+
+class okTRegisterEntries(list):
+    """List of okTRegisterEntry for WriteRegisters and ReadRegisters."""
+
+    def __init__(self, num_entries=0):
+        super().__init__(okTRegisterEntry() for _ in range(num_entries))
+
+
+class I2CDevice:
+    """Device on the simulated I2C bus with a byte-addressed register memory.
+
+    Attributes
+    ----------
+    memory : bytearray
+        The device registers.
+    pointer : int
+        Register address used by the next read or write. Advances by one for
+        each byte and wraps at the end of memory.
+    """
+
+    def __init__(self, memory_size=256):
+        self.memory = bytearray(memory_size)
+        self.pointer = 0
+
+    def write(self, reg_address, data):
+        if reg_address is not None:
+            self.pointer = reg_address % len(self.memory)
+        for byte in data:
+            self.memory[self.pointer] = byte
+            self.pointer = (self.pointer + 1) % len(self.memory)
+
+    def read(self, reg_address, length):
+        if reg_address is not None:
+            self.pointer = reg_address % len(self.memory)
+        data = []
+        for _ in range(length):
+            data.append(self.memory[self.pointer])
+            self.pointer = (self.pointer + 1) % len(self.memory)
+        return data
+
+
+class SimulatedI2CController:
+    """The I2C controller memory and bus transactions of one I2C endpoint group.
+
+    The host fills the controller memory one byte at a time (MEMSTART, then
+    IN + MEMWRITE per byte). The memory holds the preamble length (MSB set for
+    a read), start positions, stop positions, payload length, the preamble,
+    and any data to write. START runs the transaction on the bus and fires
+    DONE. Read data is returned one byte at a time on OUT (MEMSTART, then
+    MEMREAD per byte) or through PIPE_OUT.
+
+    Attributes
+    ----------
+    endpoints : dict
+        The I2C endpoints of this controller.
+    devices : dict
+        8-bit device address (read bit clear) -> I2CDevice. Shared by all
+        controllers of one okCFrontPanel unless given separately.
+    memory : list
+        Bytes written by the host.
+    read_data : list
+        Bytes returned by the last read.
+    pointer : int
+        Memory pointer for MEMWRITE and MEMREAD.
+    """
+
+    def __init__(self, endpoints, devices):
+        self.endpoints = endpoints
+        self.devices = devices
+        self.memory = []
+        self.read_data = []
+        self.pointer = 0
+        self.pipe_data = bytearray()
+
+    def reset(self, frontpanel):
+        self.memory = []
+        self.read_data = []
+        self.pointer = 0
+
+    def mem_start(self, frontpanel):
+        self.pointer = 0
+
+    def mem_write(self, frontpanel):
+        ep = self.endpoints['IN']
+        byte = (frontpanel.wire_ins.get(ep.address, 0) >> ep.bit_index_low) & 0xff
+        if self.pointer < len(self.memory):
+            self.memory[self.pointer] = byte
+        else:
+            self.memory.append(byte)
+        self.pointer += 1
+
+    def mem_read(self, frontpanel):
+        self.pointer += 1
+
+    def fifo_reset(self, frontpanel):
+        self.pipe_data = bytearray()
+
+    def out_value(self):
+        if self.pointer < len(self.read_data):
+            return self.read_data[self.pointer] << self.endpoints['OUT'].bit_index_low
+        return 0
+
+    def start(self, frontpanel):
+        preamble_length = self.memory[0] & 0x7f
+        is_read = bool(self.memory[0] & 0x80)
+        data_length = self.memory[3]
+        preamble = self.memory[4:4 + preamble_length]
+        i2c_device = self.devices.get(preamble[0] & 0xfe)
+
+        if is_read:
+            # Preamble is devAddr(W), register address bytes, devAddr(R)
+            reg_bytes = preamble[1:-1]
+            reg_address = int.from_bytes(bytes(reg_bytes), 'big') if reg_bytes else None
+            if i2c_device is None:
+                self.read_data = [0xff] * data_length
+            else:
+                self.read_data = i2c_device.read(reg_address, data_length)
+            self.pipe_data += bytes(self.read_data)
+        else:
+            reg_bytes = preamble[1:]
+            reg_address = int.from_bytes(bytes(reg_bytes), 'big') if reg_bytes else None
+            data = self.memory[4 + preamble_length:4 + preamble_length + data_length]
+            if i2c_device is not None:
+                i2c_device.write(reg_address, data)
+
+        done = self.endpoints['DONE']
+        frontpanel.fire_trigger_out(done.address, done.bit_index_low)
+
+
+class SimulatedDDR3:
+    """The DDR3 with DAC playback data and a stream of ADC frames.
+
+    Data written to BLOCK_PIPE_IN is the DAC ring buffer, played back from the
+    start again after its last word as the DDR3 wraps at PORT1_INDEX.
+    BLOCK_PIPE_OUT_FG reads the ring buffer back. BLOCK_PIPE_OUT streams
+    16-byte words in the 'TIMESTAMPS' layout read by DDR3.deswizzle and
+    DDR3.data_to_names: 4 fast ADC channels, the DAC playback data, ADS8686
+    samples, timestamps, and read check constants. UI_RESET and
+    ADC_ADDR_RESET restart the stream.
+
+    Attributes
+    ----------
+    endpoints : dict
+        The DDR3 endpoints.
+    adc_signal : callable
+        adc_signal(channel, sample_index) returns the signed ADC codes of
+        channel (0 to 3) for an array of sample indices.
+    bitfile_version : int
+        Bitfile version whose frame layout to use.
+    timestamp_step : int
+        Timestamp increase per 5-word frame.
+    word_index : int
+        Index of the next ADC word to read.
+    dac_ring : np.ndarray
+        uint16 DAC data written by the host.
+    """
+
+    # Position of each deswizzled channel within a 16-byte word of uint16
+    CHANNEL_POSITIONS = {0: 6, 1: 7, 2: 5, 3: 4, 4: 2, 5: 3, 6: 0, 7: 1}
+    # Position of each DAC channel within a word written by DDR3.write_channels
+    DAC_POSITIONS = {0: 6, 1: 7, 2: 4, 3: 5}
+
+    def __init__(self, endpoints, adc_signal=None, bitfile_version=1, timestamp_step=5):
+        self.endpoints = endpoints
+        self.adc_signal = default_adc_signal if adc_signal is None else adc_signal
+        self.bitfile_version = bitfile_version
+        self.timestamp_step = timestamp_step
+        self.word_index = 0
+        self.dac_ring = np.zeros(0, dtype=np.uint16)
+        self.fg_index = 0
+
+    def reset(self, frontpanel):
+        self.word_index = 0
+        self.fg_index = 0
+
+    def write(self, data):
+        buf = bytes(data)
+        self.dac_ring = np.frombuffer(buf[:len(buf) - len(buf) % 16], dtype='<u2').copy()
+        self.fg_index = 0
+
+    def read_fg(self, num_bytes):
+        ring = self.dac_ring.view(np.uint8)
+        if ring.size == 0:
+            return bytes(num_bytes)
+        idx = (self.fg_index + np.arange(num_bytes)) % ring.size
+        self.fg_index = (self.fg_index + num_bytes) % ring.size
+        return ring[idx].tobytes()
+
+    def frames(self, num_words):
+        """Return the next num_words ADC words as bytes."""
+
+        k = self.word_index + np.arange(num_words, dtype=np.int64)
+        self.word_index += num_words
+        words = np.zeros((num_words, 8), dtype=np.uint16)
+
+        def put(channel, rows, values):
+            words[rows, SimulatedDDR3.CHANNEL_POSITIONS[channel]] = np.asarray(values).astype(np.int64) & 0xffff
+
+        # Fast ADC
+        for chan in range(4):
+            put(chan, slice(None), self.adc_signal(chan, k))
+
+        # DAC playback, one DAC sample per 2 ADC samples
+        if self.dac_ring.size:
+            dac_words = self.dac_ring.reshape(-1, 8)
+            sample = (k // 2) % dac_words.shape[0]
+            even = (k % 2) == 0
+            put(4, slice(None), np.where(even, dac_words[sample, SimulatedDDR3.DAC_POSITIONS[0]],
+                                         dac_words[sample, SimulatedDDR3.DAC_POSITIONS[1]]))
+            put(5, slice(None), np.where(even, dac_words[sample, SimulatedDDR3.DAC_POSITIONS[2]],
+                                         dac_words[sample, SimulatedDDR3.DAC_POSITIONS[3]]))
+
+        # Timestamps, one per 5 words
+        timestamp = (k // 5) * self.timestamp_step
+        phase = k % 5
+        if self.bitfile_version < 2:
+            lsb_rows, lsb_chan = phase == 0, 6
+            ads_b_rows, ads_b_chan = phase == 1, 7
+        else:
+            lsb_rows, lsb_chan = phase == 1, 7
+            ads_b_rows, ads_b_chan = phase == 0, 6
+        put(lsb_chan, lsb_rows, timestamp[lsb_rows])
+        put(6, phase == 1, timestamp[phase == 1] >> 16)
+        put(7, phase == 2, timestamp[phase == 2] >> 32)
+
+        # ADS8686 channels A and B are left at 0
+        put(7, phase == 0, 0)
+        put(ads_b_chan, ads_b_rows, 0)
+
+        # Read check constants and ADS8686 sequence counts
+        phase = k % 10
+        seq = (2 * (k // 10)) % 24
+        put(7, phase == 3, 0xaa55)
+        put(7, phase == 4, (0x28b << 5) | seq[phase == 4])
+        put(7, phase == 8, 0x77bb)
+        put(7, phase == 9, (0x28c << 5) | (seq[phase == 9] + 1))
+
+        return words.astype('<u2').tobytes()
+
+
+def default_adc_signal(channel, sample_index):
+    """Return a sine wave with a 1000 sample period, shifted 45 degrees per channel."""
+
+    return np.round(8000 * np.sin(2 * np.pi * sample_index / 1000 + channel * np.pi / 4)).astype(np.int64)
+
+
+class FrontPanelErrorCodes:
+    """The okCFrontPanel error codes."""
+
+    NoError = 0
+    Failed = -1
+    Timeout = -2
+    DoneNotHigh = -3
+    TransferError = -4
+    CommunicationError = -5
+    InvalidBitstream = -6
+    FileError = -7
+    DeviceNotOpen = -8
+    InvalidEndpoint = -9
+    InvalidBlockSize = -10
+    I2CRestrictedAddress = -11
+    I2CBitError = -12
+    I2CNack = -13
+    I2CUnknownStatus = -14
+    UnsupportedFeature = -15
+    FIFOUnderflow = -16
+    FIFOOverflow = -17
+    DataAlignmentError = -18
+    InvalidResetProfile = -19
+    InvalidParameter = -20
+
+
+class okCFrontPanel(FrontPanelErrorCodes):
+    """Simulated ok.okCFrontPanel.
+
+    Attributes
+    ----------
+    endpoints : dict
+        Endpoint groups that define the simulated design.
+    timing : TimingModel
+        Latency and bandwidth charged for each call.
+    sim_time : float
+        Total seconds charged by the timing model.
+    calls : Counter
+        Number of calls to each API method.
+    wire_ins : dict
+        WireIn values after the last UpdateWireIns, address -> value.
+    wire_outs : dict
+        WireOut values set by the test or script, address -> value. Values
+        driven by the I2C controllers and DDR3 are added on UpdateWireOuts.
+    registers : dict
+        Register bridge values, address -> data.
+    pipe_in_data : dict
+        PipeIn address -> bytearray of all data written.
+    pipe_out_data : dict
+        PipeOut address -> bytearray of data waiting to be read. Reads past
+        the end return zeros.
+    trigger_in_handlers : dict
+        (address, bit) -> function(okCFrontPanel) called by ActivateTriggerIn.
+    trigger_in_counts : Counter
+        (address, bit) -> number of ActivateTriggerIn calls.
+    i2c_devices : dict
+        8-bit device address -> I2CDevice on the simulated I2C bus.
+    i2c_controllers : list
+        SimulatedI2CController for each I2C endpoint group.
+    ddr3 : SimulatedDDR3 or None
+        The DDR3 if the endpoints define one.
+    serials : list
+        Serial numbers of the devices this okCFrontPanel can open.
+    serial : str
+        Serial number of the opened device (the first of serials before
+        OpenBySerial).
+    """
+
+    def __init__(self, endpoints=None, timing=None, serial='SIM00001', bitfile_version=1, adc_signal=None,
+                 i2c_devices=None, serials=None):
+        if endpoints is None:
+            # Imported here since core imports this module through trace
+            from .core import Endpoint
+            endpoints = Endpoint.endpoints_from_defines
+        self.endpoints = endpoints
+        self.timing = TimingModel() if timing is None else timing
+        self.serials = [serial] if serials is None else list(serials)
+        self.serial = self.serials[0]
+        self.sim_time = 0.0
+        self.calls = Counter()
+        self.is_open = False
+        self.bitfile = None
+
+        self.wire_ins = {}
+        self._staged_wire_ins = {}
+        self.wire_outs = {}
+        self._wire_out_snapshot = {}
+        self.registers = {}
+        self.pipe_in_data = {}
+        self.pipe_out_data = {}
+        self.trigger_in_handlers = {}
+        self.trigger_in_counts = Counter()
+        self._trigger_outs_pending = {}
+        self._trigger_outs = {}
+
+        gp = endpoints.get('GP', {})
+        if 'BITFILE_VERSION' in gp:
+            self.wire_outs[gp['BITFILE_VERSION'].address] = bitfile_version
+
+        self.i2c_devices = {} if i2c_devices is None else i2c_devices
+        self.i2c_controllers = []
+        for group in endpoints.values():
+            if isinstance(group, dict) and all(name in group for name in I2C_ENDPOINT_NAMES):
+                self.add_i2c_controller(group)
+
+        ddr3_eps = endpoints.get('DDR3', {})
+        if 'BLOCK_PIPE_OUT' in ddr3_eps:
+            self.ddr3 = SimulatedDDR3(ddr3_eps, adc_signal=adc_signal, bitfile_version=bitfile_version)
+            for name in ('UI_RESET', 'ADC_ADDR_RESET'):
+                if name in ddr3_eps:
+                    self.on_trigger_in(ddr3_eps[name], self.ddr3.reset)
+            if 'INIT_COMPLETE' in ddr3_eps:
+                ep = ddr3_eps['INIT_COMPLETE']
+                self.wire_outs[ep.address] = self.wire_outs.get(ep.address, 0) | (1 << ep.bit_index_low)
+        else:
+            self.ddr3 = None
+
+    def _charge(self, method, num_bytes=0):
+        self.calls[method] += 1
+        seconds = self.timing.cost(method, num_bytes)
+        if seconds:
+            self.sim_time += seconds
+            if self.timing.sleep:
+                wait(seconds)
+
+    # Simulation controls
+    def add_i2c_controller(self, endpoints, devices=None):
+        """Add an I2C controller for endpoints and return it.
+
+        Use for controllers made with Endpoint.advance_endpoints that are not
+        in ep_defines.v.
+        """
+
+        controller = SimulatedI2CController(endpoints, self.i2c_devices if devices is None else devices)
+        for name, handler in [('RESET', controller.reset), ('START', controller.start),
+                              ('MEMSTART', controller.mem_start), ('MEMWRITE', controller.mem_write),
+                              ('MEMREAD', controller.mem_read), ('FIFO_RESET', controller.fifo_reset)]:
+            if name in endpoints:
+                self.on_trigger_in(endpoints[name], handler)
+        self.i2c_controllers.append(controller)
+        return controller
+
+    def add_i2c_device(self, address, device=None):
+        """Put device at the 8-bit I2C address and return it."""
+
+        if device is None:
+            device = I2CDevice()
+        self.i2c_devices[address & 0xfe] = device
+        return device
+
+    def on_trigger_in(self, ep_bit, handler):
+        """Call handler(okCFrontPanel) when the TriggerIn ep_bit is activated."""
+
+        self.trigger_in_handlers[(ep_bit.address, ep_bit.bit_index_low)] = handler
+
+    def fire_trigger_out(self, address, bit):
+        """Set a TriggerOut bit to be seen by the next UpdateTriggerOuts."""
+
+        self._trigger_outs_pending[address] = self._trigger_outs_pending.get(address, 0) | (1 << bit)
+
+    def set_wire_out(self, address, value):
+        """Set the WireOut value seen after the next UpdateWireOuts."""
+
+        self.wire_outs[address] = value
+
+    # Device
+    def GetDeviceCount(self):
+        self._charge('GetDeviceCount')
+        return len(self.serials)
+
+    def GetDeviceListSerial(self, num):
+        self._charge('GetDeviceListSerial')
+        return self.serials[num] if 0 <= num < len(self.serials) else ''
+
+    def OpenBySerial(self, serial=''):
+        self._charge('OpenBySerial')
+        if serial == '':
+            serial = self.serials[0]
+        if serial not in self.serials:
+            return self.DeviceNotOpen
+        self.serial = serial
+        self.is_open = True
+        return self.NoError
+
+    def IsOpen(self):
+        return self.is_open
+
+    def Close(self):
+        self._charge('Close')
+        self.is_open = False
+
+    def GetDeviceInfo(self, device_info):
+        self._charge('GetDeviceInfo')
+        if not self.is_open:
+            return self.DeviceNotOpen
+        device_info.productName = 'XEM7310-A75 (simulated)'
+        device_info.deviceMajorVersion = 1
+        device_info.deviceMinorVersion = 0
+        device_info.serialNumber = self.serial
+        device_info.deviceID = 'pyripherals simulator'
+        device_info.usbSpeed = 2
+        return self.NoError
+
+    def GetSerialNumber(self):
+        return self.serial
+
+    def LoadDefaultPLLConfiguration(self):
+        self._charge('LoadDefaultPLLConfiguration')
+        return self.NoError
+
+    def ConfigureFPGA(self, bitfile):
+        self._charge('ConfigureFPGA')
+        if not os.path.exists(bitfile):
+            return self.FileError
+        self.bitfile = bitfile
+        return self.NoError
+
+    def IsFrontPanelEnabled(self):
+        self._charge('IsFrontPanelEnabled')
+        return True
+
+    # Wires
+    def SetWireInValue(self, ep, val, mask=0xffffffff):
+        self._charge('SetWireInValue')
+        if ep not in WIRE_IN_ADDRESSES:
+            return self.InvalidEndpoint
+        current = self._staged_wire_ins.get(ep, self.wire_ins.get(ep, 0))
+        self._staged_wire_ins[ep] = (current & ~mask) | (val & mask)
+        return self.NoError
+
+    def GetWireInValue(self, ep):
+        return self._staged_wire_ins.get(ep, self.wire_ins.get(ep, 0))
+
+    def UpdateWireIns(self):
+        self._charge('UpdateWireIns')
+        self.wire_ins.update(self._staged_wire_ins)
+        self._staged_wire_ins = {}
+
+    def UpdateWireOuts(self):
+        self._charge('UpdateWireOuts')
+        snapshot = dict(self.wire_outs)
+        for controller in self.i2c_controllers:
+            ep = controller.endpoints['OUT']
+            mask = 0xff << ep.bit_index_low
+            snapshot[ep.address] = (snapshot.get(ep.address, 0) & ~mask) | controller.out_value()
+        self._wire_out_snapshot = snapshot
+
+    def GetWireOutValue(self, epAddr):
+        self._charge('GetWireOutValue')
+        if epAddr not in WIRE_OUT_ADDRESSES:
+            return self.InvalidEndpoint
+        return self._wire_out_snapshot.get(epAddr, 0)
+
+    # Triggers
+    def ActivateTriggerIn(self, epAddr, bit):
+        self._charge('ActivateTriggerIn')
+        if epAddr not in TRIGGER_IN_ADDRESSES:
+            return self.InvalidEndpoint
+        self.trigger_in_counts[(epAddr, bit)] += 1
+        handler = self.trigger_in_handlers.get((epAddr, bit))
+        if handler is not None:
+            handler(self)
+        return self.NoError
+
+    def UpdateTriggerOuts(self):
+        self._charge('UpdateTriggerOuts')
+        self._trigger_outs = self._trigger_outs_pending
+        self._trigger_outs_pending = {}
+
+    def IsTriggered(self, epAddr, mask):
+        self._charge('IsTriggered')
+        return bool(self._trigger_outs.get(epAddr, 0) & mask)
+
+    # Pipes
+    def _read_pipe(self, epAddr, num_bytes):
+        if self.ddr3 is not None and epAddr == self.ddr3.endpoints['BLOCK_PIPE_OUT'].address:
+            return self.ddr3.frames(num_bytes // 16)
+        if self.ddr3 is not None and 'BLOCK_PIPE_OUT_FG' in self.ddr3.endpoints \
+                and epAddr == self.ddr3.endpoints['BLOCK_PIPE_OUT_FG'].address:
+            return self.ddr3.read_fg(num_bytes)
+        for controller in self.i2c_controllers:
+            if 'PIPE_OUT' in controller.endpoints and epAddr == controller.endpoints['PIPE_OUT'].address:
+                data = bytes(controller.pipe_data[:num_bytes])
+                del controller.pipe_data[:num_bytes]
+                return data + bytes(num_bytes - len(data))
+        fifo = self.pipe_out_data.get(epAddr, bytearray())
+        data = bytes(fifo[:num_bytes])
+        del fifo[:num_bytes]
+        return data + bytes(num_bytes - len(data))
+
+    def _write_pipe(self, epAddr, data):
+        ddr3_in = None if self.ddr3 is None else self.ddr3.endpoints.get('BLOCK_PIPE_IN')
+        if ddr3_in is not None and epAddr == ddr3_in.address:
+            self.ddr3.write(data)
+        self.pipe_in_data.setdefault(epAddr, bytearray()).extend(bytes(data))
+
+    def ReadFromPipeOut(self, epAddr, data):
+        num_bytes = len(memoryview(data).cast('B'))
+        self._charge('ReadFromPipeOut', num_bytes)
+        if epAddr not in PIPE_OUT_ADDRESSES:
+            return self.InvalidEndpoint
+        if num_bytes % 16:
+            return self.DataAlignmentError
+        memoryview(data).cast('B')[:] = self._read_pipe(epAddr, num_bytes)
+        return num_bytes
+
+    def ReadFromBlockPipeOut(self, epAddr, blockSize, data):
+        num_bytes = len(memoryview(data).cast('B'))
+        self._charge('ReadFromBlockPipeOut', num_bytes)
+        if epAddr not in PIPE_OUT_ADDRESSES:
+            return self.InvalidEndpoint
+        if blockSize < 16 or blockSize > 16384 or blockSize % 16:
+            return self.InvalidBlockSize
+        if num_bytes % blockSize:
+            return self.DataAlignmentError
+        memoryview(data).cast('B')[:] = self._read_pipe(epAddr, num_bytes)
+        return num_bytes
+
+    def WriteToPipeIn(self, epAddr, data):
+        num_bytes = len(memoryview(data).cast('B'))
+        self._charge('WriteToPipeIn', num_bytes)
+        if epAddr not in PIPE_IN_ADDRESSES:
+            return self.InvalidEndpoint
+        if num_bytes % 16:
+            return self.DataAlignmentError
+        self._write_pipe(epAddr, data)
+        return num_bytes
+
+    def WriteToBlockPipeIn(self, epAddr, blockSize, data):
+        num_bytes = len(memoryview(data).cast('B'))
+        self._charge('WriteToBlockPipeIn', num_bytes)
+        if epAddr not in PIPE_IN_ADDRESSES:
+            return self.InvalidEndpoint
+        if blockSize < 16 or blockSize > 16384 or blockSize % 16:
+            return self.InvalidBlockSize
+        if num_bytes % blockSize:
+            return self.DataAlignmentError
+        self._write_pipe(epAddr, data)
+        return num_bytes
+
+    # Register bridge
+    def WriteRegister(self, addr, data):
+        self._charge('WriteRegister')
+        self.registers[addr] = data
+        return self.NoError
+
+    def ReadRegister(self, addr):
+        self._charge('ReadRegister')
+        return self.registers.get(addr, 0)
+
+    def WriteRegisters(self, regs):
+        self._charge('WriteRegisters')
+        for reg in regs:
+            self.registers[reg.address] = reg.data
+        return self.NoError
+
+    def ReadRegisters(self, regs):
+        self._charge('ReadRegisters')
+        for reg in regs:
+            reg.data = self.registers.get(reg.address, 0)
+        return self.NoError
+
+
+class FrontPanelSimulator:
+    """Configured stand-in for the ok module.
+
+    Pass as FPGA(frontpanel=...) to open an okCFrontPanel made with the given
+    arguments. The simulator module itself can be passed for the defaults.
+
+    Attributes
+    ----------
+    kwargs : dict
+        Keyword arguments for okCFrontPanel.
+    devices : list
+        Every okCFrontPanel opened through this simulator.
+    """
+
+    okTDeviceInfo = okTDeviceInfo
+    okTRegisterEntry = okTRegisterEntry
+    okTRegisterEntries = okTRegisterEntries
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.devices = []
+
+    def okCFrontPanel(self):
+        device = okCFrontPanel(**self.kwargs)
+        self.devices.append(device)
+        return device
@@ -0,0 +1,350 @@
+"""Record the Opal Kelly API calls of a session and replay them without a board.
+
+Record with FPGA.start_trace(path). Replay by opening an FPGA on the trace:
+
+    f = FPGA(bitfile=..., frontpanel=TraceReplay(path))
+
+The replayed calls must come in the recorded order. Pipe reads are filled from
+the recorded payloads so host-side processing sees the recorded data.
+
+Trace file format (all little-endian): the 8 byte MAGIC, a uint16 version,
+then one record per call. A record is a uint8 method id, float64 start time
+and duration in seconds, the tagged return value, a uint8 number of
+positional arguments and a uint8 number of keyword arguments followed by the
+tagged arguments (keyword arguments are preceded by their name as a tagged
+string). The first record using a method id is preceded by a definition: id
+255, the uint8 new id, and the method name as a tagged string.
+
+Abe Stroschein, ajstroschein@stthomas.edu
+
+Lucas Koerner, koer2434@stthomas.edu
+"""
+
+import io
+import json
+import numbers
+import struct
+import time
+import hashlib
+from collections import namedtuple
+from .simulator import FrontPanelErrorCodes, okTDeviceInfo, okTRegisterEntry, okTRegisterEntries, wait
+
+
+MAGIC = b'PYRTRACE'
+VERSION = 1
+DEFINE_METHOD = 255
+
+# API methods that fill their data argument
+READ_METHODS = {'ReadFromPipeOut', 'ReadFromBlockPipeOut'}
+# API methods that send their data argument
+WRITE_METHODS = {'WriteToPipeIn', 'WriteToBlockPipeIn'}
+
+DEVICE_INFO_FIELDS = ('productName', 'deviceMajorVersion', 'deviceMinorVersion', 'serialNumber', 'deviceID',
+                      'usbSpeed')
+
+TraceEntry = namedtuple('TraceEntry', ['method', 'start', 'duration', 'result', 'args', 'kwargs'])
+
+
+class Digest(namedtuple('Digest', ['length', 'digest'])):
+    """Length and 8 byte BLAKE2b digest of a payload that was not recorded."""
+
+    @classmethod
+    def of(cls, data):
+        data = memoryview(data).cast('B')
+        return cls(len(data), hashlib.blake2b(data, digest_size=8).digest())
+
+
+class TraceMismatchError(Exception):
+    """A replayed call does not match the next call in the trace."""
+
+
+def _is_buffer(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return True
+    return hasattr(value, '__array_interface__')
+
+
+def _encode(out, value, payload=True):
+    """Write value to out as a tag byte and its data."""
+
+    if value is None:
+        out.write(b'N')
+    elif value is True or value is False:
+        out.write(b'T' if value else b'F')
+    elif isinstance(value, numbers.Integral) and -2**63 <= value < 2**63:
+        out.write(b'i' + struct.pack('<q', int(value)))
+    elif isinstance(value, float):
+        out.write(b'f' + struct.pack('<d', value))
+    elif isinstance(value, str):
+        data = value.encode('utf-8')
+        out.write(b's' + struct.pack('<I', len(data)) + data)
+    elif isinstance(value, Digest):
+        out.write(b'h' + struct.pack('<I', value.length) + value.digest)
+    elif _is_buffer(value):
+        if payload:
+            data = memoryview(value).cast('B')
+            out.write(b'b' + struct.pack('<I', len(data)))
+            out.write(data)
+        else:
+            _encode(out, Digest.of(value))
+    elif type(value).__name__ == 'okTDeviceInfo':
+        out.write(b'D')
+        _encode(out, json.dumps({field: getattr(value, field) for field in DEVICE_INFO_FIELDS}))
+    elif type(value).__name__ == 'okTRegisterEntries':
+        out.write(b'R' + struct.pack('<I', len(value)))
+        for reg in value:
+            out.write(struct.pack('<II', reg.address, reg.data))
+    else:
+        _encode(out, repr(value))
+
+
+def _read(file, num_bytes):
+    data = file.read(num_bytes)
+    if len(data) != num_bytes:
+        raise EOFError
+    return data
+
+
+def _decode(file):
+    """Read one tagged value from file."""
+
+    tag = _read(file, 1)
+    if tag == b'N':
+        return None
+    if tag == b'T':
+        return True
+    if tag == b'F':
+        return False
+    if tag == b'i':
+        return struct.unpack('<q', _read(file, 8))[0]
+    if tag == b'f':
+        return struct.unpack('<d', _read(file, 8))[0]
+    if tag == b's':
+        length, = struct.unpack('<I', _read(file, 4))
+        return _read(file, length).decode('utf-8')
+    if tag == b'b':
+        length, = struct.unpack('<I', _read(file, 4))
+        return _read(file, length)
+    if tag == b'h':
+        length, = struct.unpack('<I', _read(file, 4))
+        return Digest(length, _read(file, 8))
+    if tag == b'D':
+        device_info = okTDeviceInfo()
+        for field, value in json.loads(_decode(file)).items():
+            setattr(device_info, field, value)
+        return device_info
+    if tag == b'R':
+        length, = struct.unpack('<I', _read(file, 4))
+        regs = okTRegisterEntries()
+        for _ in range(length):
+            regs.append(okTRegisterEntry(*struct.unpack('<II', _read(file, 8))))
+        return regs
+    raise ValueError(f'Unknown tag {tag} in trace')
+
+
+def read_trace(path):
+    """Yield each call recorded in the trace file at path as a TraceEntry.
+
+    Buffers are bytes if their payload was recorded, otherwise a Digest.
+    """
+
+    with open(path, 'rb') as file:
+        if _read(file, len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a pyripherals trace')
+        version, = struct.unpack('<H', _read(file, 2))
+        if version != VERSION:
+            raise ValueError(f'Trace version {version} not supported')
+
+        methods = {}
+        while True:
+            try:
+                method_id = _read(file, 1)[0]
+            except EOFError:
+                return
+            if method_id == DEFINE_METHOD:
+                new_id = _read(file, 1)[0]
+                methods[new_id] = _decode(file)
+                continue
+            start, duration = struct.unpack('<dd', _read(file, 16))
+            result = _decode(file)
+            num_args, num_kwargs = _read(file, 2)
+            args = [_decode(file) for _ in range(num_args)]
+            kwargs = {}
+            for _ in range(num_kwargs):
+                name = _decode(file)
+                kwargs[name] = _decode(file)
+            yield TraceEntry(methods[method_id], start, duration, result, args, kwargs)
+
+
+class TraceRecorder:
+    """Wrapper for an okCFrontPanel that writes every call to a trace file.
+
+    Attributes are passed through to the wrapped okCFrontPanel, so it can be
+    used in its place.
+
+    Attributes
+    ----------
+    read_payloads : bool
+        Whether to record the data of pipe reads. Needed to replay reads.
+    write_payloads : bool
+        Whether to record the data of pipe writes. If False only a digest is
+        recorded.
+    """
+
+    def __init__(self, xem, path, read_payloads=True, write_payloads=False):
+        self.__dict__.update(_xem=xem, _file=open(path, 'wb'), _methods={}, _t0=time.perf_counter(),
+                             read_payloads=read_payloads, write_payloads=write_payloads)
+        self._file.write(MAGIC + struct.pack('<H', VERSION))
+
+    def attach(self, xem):
+        """Record the calls to xem from now on."""
+
+        for name in [k for k, v in self.__dict__.items() if callable(v)]:
+            del self.__dict__[name]
+        self.__dict__['_xem'] = xem
+
+    def close(self):
+        """Finish the trace file."""
+
+        if not self._file.closed:
+            self._file.close()
+
+    def _write(self, name, start, duration, result, args, kwargs):
+        method_id = self._methods.get(name)
+        out = io.BytesIO()
+        if method_id is None:
+            method_id = self._methods[name] = len(self._methods)
+            out.write(bytes([DEFINE_METHOD, method_id]))
+            _encode(out, name)
+        out.write(bytes([method_id]) + struct.pack('<dd', start, duration))
+        _encode(out, result)
+        out.write(bytes([len(args), len(kwargs)]))
+        payload = self.read_payloads if name in READ_METHODS else self.write_payloads
+        for arg in args:
+            _encode(out, arg, payload)
+        for key, arg in kwargs.items():
+            _encode(out, key)
+            _encode(out, arg, payload)
+        self._file.write(out.getbuffer())
+
+    def __getattr__(self, name):
+        attr = getattr(self._xem, name)
+        if not callable(attr):
+            return attr
+
+        def wrapped(*args, **kwargs):
+            start = time.perf_counter()
+            result = attr(*args, **kwargs)
+            duration = time.perf_counter() - start
+            if not self._file.closed:
+                self._write(name, start - self._t0, duration, result, args, kwargs)
+            return result
+
+        self.__dict__[name] = wrapped
+        return wrapped
+
+    def __setattr__(self, name, value):
+        setattr(self._xem, name, value)
+
+
+class ReplayFrontPanel(FrontPanelErrorCodes):
+    """okCFrontPanel stand-in that returns the results recorded in a trace.
+
+    Attributes
+    ----------
+    entries : list
+        The TraceEntry of each recorded call.
+    index : int
+        Index of the next entry to replay.
+    strict : bool
+        Whether to raise TraceMismatchError when the arguments of a call do
+        not match the recording. The method name must always match.
+    realtime : bool
+        Whether to wait for the recorded duration of each call.
+    """
+
+    def __init__(self, entries, strict=True, realtime=False):
+        self.entries = entries
+        self.index = 0
+        self.strict = strict
+        self.realtime = realtime
+
+    def _check(self, entry, recorded, value):
+        if isinstance(recorded, Digest):
+            matches = _is_buffer(value) and (entry.method in READ_METHODS or recorded == Digest.of(value))
+        elif isinstance(recorded, bytes):
+            matches = _is_buffer(value) and (entry.method in READ_METHODS or recorded == bytes(memoryview(value).cast('B')))
+        elif isinstance(recorded, (int, float, str)) or recorded is None:
+            matches = recorded == value
+        else:
+            matches = True
+        if not matches:
+            raise TraceMismatchError(f'Call {self.index} to {entry.method}: got {value!r}, recorded {recorded!r}')
+
+    def _replay(self, name, args, kwargs):
+        if self.index >= len(self.entries):
+            raise TraceMismatchError(f'Call to {name} after the end of the trace')
+        entry = self.entries[self.index]
+        if entry.method != name:
+            raise TraceMismatchError(f'Call {self.index} to {name}, recorded call to {entry.method}')
+        if self.strict:
+            if len(args) != len(entry.args) or set(kwargs) != set(entry.kwargs):
+                raise TraceMismatchError(f'Call {self.index} to {name} has different arguments than recorded')
+            for recorded, value in zip(entry.args, args):
+                self._check(entry, recorded, value)
+            for key, value in kwargs.items():
+                self._check(entry, entry.kwargs[key], value)
+
+        # Fill in what the call returns through its arguments
+        pairs = list(zip(entry.args, args)) + [(entry.kwargs[k], v) for k, v in kwargs.items() if k in entry.kwargs]
+        for recorded, value in pairs:
+            if name in READ_METHODS and isinstance(recorded, bytes):
+                memoryview(value).cast('B')[:len(recorded)] = recorded
+            elif isinstance(recorded, okTDeviceInfo):
+                for field in DEVICE_INFO_FIELDS:
+                    setattr(value, field, getattr(recorded, field))
+            elif name == 'ReadRegisters' and isinstance(recorded, okTRegisterEntries):
+                for reg, recorded_reg in zip(value, recorded):
+                    reg.data = recorded_reg.data
+
+        if self.realtime:
+            wait(entry.duration)
+        self.index += 1
+        return entry.result
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def replayed(*args, **kwargs):
+            return self._replay(name, args, kwargs)
+
+        return replayed
+
+
+class TraceReplay:
+    """Stand-in for the ok module that opens a ReplayFrontPanel on a trace.
+
+    Pass as FPGA(frontpanel=...).
+
+    Attributes
+    ----------
+    path : str
+        The trace file.
+    strict : bool
+        See ReplayFrontPanel.
+    realtime : bool
+        See ReplayFrontPanel.
+    """
+
+    okTDeviceInfo = okTDeviceInfo
+    okTRegisterEntry = okTRegisterEntry
+    okTRegisterEntries = okTRegisterEntries
+
+    def __init__(self, path, strict=True, realtime=False):
+        self.path = path
+        self.strict = strict
+        self.realtime = realtime
+
+    def okCFrontPanel(self):
+        return ReplayFrontPanel(list(read_trace(self.path)), strict=self.strict, realtime=self.realtime)
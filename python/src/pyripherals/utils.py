@@ -8,6 +8,7 @@ Lucas Koerner, koer2434@stthomas.edu
 from typing import Type
 import matplotlib.pyplot as plt
 import time
+import math
 import numpy as np
 from scipy.fft import rfft
 from scipy.signal.windows import hann
@@ -16,6 +17,7 @@ import sys
 import yaml
 import os
 import h5py
+from .packing import pack_int
 
 home_dir = os.path.join(os.path.expanduser('~'), '.pyripherals')
 DEFAULT_CONFIGS = {
@@ -105,36 +107,11 @@ def int_to_list(integer, byteorder='little', num_bytes=None):
         represent the number.
     """
 
-    list_int = []
-
-    while integer != 0:
-        # Take the least significant byte and append it to the list, then shift the integer right 1 byte.
-        byte = integer % 2**(8)
-        list_int.append(byte)
-        integer >>= 8
-
-    # In case integer began at 0.
-    if len(list_int) == 0:
-        list_int.append(0)
-
-    if num_bytes is not None:
-        # User entered a number of bytes
-        # Check if the integer fits into the given number of bytes
-        if num_bytes < len(list_int):
-            return False
-        else:
-            # Fill the list with 0 for remaining bytes
-            for i in range(num_bytes - len(list_int)):
-                # Can append to the end because the list will be reversed in the return
-                list_int.append(0)
-
-    if byteorder == 'little':
-        return list_int
-    elif byteorder == 'big':
-        return list_int[::-1]
-    else:
+    if byteorder not in ('little', 'big'):
         print(f'Unknown byteorder "{byteorder}", using "little" instead')
-        return list_int
+        byteorder = 'little'
+    # False when the integer does not fit into num_bytes
+    return pack_int(integer, num_bytes=num_bytes, byteorder=byteorder, out='list')
 
 
 def int_to_custom_signed(data, num_bits):
@@ -179,13 +156,83 @@ def int_to_custom_signed(data, num_bits):
     return np.bitwise_and(data, (1 << num_bits) - 1)
 
 
+def signed_dtype(num_bits):
+    """Return the narrowest NumPy signed integer dtype holding num_bits bits."""
+
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if num_bits <= np.dtype(dtype).itemsize * 8:
+            return np.dtype(dtype)
+    raise ValueError(f'num_bits={num_bits} greater than maximum 64')
+
+
+def sign_extend(data, num_bits, out=None):
+    """Return the signed values of num_bits-bit two's complement data.
+
+    Bits above num_bits are ignored. For arrays the data is copied once into
+    out (with a wrapping cast, which sign-extends 8, 16, 32, and 64 bit data),
+    and other widths such as 18 bits are sign-extended in place in out with a
+    left then an arithmetic right shift. No other temporary arrays are made.
+
+    Parameters
+    ----------
+    data : int or list(int) or np.ndarray(int)
+        The two's complement data.
+    num_bits : int
+        The number of bits the numbers are represented in.
+    out : np.ndarray
+        Optional signed integer array of the same shape to put the result in,
+        at least num_bits wide. Can be a view of data (e.g.
+        data.view(np.int32) for uint32 data) to convert in place. Default is
+        a new array of signed_dtype(num_bits).
+
+    Returns
+    -------
+    int or np.ndarray
+        The signed data, out if given.
+
+    Examples
+    --------
+    >>>sign_extend(65531, 16)
+    -5
+    >>>sign_extend(np.array([65531, 5], dtype=np.uint16), 16)
+    array([-5,  5], dtype=int16)
+    >>>sign_extend(np.array([0x3fffb], dtype=np.uint32), 18)
+    array([-5], dtype=int32)
+    """
+
+    if type(data) is list:
+        data = np.array(data)
+    if type(data) is not np.ndarray:
+        if not np.issubdtype(type(data), np.integer):
+            raise TypeError(f'sign_extend data must be of type int, list(int), or np.ndarray(int). Got type {type(data)}.')
+        sign = 1 << (num_bits - 1)
+        return ((int(data) & ((1 << num_bits) - 1)) ^ sign) - sign
+
+    if not np.issubdtype(data.dtype, np.integer):
+        raise TypeError(f'sign_extend data array must have dtype np.integer. Got type {data.dtype}')
+    if out is None:
+        out = np.empty(data.shape, dtype=signed_dtype(num_bits))
+    elif not np.issubdtype(out.dtype, np.signedinteger) or out.dtype.itemsize * 8 < num_bits:
+        raise TypeError(f'sign_extend out must be a signed integer array of at least {num_bits} bits. Got type {out.dtype}')
+
+    # out may be a view of data with the same bytes, then there is nothing to copy
+    same_memory = (out.dtype.itemsize == data.dtype.itemsize and out.strides == data.strides
+                   and out.__array_interface__['data'][0] == data.__array_interface__['data'][0])
+    if not same_memory:
+        np.copyto(out, data, casting='unsafe')
+    shift = out.dtype.itemsize * 8 - num_bits
+    if shift:
+        out <<= shift
+        out >>= shift
+    return out
+
+
 def custom_signed_to_int(data, num_bits):
     """Return the Python int form of a two's complement integer in the given number of bits.
-    
-    For negative numbers, we invert all bits (in num_bits) and add 1 (only
-    keeping num_bits) to apply two's complement and get the positive version
-    of the number. Then we multiply the number by -1 so it has the same value
-    as before, but now as a 32-bit Python int.
+
+    Arrays are returned as int (64-bit) arrays, made with sign_extend in one
+    pass without temporary arrays. Use sign_extend directly to keep the
+    narrowest dtype or to convert in place.
 
     Parameters
     ----------
@@ -213,22 +260,14 @@ def custom_signed_to_int(data, num_bits):
     if type(data) is list:
         data = np.array(data)
     if type(data) is np.ndarray:
-        if np.issubdtype(data.dtype, np.integer):
-            # Use bitwise_xor to invert bits, then add one, then use bitwise_and to keep only num_bits, allowing the rest to overflow out. Multiply by -1 to get the negative integer version.
-            int_data = np.where(data & (1 << num_bits - 1), np.bitwise_and(np.bitwise_xor(
-                np.abs(data), 2**num_bits - 1) + 1, 2 ** num_bits - 1) * -1, data).astype(int)
-        else:
+        if not np.issubdtype(data.dtype, np.integer):
             raise TypeError(f'custom_signed_to_int data array must have dtype np.integer. Got type {data.dtype}')
+        return sign_extend(data, num_bits, out=np.empty(data.shape, dtype=int))
     elif np.issubdtype(type(data), np.integer):
-        # Use bitwise_xor to invert bits, then add one, then use bitwise_and to keep only num_bits, allowing the rest to overflow out. Multiply by -1 to get the negative integer version.
-        int_data = np.bitwise_and(np.bitwise_xor(np.abs(
-            data), 2**num_bits - 1) + 1, 2 ** num_bits - 1) * -1 if data & (1 << num_bits - 1) else data
-        int_data = int(int_data)
+        return sign_extend(data, num_bits)
     else:
         raise TypeError(f'custom_signed_to_int data must be of type int, list(int), or np.ndarray(int). Got type {type(data)}.')
 
-    return int_data
-
 
 def to_voltage(data, num_bits, voltage_range, use_twos_comp=False):
     """Convert the binary read data into a float voltage.
@@ -253,7 +292,7 @@ def to_voltage(data, num_bits, voltage_range, use_twos_comp=False):
 
     bit_voltage = voltage_range / (2 ** num_bits)
     if use_twos_comp:
-        data = custom_signed_to_int(data=data, num_bits=num_bits)
+        data = sign_extend(data=data, num_bits=num_bits)
 
     if type(data) is np.ndarray:
         voltage = data * bit_voltage
@@ -321,6 +360,194 @@ def from_voltage(voltage, num_bits, voltage_range, with_negatives=False):
     return data
 
 
+class ChannelConverter:
+    """Convert the codes of one data converter channel to and from voltages.
+
+    Built once per channel so that bit_voltage, the calibration, and the
+    limits are worked out up front instead of on every call. A channel of 16
+    bits or fewer converts codes with a lookup table of the voltage of every
+    code, so sign extension, gain, and offset cost a single gather.
+
+    The voltage of a code is gain * code * bit_voltage + offset, where code is
+    sign-extended first for a signed channel. Converting a voltage to a code
+    is the inverse, rounded down like from_voltage, except that voltages
+    within rounding error below a code give that code. So codes survive a
+    round trip through to_voltage and from_voltage, also in np.float32 for
+    channels of up to 16 bits.
+
+    Attributes
+    ----------
+    num_bits : int
+        The bit width of the codes. Maximum 32.
+    voltage_range : float
+        The total voltage range (peak-to-peak) of the channel.
+    signed : bool
+        True if the codes are two's complement, False otherwise.
+    gain : float
+        Calibrated gain of the channel.
+    offset : float
+        Calibrated offset of the channel in volts.
+    dtype : np.dtype
+        np.float64 or np.float32, the type of the voltages returned.
+    bit_voltage : float
+        The voltage of one code before calibration.
+    code_dtype : np.dtype
+        The narrowest unsigned integer dtype holding num_bits bits, the type
+        of the codes returned.
+    min_code, max_code : int
+        The smallest and largest codes, min_code is negative for a signed
+        channel.
+    min_voltage, max_voltage : float
+        The voltages of min_code and max_code.
+    """
+
+    # Largest num_bits converted with a lookup table
+    TABLE_BITS = 16
+
+    def __init__(self, num_bits, voltage_range, signed=False, gain=1.0, offset=0.0, dtype=np.float64):
+        if num_bits > 32:
+            raise ValueError(f'ChannelConverter num_bits={num_bits} greater than maximum 32')
+        if gain == 0:
+            raise ValueError('ChannelConverter gain must not be 0')
+        self.num_bits = num_bits
+        self.voltage_range = voltage_range
+        self.signed = signed
+        self.gain = gain
+        self.offset = offset
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float64, np.float32):
+            raise TypeError(f'ChannelConverter dtype must be np.float64 or np.float32. Got {self.dtype}')
+
+        self.bit_voltage = voltage_range / (2 ** num_bits)
+        self.code_dtype = next(np.dtype(t) for t in (np.uint8, np.uint16, np.uint32)
+                               if num_bits <= np.dtype(t).itemsize * 8)
+        self.min_code = -(1 << (num_bits - 1)) if signed else 0
+        self.max_code = self.min_code + (1 << num_bits) - 1
+        self.min_voltage = self._scalar_to_voltage(self.min_code)
+        self.max_voltage = self._scalar_to_voltage(self.max_code)
+        self._scale = gain * self.bit_voltage
+        self._table = None
+        if num_bits <= ChannelConverter.TABLE_BITS:
+            codes = np.arange(1 << num_bits)
+            if signed:
+                codes = sign_extend(codes, num_bits, out=codes)
+            self._table = (codes * self._scale + offset).astype(self.dtype)
+
+    def __repr__(self):
+        return (f'ChannelConverter(num_bits={self.num_bits}, voltage_range={self.voltage_range}, '
+                f'signed={self.signed}, gain={self.gain}, offset={self.offset}, dtype=np.{self.dtype})')
+
+    def _scalar_to_voltage(self, code):
+        if self.signed:
+            code = sign_extend(code, self.num_bits)
+        return self.gain * code * self.bit_voltage + self.offset
+
+    def to_voltage(self, data, out=None):
+        """Convert codes to voltages.
+
+        Bits above num_bits are ignored.
+
+        Parameters
+        ----------
+        data : int or list(int) or np.ndarray(np.integer)
+            The codes.
+        out : np.ndarray
+            Optional float array of the same shape to put the voltages in.
+
+        Returns
+        -------
+        float or np.ndarray : the voltages, out if given. A scalar float is
+        returned if data was a scalar.
+        """
+
+        if type(data) is list:
+            data = np.array(data)
+        if type(data) is not np.ndarray:
+            if not np.issubdtype(type(data), np.integer):
+                raise TypeError(f'to_voltage data expected np.integer, list, or np.ndarray type, got {type(data)}')
+            return float(self._scalar_to_voltage(int(data) & ((1 << self.num_bits) - 1)))
+        if not np.issubdtype(data.dtype, np.integer):
+            raise TypeError(f'to_voltage data array must have dtype np.integer. Got type {data.dtype}')
+        if out is None:
+            out = np.empty(data.shape, dtype=self.dtype)
+
+        if self._table is not None:
+            # Wrapping indices keeps the low num_bits bits, also of negative codes
+            return np.take(self._table, data, out=out, mode='wrap')
+        if self.signed:
+            data = sign_extend(data, self.num_bits, out=np.empty(data.shape, dtype=np.int64))
+        else:
+            data = np.bitwise_and(data, (1 << self.num_bits) - 1, dtype=np.int64)
+        np.multiply(data, self._scale, out=out, casting='unsafe')
+        if self.offset:
+            out += self.offset
+        return out
+
+    def _nudge(self, dtype):
+        """Return the voltage added before rounding down so that voltages from
+        to_voltage, which carry rounding error, give back their own code."""
+
+        eps = np.finfo(dtype).eps if np.issubdtype(dtype, np.floating) else np.finfo(np.float64).eps
+        # At most half a code, past that the dtype cannot tell codes apart anyway
+        return min(2 * eps * (1 << self.num_bits), 0.5) * abs(self._scale)
+
+    def from_voltage(self, voltage, out=None, clip=True):
+        """Convert voltages to codes.
+
+        Parameters
+        ----------
+        voltage : float or list(float) or np.ndarray
+            The voltages.
+        out : np.ndarray
+            Optional integer array of the same shape to put the codes in.
+        clip : bool
+            True to limit the codes to min_code through max_code, so that
+            voltages outside of the range give the nearest full-scale code.
+            False to keep only the low num_bits bits of the codes instead.
+
+        Returns
+        -------
+        int or np.ndarray : the codes, in two's complement form for a signed
+        channel. Out if given, otherwise an array of code_dtype. A scalar int
+        is returned if voltage was a scalar.
+        """
+
+        mask = (1 << self.num_bits) - 1
+        if type(voltage) is list:
+            voltage = np.array(voltage, dtype=np.float64)
+        if type(voltage) is not np.ndarray:
+            if not (np.issubdtype(type(voltage), np.integer) or np.issubdtype(type(voltage), np.floating)):
+                raise TypeError(f'from_voltage voltage expected np.integer, np.floating, list, or np.ndarray type, got {type(voltage)}')
+            code = math.floor((voltage - self.offset + self._nudge(np.float64)) / self._scale)
+            if clip:
+                code = min(max(code, self.min_code), self.max_code)
+            return code & mask
+        if out is None:
+            out = np.empty(voltage.shape, dtype=self.code_dtype)
+
+        # Work in one float64 array, then cast into out. Divide then floor is
+        # much faster than floor_divide.
+        work = np.subtract(voltage, self.offset - self._nudge(voltage.dtype), dtype=np.float64)
+        np.divide(work, self._scale, out=work)
+        np.floor(work, out=work)
+        if not clip:
+            return np.bitwise_and(work.astype(np.int64), mask, out=out, casting='unsafe')
+        np.maximum(work, self.min_code, out=work)
+        np.minimum(work, self.max_code, out=work)
+        if not self.signed:
+            np.copyto(out, work, casting='unsafe')
+            return out
+        # Cast negative codes through a signed view of out, then keep num_bits
+        # bits for two's complement form
+        if out.dtype.kind == 'u':
+            np.copyto(out.view(out.dtype.str.replace('u', 'i')), work, casting='unsafe')
+        else:
+            np.copyto(out, work, casting='unsafe')
+        if out.dtype.kind != 'u' or out.dtype.itemsize * 8 != self.num_bits:
+            out &= mask
+        return out
+
+
 def get_timestamp():
     return int((datetime.datetime.utcnow() - datetime.datetime(1970, 1, 1)).total_seconds() * 1000)
 
@@ -354,6 +581,73 @@ def calc_impedance(v_in, v_out, resistance):
     
     return impedance_calc
 
+def calc_impedance_at(v_in, v_out, resistance, freqs, fs, chunk_size=2**14):
+    """Calculate the impedance of an unknown component at only the given frequencies.
+
+    Gives the values of calc_impedance at the rfft bins nearest to freqs
+    without the full rffts. The DFT of each bin is summed over chunks of the
+    record with a table of chunk_size phasors, so the time is O(N * len(freqs))
+    and the memory used does not grow with the record length. The Hann window
+    of calc_impedance is applied in the frequency domain, from the unwindowed
+    neighboring bins.
+
+    Arguments
+    ---------
+    v_in : np.ndarray(int or float)
+        The sinusoidal voltage source in the circuit.
+    v_out : np.ndarray(int or float)
+        The output voltage across the unknown component.
+    resistance : int or float
+        The resistance of the resistor in the circuit in Ohms.
+    freqs : float or list(float) or np.ndarray(float)
+        The frequencies in Hertz to calculate the impedance at.
+    fs : float
+        The sample rate of v_in and v_out in Hertz.
+    chunk_size : int
+        Number of samples summed at once.
+
+    Returns
+    -------
+    impedance : complex or np.ndarray(complex)
+        The impedance at each frequency.
+    bin_freqs : float or np.ndarray(float)
+        The frequency of the rfft bin used for each frequency.
+    """
+
+    n = len(v_in)
+    if len(v_out) != n:
+        raise ValueError(f'calc_impedance_at v_in and v_out lengths differ: {n} and {len(v_out)}')
+    scalar = np.ndim(freqs) == 0
+    bins = np.clip(np.rint(np.atleast_1d(freqs) * n / fs), 0, n // 2).astype(np.int64)
+    # Bins k - 1, k, k + 1 of each frequency for the Hann window
+    neighbors = (bins[:, None] + np.arange(-1, 2)).reshape(-1)
+
+    # Phases in whole turns of n, kept exact with integer arithmetic
+    chunk_size = min(chunk_size, n)
+    phase = 2 * np.pi / n * ((np.arange(chunk_size)[:, None] * neighbors) % n)
+    table = np.hstack((np.cos(phase), np.sin(phase)))
+    del phase
+
+    spectrum = np.zeros((2, len(neighbors)), dtype=complex)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        data = np.vstack((v_in[start:stop], v_out[start:stop])).astype(np.float64, copy=False)
+        sums = data @ table[:stop - start]
+        turns = start * neighbors % n
+        spectrum += (sums[:, :len(neighbors)] - 1j * sums[:, len(neighbors):]) * np.exp(-2j * np.pi / n * turns)
+
+    # Hann window: 0.5 X[k] - 0.25 (X[k - 1] + X[k + 1])
+    spectrum = spectrum.reshape(2, len(bins), 3) @ np.array([-0.25, 0.5, -0.25])
+    w_v_in, w_v_out = spectrum
+    # The current is (v_in - v_out) / resistance and the DFT is linear
+    impedance = w_v_out * resistance / (w_v_in - w_v_out)
+    bin_freqs = bins * fs / n
+
+    if scalar:
+        return impedance[0], bin_freqs[0]
+    return impedance, bin_freqs
+
+
 def get_memory_usage():
     """Get a sorted list of the objects and their sizes."""
 
@@ -0,0 +1,198 @@
+`define GROUP1_EP_ADDR47_GEN_ADDR 8'h2f // bit_width=1
+`define GROUP2_EP1_GEN_BIT 1 // address=GROUP1_EP_ADDR47 bit_width=20
+`define GROUP3_EP31_GEN_BIT_GEN_ADDR 31 // address=0x68 bit_width=28
+`define GROUP1_EP_ADDR188_GEN_BIT 8'hbc // bit_width=7
+`define GROUP2_EP28 28 // address=GROUP1_EP_ADDR188 bit_width=24
+`define GROUP3_EP31_GEN_BIT_GEN_ADDR 31 // address=0x68 bit_width=28
+`define GROUP1_EP_ADDR39_GEN_BIT 8'h27 // bit_width=0
+`define GROUP2_EP5_GEN_ADDR 5 // address=GROUP1_EP_ADDR39 bit_width=8
+`define GROUP3_EP22_GEN_ADDR 22 // address=0xe4 bit_width=4
+`define GROUP1_EP_ADDR180_GEN_BIT 8'hb4 // bit_width=0
+`define GROUP2_EP4_GEN_ADDR 4 // address=GROUP1_EP_ADDR180 bit_width=19
+`define GROUP3_EP20_GEN_BIT 20 // address=0xdc bit_width=1
+`define GROUP1_EP_ADDR233_GEN_BIT_GEN_ADDR 8'he9 // bit_width=17
+`define GROUP2_EP7_GEN_BIT_GEN_ADDR 7 // address=GROUP1_EP_ADDR233 bit_width=20
+`define GROUP3_EP9 9 // address=0xd4 bit_width=25
+`define GROUP1_EP_ADDR199 8'hc7 // bit_width=15
+`define GROUP2_EP21_GEN_BIT 21 // address=GROUP1_EP_ADDR199 bit_width=9
+`define GROUP3_EP28_GEN_BIT_GEN_ADDR 28 // address=0x44 bit_width=18
+`define GROUP1_EP_ADDR191 8'hbf // bit_width=11
+`define GROUP2_EP8_GEN_ADDR 8 // address=GROUP1_EP_ADDR191 bit_width=11
+`define GROUP3_EP10_GEN_BIT_GEN_ADDR 10 // address=0x4c bit_width=16
+`define GROUP1_EP_ADDR246 8'hf6 // bit_width=7
+`define GROUP2_EP29_GEN_BIT 29 // address=GROUP1_EP_ADDR246 bit_width=10
+`define GROUP3_EP17 17 // address=0x17 bit_width=30
+`define GROUP1_EP_ADDR230_GEN_BIT_GEN_ADDR 8'he6 // bit_width=18
+`define GROUP2_EP3 3 // address=GROUP1_EP_ADDR230 bit_width=5
+`define GROUP3_EP1_GEN_BIT_GEN_ADDR 1 // address=0x24 bit_width=6
+`define GROUP1_EP_ADDR250_GEN_BIT_GEN_ADDR 8'hfa // bit_width=3
+`define GROUP2_EP3 3 // address=GROUP1_EP_ADDR230 bit_width=5
+`define GROUP3_EP3 3 // address=0xc bit_width=3
+`define GROUP1_EP_ADDR42_GEN_BIT 8'h2a // bit_width=32
+`define GROUP2_EP19 19 // address=GROUP1_EP_ADDR42 bit_width=19
+`define GROUP3_EP6_GEN_ADDR 6 // address=0x2c bit_width=28
+`define GROUP1_EP_ADDR72_GEN_ADDR 8'h48 // bit_width=5
+`define GROUP2_EP19 19 // address=GROUP1_EP_ADDR42 bit_width=19
+`define GROUP3_EP23_GEN_BIT 23 // address=0xc5 bit_width=8
+`define GROUP1_EP_ADDR161_GEN_BIT 8'ha1 // bit_width=24
+`define GROUP2_EP19 19 // address=GROUP1_EP_ADDR42 bit_width=19
+`define GROUP3_EP15_GEN_ADDR 15 // address=0x9c bit_width=25
+`define GROUP1_EP_ADDR208_GEN_ADDR 8'hd0 // bit_width=30
+`define GROUP2_EP20_GEN_BIT 20 // address=GROUP1_EP_ADDR208 bit_width=23
+`define GROUP3_EP7 7 // address=0x9a bit_width=9
+`define GROUP1_EP_ADDR46_GEN_ADDR 8'h2e // bit_width=16
+`define GROUP2_EP20_GEN_BIT 20 // address=GROUP1_EP_ADDR208 bit_width=23
+`define GROUP3_EP7 7 // address=0x9a bit_width=9
+`define GROUP1_EP_ADDR181_GEN_BIT 8'hb5 // bit_width=8
+`define GROUP2_EP25 25 // address=GROUP1_EP_ADDR181 bit_width=13
+`define GROUP3_EP7 7 // address=0x9a bit_width=9
+`define GROUP1_EP_ADDR193_GEN_ADDR 8'hc1 // bit_width=30
+`define GROUP2_EP6 6 // address=GROUP1_EP_ADDR193 bit_width=30
+`define GROUP3_EP7 7 // address=0x9a bit_width=9
+`define GROUP1_EP_ADDR147_GEN_BIT 8'h93 // bit_width=0
+`define GROUP2_EP6 6 // address=GROUP1_EP_ADDR193 bit_width=30
+`define GROUP3_EP19_GEN_BIT_GEN_ADDR 19 // address=0x35 bit_width=11
+`define GROUP1_EP_ADDR37 8'h25 // bit_width=12
+`define GROUP2_EP23_GEN_BIT 23 // address=GROUP1_EP_ADDR37 bit_width=14
+`define GROUP3_EP13_GEN_ADDR 13 // address=0x87 bit_width=8
+`define GROUP1_EP_ADDR33_GEN_ADDR 8'h21 // bit_width=4
+`define GROUP2_EP30_GEN_ADDR 30 // address=GROUP1_EP_ADDR33 bit_width=0
+`define GROUP3_EP13_GEN_ADDR 13 // address=0x87 bit_width=8
+`define GROUP1_EP_ADDR22_GEN_ADDR 8'h16 // bit_width=24
+`define GROUP2_EP30_GEN_ADDR 30 // address=GROUP1_EP_ADDR33 bit_width=0
+`define GROUP3_EP13_GEN_ADDR 13 // address=0x87 bit_width=8
+`define GROUP1_EP_ADDR22_GEN_ADDR 8'h16 // bit_width=24
+`define GROUP2_EP30_GEN_ADDR 30 // address=GROUP1_EP_ADDR33 bit_width=0
+`define GROUP3_EP13_GEN_ADDR 13 // address=0x87 bit_width=8
+`define GROUP1_EP_ADDR211 8'hd3 // bit_width=2
+`define GROUP2_EP30_GEN_ADDR 30 // address=GROUP1_EP_ADDR33 bit_width=0
+`define GROUP3_EP13_GEN_ADDR 13 // address=0x87 bit_width=8
+`define GROUP1_EP_ADDR69 8'h45 // bit_width=20
+`define GROUP2_EP14_GEN_BIT_GEN_ADDR 14 // address=GROUP1_EP_ADDR69 bit_width=7
+`define GROUP3_EP25 25 // address=0xc4 bit_width=29
+`define GROUP1_EP_ADDR202 8'hca // bit_width=16
+`define GROUP2_EP14_GEN_BIT_GEN_ADDR 14 // address=GROUP1_EP_ADDR69 bit_width=7
+`define GROUP3_EP32_GEN_BIT 32 // address=0x5d bit_width=13
+`define GROUP1_EP_ADDR116_GEN_BIT_GEN_ADDR 8'h74 // bit_width=19
+`define GROUP2_EP14_GEN_BIT_GEN_ADDR 14 // address=GROUP1_EP_ADDR69 bit_width=7
+`define GROUP3_EP27_GEN_ADDR 27 // address=0xd9 bit_width=21
+`define GROUP1_EP_ADDR94_GEN_ADDR 8'h5e // bit_width=13
+`define GROUP2_EP26_GEN_BIT_GEN_ADDR 26 // address=GROUP1_EP_ADDR94 bit_width=1
+`define GROUP3_EP27_GEN_ADDR 27 // address=0xd9 bit_width=21
+`define GROUP1_EP_ADDR122_GEN_ADDR 8'h7a // bit_width=22
+`define GROUP2_EP9_GEN_BIT_GEN_ADDR 9 // address=GROUP1_EP_ADDR122 bit_width=31
+`define GROUP3_EP27_GEN_ADDR 27 // address=0xd9 bit_width=21
+`define GROUP1_EP_ADDR54_GEN_BIT_GEN_ADDR 8'h36 // bit_width=2
+`define GROUP2_EP9_GEN_BIT_GEN_ADDR 9 // address=GROUP1_EP_ADDR122 bit_width=31
+`define GROUP3_EP24_GEN_BIT 24 // address=0xed bit_width=5
+`define GROUP1_EP_ADDR253 8'hfd // bit_width=18
+`define GROUP2_EP16_GEN_BIT 16 // address=GROUP1_EP_ADDR253 bit_width=30
+`define GROUP3_EP24_GEN_BIT 24 // address=0xed bit_width=5
+`define GROUP1_EP_ADDR201_GEN_ADDR 8'hc9 // bit_width=2
+`define GROUP2_EP16_GEN_BIT 16 // address=GROUP1_EP_ADDR253 bit_width=30
+`define GROUP3_EP24_GEN_BIT 24 // address=0xed bit_width=5
+`define GROUP1_EP_ADDR77_GEN_ADDR 8'h4d // bit_width=14
+`define GROUP2_EP16_GEN_BIT 16 // address=GROUP1_EP_ADDR253 bit_width=30
+`define GROUP3_EP24_GEN_BIT 24 // address=0xed bit_width=5
+`define GROUP1_EP_ADDR130_GEN_ADDR 8'h82 // bit_width=4
+`define GROUP2_EP16_GEN_BIT 16 // address=GROUP1_EP_ADDR253 bit_width=30
+`define GROUP3_EP5_GEN_BIT 5 // address=0xf9 bit_width=1
+`define GROUP1_EP_ADDR216 8'hd8 // bit_width=29
+`define GROUP2_EP16_GEN_BIT 16 // address=GROUP1_EP_ADDR253 bit_width=30
+`define GROUP3_EP5_GEN_BIT 5 // address=0xf9 bit_width=1
+`define GROUP1_EP_ADDR121_GEN_BIT_GEN_ADDR 8'h79 // bit_width=8
+`define GROUP2_EP16_GEN_BIT 16 // address=GROUP1_EP_ADDR253 bit_width=30
+`define GROUP3_EP5_GEN_BIT 5 // address=0xf9 bit_width=1
+`define GROUP1_EP_ADDR67_GEN_ADDR 8'h43 // bit_width=13
+`define GROUP2_EP16_GEN_BIT 16 // address=GROUP1_EP_ADDR253 bit_width=30
+`define GROUP3_EP5_GEN_BIT 5 // address=0xf9 bit_width=1
+`define GROUP1_EP_ADDR136 8'h88 // bit_width=18
+`define GROUP2_EP2_GEN_BIT 2 // address=GROUP1_EP_ADDR136 bit_width=30
+`define GROUP3_EP5_GEN_BIT 5 // address=0xf9 bit_width=1
+`define GROUP1_EP_ADDR136 8'h88 // bit_width=18
+`define GROUP2_EP22 22 // address=GROUP1_EP_ADDR199 bit_width=9
+`define GROUP3_EP29 29 // address=0x78 bit_width=25
+`define GROUP1_EP_ADDR101 8'h65 // bit_width=28
+`define GROUP2_EP22 22 // address=GROUP1_EP_ADDR199 bit_width=9
+`define GROUP3_EP30_GEN_ADDR 30 // address=0xbe bit_width=29
+`define GROUP1_EP_ADDR123_GEN_BIT 8'h7b // bit_width=6
+`define GROUP2_EP22 22 // address=GROUP1_EP_ADDR199 bit_width=9
+`define GROUP3_EP21 21 // address=0x52 bit_width=16
+`define GROUP1_EP_ADDR123_GEN_BIT 8'h7b // bit_width=6
+`define GROUP2_EP22 22 // address=GROUP1_EP_ADDR199 bit_width=9
+`define GROUP3_EP21 21 // address=0x52 bit_width=16
+`define GROUP1_EP_ADDR123_GEN_BIT 8'h7b // bit_width=6
+`define GROUP2_EP0_GEN_BIT_GEN_ADDR 0 // address=GROUP1_EP_ADDR211 bit_width=20
+`define GROUP3_EP16_GEN_BIT_GEN_ADDR 16 // address=0x2e bit_width=23
+`define GROUP1_EP_ADDR143 8'h8f // bit_width=0
+`define GROUP2_EP12_GEN_BIT_GEN_ADDR 12 // address=GROUP1_EP_ADDR143 bit_width=10
+`define GROUP3_EP16_GEN_BIT_GEN_ADDR 16 // address=0x2e bit_width=23
+`define GROUP1_EP_ADDR78_GEN_BIT 8'h4e // bit_width=21
+`define GROUP2_EP12_GEN_BIT_GEN_ADDR 12 // address=GROUP1_EP_ADDR143 bit_width=10
+`define GROUP3_EP26_GEN_BIT 26 // address=0x95 bit_width=26
+`define GROUP1_EP_ADDR78_GEN_BIT 8'h4e // bit_width=21
+`define GROUP2_EP11 11 // address=GROUP1_EP_ADDR39 bit_width=14
+`define GROUP3_EP26_GEN_BIT 26 // address=0x95 bit_width=26
+`define GROUP1_EP_ADDR160_GEN_BIT_GEN_ADDR 8'ha0 // bit_width=14
+`define GROUP2_EP11 11 // address=GROUP1_EP_ADDR39 bit_width=14
+`define GROUP3_EP2_GEN_BIT 2 // address=0x62 bit_width=23
+`define GROUP1_EP_ADDR158 8'h9e // bit_width=22
+`define GROUP2_EP11 11 // address=GROUP1_EP_ADDR39 bit_width=14
+`define GROUP3_EP2_GEN_BIT 2 // address=0x62 bit_width=23
+`define GROUP1_EP_ADDR158 8'h9e // bit_width=22
+`define GROUP2_EP31_GEN_BIT_GEN_ADDR 31 // address=GROUP1_EP_ADDR250 bit_width=13
+`define GROUP3_EP2_GEN_BIT 2 // address=0x62 bit_width=23
+`define GROUP1_EP_ADDR27_GEN_ADDR 8'h1b // bit_width=4
+`define GROUP2_EP31_GEN_BIT_GEN_ADDR 31 // address=GROUP1_EP_ADDR250 bit_width=13
+`define GROUP3_EP4 4 // address=0xda bit_width=18
+`define GROUP1_EP_ADDR159 8'h9f // bit_width=32
+`define GROUP2_EP10_GEN_ADDR 10 // address=GROUP1_EP_ADDR159 bit_width=24
+`define GROUP3_EP4 4 // address=0xda bit_width=18
+`define GROUP1_EP_ADDR118_GEN_BIT 8'h76 // bit_width=26
+`define GROUP2_EP10_GEN_ADDR 10 // address=GROUP1_EP_ADDR159 bit_width=24
+`define GROUP3_EP4 4 // address=0xda bit_width=18
+`define GROUP1_EP_ADDR92 8'h5c // bit_width=8
+`define GROUP2_EP10_GEN_ADDR 10 // address=GROUP1_EP_ADDR159 bit_width=24
+`define GROUP3_EP4 4 // address=0xda bit_width=18
+`define GROUP1_EP_ADDR137_GEN_BIT_GEN_ADDR 8'h89 // bit_width=17
+`define GROUP2_EP10_GEN_ADDR 10 // address=GROUP1_EP_ADDR159 bit_width=24
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR236_GEN_BIT_GEN_ADDR 8'hec // bit_width=22
+`define GROUP2_EP15_GEN_ADDR 15 // address=GROUP1_EP_ADDR236 bit_width=4
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR98_GEN_ADDR 8'h62 // bit_width=2
+`define GROUP2_EP15_GEN_ADDR 15 // address=GROUP1_EP_ADDR236 bit_width=4
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR98_GEN_ADDR 8'h62 // bit_width=2
+`define GROUP2_EP15_GEN_ADDR 15 // address=GROUP1_EP_ADDR236 bit_width=4
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR110_GEN_ADDR 8'h6e // bit_width=15
+`define GROUP2_EP15_GEN_ADDR 15 // address=GROUP1_EP_ADDR236 bit_width=4
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR120_GEN_ADDR 8'h78 // bit_width=9
+`define GROUP2_EP32_GEN_ADDR 32 // address=GROUP1_EP_ADDR120 bit_width=31
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR107_GEN_BIT_GEN_ADDR 8'h6b // bit_width=10
+`define GROUP2_EP32_GEN_ADDR 32 // address=GROUP1_EP_ADDR120 bit_width=31
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR24_GEN_BIT_GEN_ADDR 8'h18 // bit_width=8
+`define GROUP2_EP32_GEN_ADDR 32 // address=GROUP1_EP_ADDR120 bit_width=31
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR96_GEN_BIT 8'h60 // bit_width=2
+`define GROUP2_EP32_GEN_ADDR 32 // address=GROUP1_EP_ADDR120 bit_width=31
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR34_GEN_ADDR 8'h22 // bit_width=12
+`define GROUP2_EP32_GEN_ADDR 32 // address=GROUP1_EP_ADDR120 bit_width=31
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR87_GEN_BIT 8'h57 // bit_width=29
+`define GROUP2_EP32_GEN_ADDR 32 // address=GROUP1_EP_ADDR120 bit_width=31
+`define GROUP3_EP8_GEN_BIT 8 // address=0xab bit_width=32
+`define GROUP1_EP_ADDR245_GEN_BIT 8'hf5 // bit_width=13
+`define GROUP2_EP32_GEN_ADDR 32 // address=GROUP1_EP_ADDR120 bit_width=31
+`define GROUP3_EP18 18 // address=0x43 bit_width=15
+`define GROUP1_EP_ADDR215_GEN_ADDR 8'hd7 // bit_width=4
+`define GROUP2_EP32_GEN_ADDR 32 // address=GROUP1_EP_ADDR120 bit_width=31
+`define GROUP3_EP12_GEN_ADDR 12 // address=0x29 bit_width=17
+`define GROUP1_EP_ADDR215_GEN_ADDR 8'hd7 // bit_width=4
+`define GROUP2_EP24 24 // address=GROUP1_EP_ADDR72 bit_width=5
+`define GROUP3_EP12_GEN_ADDR 12 // address=0x29 bit_width=17
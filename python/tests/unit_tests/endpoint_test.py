@@ -8,9 +8,11 @@ January 2022
 
 import pytest
 import os
+import copy
 from random import randint
 
-from pyripherals.core import Endpoint
+from pyripherals.core import Endpoint, EndpointTable, EndpointIndex, EndpointOverlay
+from pyripherals.peripherals.AD7961 import AD7961
 
 pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
 
@@ -129,3 +131,198 @@ def test_update_endpoints_from_defines(test_params):
         for read_ep in read.values():
             assert read_ep == created[i]
             i += 1
+
+
+@pytest.mark.parametrize('address, bit_index_low, bit_width, gen_bit, gen_address', test_params)
+def test_masks(address, bit_index_low, bit_width, gen_bit, gen_address):
+    ep = Endpoint(address=address, bit_index_low=bit_index_low,
+                  bit_width=bit_width, gen_bit=gen_bit, gen_address=gen_address)
+    assert ep.shift == bit_index_low
+    assert ep.field_max == 2**bit_width - 1
+    assert ep.mask == sum(1 << b for b in range(bit_index_low, bit_index_low + bit_width))
+    assert ep.span_mask == sum(1 << b for b in range(ep.bit_index_low, ep.bit_index_high + 1))
+
+    value = randint(0, ep.field_max)
+    word = ep.encode(value, word=0xffffffff)
+    assert ep.decode(word) == value
+    assert word & ~ep.mask == 0xffffffff & ~ep.mask
+    assert ep.encode(ep.field_max + 1) == 0
+
+
+def test_masks_follow_advance_endpoints():
+    eps = {'A': Endpoint(address=0x01, bit_index_low=28, bit_width=4, gen_bit=True, gen_address=False)}
+    Endpoint.advance_endpoints(eps)
+    ep = eps['A']
+    assert (ep.address, ep.bit_index_low) == (0x02, 0)
+    assert ep.mask == 0xf
+    assert ep.decode(0x1234) == 0x4
+
+
+def write_large_defines(path, num_groups=400, eps_per_group=30):
+    """Write a defines file of num_groups*(eps_per_group + 1) endpoints, half referencing their group's address."""
+
+    lines = []
+    for g in range(num_groups):
+        for e in range(eps_per_group):
+            # Reference to the address defined after it
+            address = f'G{g}_WIRE_IN_GEN_ADDR' if e % 2 else hex(0x20 + g % 0x20)
+            lines.append(f'`define G{g}_EP{e}_GEN_BIT {e} // address={address} bit_width=1')
+        lines.append(f"`define G{g}_WIRE_IN_GEN_ADDR 8'h{g % 0x20:02X} // bit_width=32")
+    with open(path, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    return len(lines)
+
+
+def test_defines_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {})
+    monkeypatch.setattr(Endpoint, 'defines_cache_dir', str(tmp_path / 'cache'))
+    path = str(tmp_path / 'ep_defines.v')
+    assert write_large_defines(path) > 10000
+
+    eps = Endpoint.update_endpoints_from_defines(ep_defines_path=path)
+    assert len(eps) == 400
+    assert eps['G7']['EP1'].address == 0x07
+    assert eps['G7']['EP2'].address == 0x27
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+
+    # Later loads do not parse
+    def fail(*args):
+        raise AssertionError('parsed with a valid cache')
+    monkeypatch.setattr(Endpoint, '_parse_defines', fail)
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {})
+    assert Endpoint.update_endpoints_from_defines(ep_defines_path=path) == eps
+
+    # Edited files are parsed again
+    write_large_defines(path, num_groups=2)
+    with pytest.raises(AssertionError):
+        Endpoint.update_endpoints_from_defines(ep_defines_path=path)
+
+
+def test_defines_error_line(tmp_path, monkeypatch):
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {})
+    monkeypatch.setattr(Endpoint, 'defines_cache_dir', None)
+    path = str(tmp_path / 'ep_defines.v')
+    with open(path, 'w') as file:
+        file.write("// header\n`define GP_A 8'h01 // bit_width=32\n`define GP_B 8'h02 // bit_width=32 addr_step=x\n")
+    with pytest.raises(ValueError, match='line 3'):
+        Endpoint.update_endpoints_from_defines(ep_defines_path=path)
+
+
+def test_find_collisions():
+    eps = {
+        'A': {
+            'WIRE': Endpoint(address=0x01, bit_index_low=None, bit_width=32, gen_bit=False, gen_address=False),
+            'LOW': Endpoint(address=0x01, bit_index_low=0, bit_width=4, gen_bit=False, gen_address=False),
+            'MID': Endpoint(address=0x01, bit_index_low=3, bit_width=2, gen_bit=False, gen_address=False),
+            'HIGH': Endpoint(address=0x01, bit_index_low=8, bit_width=1, gen_bit=False, gen_address=False),
+        },
+        'B': {
+            'WIRE': Endpoint(address=0x01, bit_index_low=None, bit_width=32, gen_bit=False, gen_address=False),
+            'NEXT': Endpoint(address=0x02, bit_index_low=3, bit_width=2, gen_bit=False, gen_address=False),
+            'TOP': Endpoint(address=0x01, bit_index_low=6, bit_width=3, gen_bit=False, gen_address=False),
+        },
+    }
+    assert Endpoint.find_collisions(eps, print_output=False) == {
+        (0x01, None, None): ['A/WIRE', 'B/WIRE'],
+        (0x01, 0, 4): ['A/LOW', 'A/MID'],
+        (0x01, 6, 8): ['B/TOP', 'A/HIGH'],
+    }
+
+
+def test_check_duplicates():
+    eps = {
+        'A': {'X': Endpoint(address=0x01, bit_index_low=2, bit_width=1, gen_bit=False, gen_address=False)},
+        'B': {'X': Endpoint(address=0x01, bit_index_low=2, bit_width=1, gen_bit=False, gen_address=False),
+              'Y': Endpoint(address=0x01, bit_index_low=2, bit_width=1, gen_bit=True, gen_address=False)},
+        'C': {'X': Endpoint(address=0x01, bit_index_low=2, bit_width=1, gen_bit=False, gen_address=False)},
+    }
+    assert Endpoint.check_duplicates(eps, print_output=False) == {'0x1[2:3]': ['A/X', 'B/X', 'C/X']}
+
+
+@pytest.mark.parametrize('test_params', [test_params])
+def test_endpoint_table(test_params):
+    eps = {f'EP{i}': Endpoint(address=address, bit_index_low=bit_index_low, bit_width=bit_width,
+                              gen_bit=gen_bit, gen_address=gen_address, addr_step=randint(1, 3))
+           for i, (address, bit_index_low, bit_width, gen_bit, gen_address) in enumerate(test_params)}
+    eps['ADDR'] = Endpoint(address=0x80, bit_index_low=None, bit_width=32, gen_bit=False, gen_address=True)
+    table = EndpointTable(eps)
+
+    advanced = copy.deepcopy(eps)
+    for k in range(70):
+        view = table.instance(k)
+        assert dict(view) == advanced
+        Endpoint.advance_endpoints(advanced)
+
+    table.advance(eps, 70)
+    assert eps == advanced
+
+
+def test_create_chips(monkeypatch):
+    eps = {
+        'PIPE_OUT': Endpoint(address=0xA1, bit_index_low=None, bit_width=32, gen_bit=False, gen_address=True),
+        'ENABLE': Endpoint(address=0x03, bit_index_low=30, bit_width=1, gen_bit=True, gen_address=False),
+    }
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {'AD7961': eps})
+    chips = AD7961.create_chips(fpga=None, number_of_chips=4)
+    assert [chip.endpoints['PIPE_OUT'].address for chip in chips] == [0xA1, 0xA2, 0xA3, 0xA4]
+    assert [(chip.endpoints['ENABLE'].address, chip.endpoints['ENABLE'].bit_index_low) for chip in chips] == \
+        [(0x03, 30), (0x03, 31), (0x04, 0), (0x04, 1)]
+    # The shared endpoints are ready for the next chip
+    assert (eps['ENABLE'].address, eps['ENABLE'].bit_index_low, eps['PIPE_OUT'].address) == (0x04, 2, 0xA5)
+    chips[0].endpoints['ENABLE'].bit_index_low = 5
+    assert chips[1].endpoints['ENABLE'].bit_index_low == 31
+
+
+def test_reverse_index(monkeypatch):
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {})
+    monkeypatch.setattr(Endpoint, 'index', EndpointIndex())
+    ep_defines_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'examples', 'ep_defines.v')
+    eps = Endpoint.update_endpoints_from_defines(ep_defines_path=ep_defines_path)
+
+    assert Endpoint.index.lookup(0xA1) == [('AD7961', 'PIPE_OUT', 0)]
+    pll = eps['AD7961']['PLL_LOCKED']
+    assert ('AD7961', 'PLL_LOCKED', 0) in Endpoint.index.lookup(pll.address, 1 << pll.bit_index_low)
+    fifo_empty = (eps['AD7961']['FIFO_EMPTY'].address, 1 << (eps['AD7961']['FIFO_EMPTY'].bit_index_low + 1))
+    assert Endpoint.index.lookup(*fifo_empty) == []
+
+    # Advancing the group indexes the new instances, including those skipped over
+    AD7961.create_chips(fpga=None, number_of_chips=3)
+    assert Endpoint.index.lookup(0xA3) == [('AD7961', 'PIPE_OUT', 2)]
+    assert Endpoint.index.lookup(*fifo_empty) == [('AD7961', 'FIFO_EMPTY', 1)]
+    # The group is ready for a fourth chip
+    assert Endpoint.index.lookup(0xA4) == [('AD7961', 'PIPE_OUT', 3)]
+    Endpoint.advance_endpoints(eps['AD7961'])
+    assert Endpoint.index.lookup(0xA5) == [('ADS8686', 'PIPE_OUT', 0), ('AD7961', 'PIPE_OUT', 4)]
+
+
+def test_get_chip_endpoints_overlay(monkeypatch):
+    eps = {
+        'PIPE_OUT': Endpoint(address=0xA1, bit_index_low=None, bit_width=32, gen_bit=False, gen_address=True),
+        'ENABLE': Endpoint(address=0x03, bit_index_low=30, bit_width=1, gen_bit=True, gen_address=False),
+    }
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {'AD7961': eps})
+    monkeypatch.setattr(Endpoint, 'index', EndpointIndex())
+    Endpoint.index.track('AD7961', eps)
+
+    view = Endpoint.get_chip_endpoints('AD7961')
+    assert isinstance(view, EndpointOverlay)
+    assert view == eps and list(view) == list(eps) and len(view) == 2
+    assert view.origin == ('AD7961', 0)
+    assert Endpoint.get_chip_endpoints('NOT_A_CHIP') is None
+
+    # Changes to the view do not reach the shared endpoints
+    Endpoint.advance_endpoints(view)
+    assert (view['ENABLE'].bit_index_low, view['PIPE_OUT'].address) == (31, 0xA2)
+    assert (eps['ENABLE'].bit_index_low, eps['PIPE_OUT'].address) == (30, 0xA1)
+
+    # Changes to the shared endpoints do not reach views made before them
+    other = Endpoint.get_chip_endpoints('AD7961')
+    Endpoint.advance_endpoints(eps, 2)
+    assert (eps['ENABLE'].address, eps['ENABLE'].bit_index_low) == (0x04, 0)
+    assert (other['ENABLE'].address, other['ENABLE'].bit_index_low) == (0x03, 30)
+    assert view['PIPE_OUT'].address == 0xA2
+
+    copied = copy.deepcopy(view)
+    copied['PIPE_OUT'].address = 0xB0
+    assert view['PIPE_OUT'].address == 0xA2
+    assert Endpoint._flatten_dict({'AD7961': view})['AD7961/PIPE_OUT'] is view['PIPE_OUT']
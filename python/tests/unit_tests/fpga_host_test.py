@@ -0,0 +1,291 @@
+"""Unit test for the host-side behavior of the FPGA class.
+
+Uses a software stand-in for ok.okCFrontPanel that counts calls, so no FPGA
+is needed.
+"""
+
+import pytest
+from collections import Counter
+import numpy as np
+from pyripherals.core import FPGA, Endpoint, BufferPool
+
+pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
+
+
+class CountingFrontPanel:
+    """Minimal okCFrontPanel stand-in that records WireIn traffic."""
+
+    NoError = 0
+
+    def __init__(self):
+        self.calls = Counter()
+        self.staged = {}
+        self.wire_ins = {}
+        self.updates = []
+        # Each UpdateTriggerOuts pops the next {address: mask} of fired TriggerOuts
+        self.trigger_out_queue = []
+        self.trigger_outs = {}
+
+    def SetWireInValue(self, address, value, mask=0xFFFFFFFF):
+        self.calls['SetWireInValue'] += 1
+        current = self.staged.get(address, self.wire_ins.get(address, 0))
+        self.staged[address] = (current & ~mask) | (value & mask)
+        return self.NoError
+
+    def UpdateWireIns(self):
+        self.calls['UpdateWireIns'] += 1
+        self.wire_ins.update(self.staged)
+        self.staged = {}
+        self.updates.append(dict(self.wire_ins))
+
+    def UpdateWireOuts(self):
+        self.calls['UpdateWireOuts'] += 1
+
+    def GetWireOutValue(self, address):
+        self.calls['GetWireOutValue'] += 1
+        return self.wire_ins.get(address - 0x20, 0)
+
+    def UpdateTriggerOuts(self):
+        self.calls['UpdateTriggerOuts'] += 1
+        self.trigger_outs = self.trigger_out_queue.pop(0) if self.trigger_out_queue else {}
+
+    def IsTriggered(self, address, mask):
+        self.calls['IsTriggered'] += 1
+        return bool(self.trigger_outs.get(address, 0) & mask)
+
+    def ActivateTriggerIn(self, address, bit):
+        self.calls['ActivateTriggerIn'] += 1
+        return self.NoError
+
+    def ReadFromPipeOut(self, address, data):
+        self.calls['ReadFromPipeOut'] += 1
+        view = memoryview(data).cast('B')
+        view[:] = bytes(i % 256 for i in range(len(view)))
+        return len(view)
+
+
+# Fixtures
+@pytest.fixture
+def fpga() -> FPGA:
+    f = FPGA(bitfile=None, endpoints={})
+    f.xem = CountingFrontPanel()
+    return f
+
+
+# Tests
+def test_writes_outside_transaction(fpga: FPGA):
+    fpga.set_wire(0x01, 0x5)
+    fpga.set_wire_bit(0x02, 3)
+    assert fpga.xem.calls['UpdateWireIns'] == 2
+    assert fpga.xem.wire_ins == {0x01: 0x5, 0x02: 0x8}
+
+
+def test_transaction_coalesces(fpga: FPGA):
+    ep = Endpoint(address=0x03, bit_index_low=4, bit_width=1, gen_bit=False, gen_address=False)
+    with fpga.transaction():
+        fpga.set_wire(0x01, 0xAB, 0xFF)
+        fpga.set_wire_bit(0x02, 0)
+        fpga.set_wire_bit(0x02, 1)
+        fpga.clear_wire_bit(0x02, 5)
+        fpga.set_endpoint(ep)
+        fpga.set_ep_simultaneous(0x04, [0, 1], [1, 0])
+        assert fpga.xem.calls['UpdateWireIns'] == 0
+    assert fpga.xem.calls['UpdateWireIns'] == 1
+    assert fpga.xem.calls['SetWireInValue'] == 4
+    assert fpga.xem.wire_ins == {0x01: 0xAB, 0x02: 0x3, 0x03: 0x30, 0x04: 0x1}
+
+
+def test_transaction_keeps_pulses(fpga: FPGA):
+    with fpga.transaction():
+        fpga.clear_wire_bit(0x11, 0)
+        fpga.set_wire_bit(0x11, 8)
+        fpga.clear_wire_bit(0x11, 8)
+    # The set of bit 8 must reach the FPGA before the clear
+    assert fpga.xem.calls['UpdateWireIns'] == 2
+    assert fpga.xem.updates == [{0x11: 0x100}, {0x11: 0x000}]
+
+
+def test_nested_transaction_and_flush(fpga: FPGA):
+    with fpga.transaction():
+        with fpga.transaction():
+            fpga.set_wire(0x01, 1)
+        assert fpga.xem.calls['UpdateWireIns'] == 0
+        fpga.set_wire(0x02, 2)
+        fpga.flush()
+        assert fpga.xem.calls['UpdateWireIns'] == 1
+        fpga.set_wire(0x03, 3)
+    assert fpga.xem.calls['UpdateWireIns'] == 2
+    assert fpga.xem.wire_ins == {0x01: 1, 0x02: 2, 0x03: 3}
+
+
+def test_transaction_flushes_before_read_and_trigger(fpga: FPGA):
+    trig = Endpoint(address=0x40, bit_index_low=0, bit_width=1, gen_bit=False, gen_address=False)
+    with fpga.transaction():
+        fpga.set_wire(0x01, 7)
+        assert fpga.read_wire(0x21) == 7
+        fpga.set_wire(0x02, 1)
+        fpga.send_trig(trig)
+        assert fpga.xem.wire_ins[0x02] == 1
+    assert fpga.xem.calls['UpdateWireIns'] == 2
+
+
+def test_wire_out_refresh_every_read_by_default(fpga: FPGA):
+    for i in range(3):
+        fpga.read_wire(0x21)
+        fpga.read_wire_bit(0x22, 0)
+    assert fpga.xem.calls['UpdateWireOuts'] == 6
+
+
+def test_wire_out_snapshot(fpga: FPGA, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('pyripherals.core.time.monotonic', lambda: now[0])
+    ep = Endpoint(address=0x23, bit_index_low=0, bit_width=32, gen_bit=False, gen_address=False)
+    fpga.wire_out_max_age = 0.5
+    for i in range(10):
+        fpga.read_wire(0x21)
+        fpga.read_wire_bit(0x22, 3)
+        fpga.read_ep(ep)
+    assert fpga.xem.calls['UpdateWireOuts'] == 1
+    assert fpga.xem.calls['GetWireOutValue'] == 30
+
+    # Stale snapshot refreshes on the next read
+    now[0] += 1
+    fpga.read_wire(0x21)
+    assert fpga.xem.calls['UpdateWireOuts'] == 2
+
+    # Explicit refresh, then reads use it
+    fpga.refresh()
+    fpga.read_wire(0x21)
+    assert fpga.xem.calls['UpdateWireOuts'] == 3
+
+    # Writes invalidate the snapshot
+    fpga.set_wire(0x01, 5)
+    assert fpga.read_wire(0x21) == 5
+    assert fpga.xem.calls['UpdateWireOuts'] == 4
+
+
+def test_read_trigs_single_update(fpga: FPGA):
+    eps = [Endpoint(address=0x60, bit_index_low=b, bit_width=1, gen_bit=False, gen_address=False) for b in (1, 5, 9)]
+    fpga.xem.trigger_out_queue = [{0x60: (1 << 1) | (1 << 9)}]
+    assert fpga.read_trigs(eps) == [True, False, True]
+    assert fpga.xem.calls['UpdateTriggerOuts'] == 1
+    # Edges are consumed by the read
+    assert fpga.read_trigs(eps, update=False) == [False, False, False]
+
+
+def test_read_trig_keeps_unread_edges(fpga: FPGA):
+    done = Endpoint(address=0x60, bit_index_low=20, bit_width=1, gen_bit=False, gen_address=False)
+    full = Endpoint(address=0x60, bit_index_low=1, bit_width=1, gen_bit=False, gen_address=False)
+    fpga.read_trigs([done, full])  # Start watching both
+    fpga.xem.trigger_out_queue = [{0x60: (1 << 20) | (1 << 1)}, {}]
+    assert fpga.read_trig(done)
+    # full fired in the same update and is still pending after another update
+    assert not fpga.read_trig(done)
+    assert fpga.read_trig(full, update=False)
+    assert not fpga.read_trig(full, update=False)
+
+
+def test_clear_trigs(fpga: FPGA):
+    done = Endpoint(address=0x60, bit_index_low=20, bit_width=1, gen_bit=False, gen_address=False)
+    fpga.read_trig(done)
+    fpga.xem.trigger_out_queue = [{0x60: 1 << 20}]
+    fpga.update_trigger_outs()
+    fpga.clear_trigs([done])
+    assert not fpga.read_trig(done, update=False)
+
+
+def test_wire_in_shadow_skips_unchanged(fpga: FPGA):
+    fpga.set_wire(0x03, 0x0, 0x7 << 3)
+    fpga.set_wire(0x03, 0x0, 0x7 << 3)
+    fpga.clear_wire_bit(0x03, 4)
+    assert fpga.xem.calls['UpdateWireIns'] == 1
+    # Bit 6 is unknown so the write is sent
+    fpga.clear_wire_bit(0x03, 6)
+    fpga.set_wire_bit(0x03, 4)
+    assert fpga.xem.calls['UpdateWireIns'] == 3
+    assert fpga.get_wire_in_shadow() == {0x03: (0x10, 0x78)}
+
+
+def test_wire_in_shadow_reset(fpga: FPGA):
+    fpga.set_wire(0x01, 0x5)
+    fpga.set_wire(0x02, 0x5)
+    fpga.reset_wire_in_shadow(0x01)
+    fpga.set_wire(0x01, 0x5)
+    fpga.set_wire(0x02, 0x5)
+    assert fpga.xem.calls['UpdateWireIns'] == 3
+    fpga.reset_wire_in_shadow()
+    assert fpga.get_wire_in_shadow() == {}
+    fpga.skip_unchanged_wire_ins = False
+    fpga.set_wire(0x02, 0x5)
+    fpga.set_wire(0x02, 0x5)
+    assert fpga.xem.calls['UpdateWireIns'] == 5
+
+
+def test_wire_in_shadow_in_transaction(fpga: FPGA):
+    fpga.set_wire(0x03, 0x0)
+    with fpga.transaction():
+        fpga.clear_wire_bit(0x03, 0)
+        fpga.clear_wire_bit(0x03, 1)
+    assert fpga.xem.calls['UpdateWireIns'] == 1
+    assert fpga.xem.calls['SetWireInValue'] == 1
+
+
+def test_read_pipe_out_into_buffer(fpga: FPGA):
+    buf = np.zeros(64, dtype=np.uint8)
+    out, e = fpga.read_pipe_out(0xA0, buf=buf)
+    assert out is buf
+    assert e == 64
+    assert np.array_equal(buf, np.arange(64))
+    view = memoryview(bytearray(32))
+    assert fpga.read_pipe_out(0xA0, buf=view)[0] is view
+
+
+def test_buffer_pool():
+    pool = BufferPool(max_free=1)
+    a = pool.get(16)
+    pool.release(a)
+    assert pool.get(16) is a
+    assert pool.get(16) is not a
+    with pool.borrow(32) as b:
+        assert len(b) == 32
+    assert pool.get(32) is b
+    pool.release(bytearray(8))
+    pool.release(bytearray(8))
+    assert len(pool._free[8]) == 1
+
+
+def test_wait_for_trigger_and_wire(fpga: FPGA):
+    done = Endpoint(address=0x60, bit_index_low=20, bit_width=1, gen_bit=False, gen_address=False)
+    fpga.xem.trigger_out_queue = [{}, {}, {0x60: 1 << 20}]
+    assert fpga.wait_for(done, timeout=1) >= 0
+    assert fpga.xem.calls['UpdateTriggerOuts'] == 3
+
+    # WireOut 0x21 reads back WireIn 0x01 in CountingFrontPanel
+    locked = Endpoint(address=0x21, bit_index_low=2, bit_width=2, gen_bit=False, gen_address=False)
+    fpga.set_wire(0x01, 0x8)
+    fpga.wait_for(locked, timeout=1)
+
+
+def test_wait_for_backoff_and_timeout(fpga: FPGA, monkeypatch):
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    def perf_counter():
+        # Each poll takes 50 us
+        now[0] += 50e-6
+        return now[0]
+
+    monkeypatch.setattr('pyripherals.core.time.sleep', sleep)
+    monkeypatch.setattr('pyripherals.core.time.perf_counter', perf_counter)
+    with pytest.raises(TimeoutError):
+        fpga.wait_for(lambda: False, timeout=0.05, spin_time=200e-6, initial_delay=10e-6, max_delay=8e-3)
+    assert sleeps[:4] == pytest.approx([10e-6, 20e-6, 40e-6, 80e-6])
+    assert max(sleeps) == pytest.approx(8e-3)
+    assert now[0] == pytest.approx(0.05, abs=1e-3)
+
+    polls = iter([False, False, True])
+    assert fpga.wait_for(lambda: next(polls), spin_time=1) == pytest.approx(150e-6)
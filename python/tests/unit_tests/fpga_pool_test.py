@@ -0,0 +1,112 @@
+"""Unit test for FPGAPool and fast start of FPGAs.
+
+Uses pyripherals.simulator with several simulated boards so no FPGA is needed.
+"""
+
+import os
+import time
+import shutil
+import pytest
+from pyripherals.core import FPGAPool, Endpoint
+from pyripherals import simulator
+import pyripherals.core
+
+pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
+
+BITFILE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'examples', 'top_level_module.bit')
+SERIALS = ['SIM00001', 'SIM00002', 'SIM00003']
+
+
+# Fixtures
+@pytest.fixture
+def sim():
+    timing = simulator.TimingModel(latencies={'ConfigureFPGA': 0.2})
+    return simulator.FrontPanelSimulator(endpoints={}, timing=timing, serials=SERIALS)
+
+
+@pytest.fixture
+def gp():
+    return {'SYSTEM_RESET': Endpoint(address=0x40, bit_index_low=1, bit_width=1, gen_bit=False, gen_address=False)}
+
+
+# Tests
+def test_list_serials(sim):
+    assert FPGAPool.list_serials(sim) == SERIALS
+
+
+def test_parallel_bring_up(sim, gp):
+    pool = FPGAPool(bitfile=BITFILE_PATH, endpoints=gp, frontpanel=sim)
+    assert len(pool) == 3
+
+    start = time.perf_counter()
+    results = pool.init_devices()
+    elapsed = time.perf_counter() - start
+    assert all(results[serial] is pool[serial] for serial in SERIALS)
+    # Three 0.2 s configurations at once
+    assert elapsed < 0.5
+    opened = [d for d in sim.devices if d.is_open]
+    assert sorted(d.serial for d in opened) == SERIALS
+    assert all(d.bitfile == BITFILE_PATH for d in opened)
+
+
+def test_messages_per_device(sim, gp, capsys):
+    pool = FPGAPool(bitfile=None, endpoints=gp, frontpanel=sim)
+    pool.init_devices()
+    out = capsys.readouterr().out
+    blocks = out.split('--- ')[1:]
+    assert [block.split(' ---')[0] for block in blocks] == SERIALS
+    assert all(f'Serial Number: {serial}' in block for serial, block in zip(SERIALS, blocks))
+
+    pool = FPGAPool(bitfile=None, endpoints=gp, frontpanel=sim)
+    pool.init_devices(quiet=True)
+    assert capsys.readouterr().out == ''
+
+
+def test_separate_endpoints_and_peripherals(sim, gp):
+    pool = FPGAPool(serials=SERIALS[:2], bitfile=None, endpoints=gp, frontpanel=sim)
+    a, b = pool
+    assert a.endpoints['SYSTEM_RESET'] is not b.endpoints['SYSTEM_RESET']
+    pool.init_devices()
+    pool.map(lambda f: f.send_trig(f.endpoints['SYSTEM_RESET']), parallel=False)
+    assert all(f.xem.trigger_in_counts[(0x40, 1)] == 1 for f in pool)
+
+
+def test_failed_device(sim, gp):
+    pool = FPGAPool(serials=['NOT_CONNECTED'], bitfile=None, endpoints=gp, frontpanel=sim)
+    assert pool.init_devices() == {'NOT_CONNECTED': False}
+
+
+def configure_count(sim):
+    return sum(d.calls['ConfigureFPGA'] for d in sim.devices)
+
+
+def test_fast_start(tmp_path, monkeypatch, gp):
+    monkeypatch.setattr(pyripherals.core, 'BITFILE_RECORD_PATH', str(tmp_path / 'loaded_bitfiles.json'))
+    bitfile = str(tmp_path / 'top_level_module.bit')
+    shutil.copy(BITFILE_PATH, bitfile)
+    gp = dict(gp, BITFILE_VERSION=Endpoint(address=0x3F, bit_index_low=0, bit_width=32, gen_bit=False,
+                                           gen_address=False))
+
+    def start(bitfile_version=2, fast_start=True, path=bitfile):
+        sim = simulator.FrontPanelSimulator(endpoints={'GP': gp}, serials=SERIALS, bitfile_version=bitfile_version)
+        pool = FPGAPool(bitfile=path, endpoints=gp, frontpanel=sim, fast_start=fast_start)
+        assert all(pool.init_devices().values())
+        return configure_count(sim)
+
+    assert start() == 3
+    # Same bitfile and BITFILE_VERSION: skip configuration
+    assert start() == 0
+    assert start(fast_start=False) == 3
+    # Board reports a different BITFILE_VERSION
+    assert start(bitfile_version=3) == 3
+    assert start(bitfile_version=3) == 0
+    # Bitfile changed on disk
+    with open(bitfile, 'ab') as file:
+        file.write(b'\x00')
+    assert start(bitfile_version=3) == 3
+    # Another bitfile with the same BITFILE_VERSION loaded without fast_start
+    other = str(tmp_path / 'other.bit')
+    shutil.copy(BITFILE_PATH, other)
+    assert start(bitfile_version=3, fast_start=False, path=other) == 3
+    assert start(bitfile_version=3) == 3
+    assert start(bitfile_version=3) == 0
@@ -0,0 +1,98 @@
+"""Unit test for the instrumentation of FPGA xem calls.
+
+Uses pyripherals.simulator so no FPGA is needed.
+"""
+
+import io
+import os
+import pytest
+from pyripherals.core import FPGA, Endpoint
+from pyripherals.peripherals.I2CController import I2CController
+from pyripherals.instrumentation import InstrumentedFrontPanel
+from pyripherals import simulator
+
+pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
+
+EP_DEFINES_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'examples', 'ep_defines.v')
+
+
+# Fixtures
+@pytest.fixture
+def endpoints(monkeypatch):
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {})
+    return Endpoint.update_endpoints_from_defines(ep_defines_path=EP_DEFINES_PATH)
+
+
+@pytest.fixture
+def fpga(endpoints) -> FPGA:
+    f = FPGA(bitfile=None, endpoints=endpoints['GP'], frontpanel=simulator.FrontPanelSimulator(endpoints=endpoints))
+    f.enable_instrumentation()
+    f.init_device()
+    f.instrumentation.reset()
+    return f
+
+
+# Tests
+def test_counts_by_method_and_address(fpga: FPGA):
+    fpga.set_wire(0x01, 0x1)
+    fpga.set_wire(0x02, 0x1)
+    fpga.read_pipe_out(0xA1, data_len=1024)
+    stats = fpga.instrumentation.as_dict()
+    assert stats['method']['SetWireInValue']['count'] == 2
+    assert stats['method']['UpdateWireIns']['count'] == 2
+    assert stats['address'][0x01]['count'] == 1
+    assert stats['address'][0xA1]['bytes'] == 1024
+    assert sum(stats['method']['ReadFromPipeOut']['histogram']) == 1
+    assert stats['caller']['FPGA.set_wire']['SetWireInValue']['count'] == 2
+    assert stats['caller']['FPGA.read_pipe_out']['ReadFromPipeOut']['count'] == 1
+
+
+def test_caller_is_outermost_peripheral_method(fpga: FPGA, endpoints):
+    fpga.xem.add_i2c_device(0x40)
+    i2c = I2CController(fpga=fpga, addr_pins=0, endpoints=endpoints['I2CDC'])
+    fpga.instrumentation.reset()
+    i2c.i2c_write_long(0x40, [0x02], 1, [0x11])
+    callers = fpga.instrumentation.as_dict()['caller']
+    assert list(callers) == ['I2CController.i2c_write_long']
+    assert callers['I2CController.i2c_write_long']['ActivateTriggerIn']['count'] > 0
+
+
+def test_report(fpga: FPGA):
+    out = io.StringIO()
+    fpga.enable_instrumentation(report_interval=0, file=out)
+    fpga.set_wire(0x01, 0x1)
+    assert 'FPGA.set_wire' in out.getvalue()
+    assert 'UpdateWireIns' in fpga.instrumentation.report()
+
+
+def test_disable(fpga: FPGA):
+    instrumentation = fpga.disable_instrumentation()
+    assert not isinstance(fpga.xem, InstrumentedFrontPanel)
+    fpga.set_wire(0x01, 0x1)
+    assert instrumentation.stats == {}
+
+
+@pytest.mark.parametrize('trace_first', [True, False])
+def test_with_trace(fpga: FPGA, tmp_path, trace_first):
+    xem = fpga.xem._xem
+    if trace_first:
+        fpga.disable_instrumentation()
+        fpga.start_trace(str(tmp_path / 'session.trace'))
+        instrumentation = fpga.enable_instrumentation()
+    else:
+        instrumentation = fpga.instrumentation
+        fpga.start_trace(str(tmp_path / 'session.trace'))
+
+    fpga.stop_trace()
+    fpga.set_wire(0x01, 0x1)
+    assert isinstance(fpga.xem, InstrumentedFrontPanel)
+    assert fpga.xem._xem is xem
+    assert instrumentation.as_dict()['method']['SetWireInValue']['count'] == 1
+
+    fpga.start_trace(str(tmp_path / 'session2.trace'))
+    fpga.disable_instrumentation()
+    fpga.set_wire(0x01, 0x2)
+    assert fpga.xem is fpga.trace
+    assert fpga.trace._xem is xem
+    fpga.stop_trace()
+    assert fpga.xem is xem
@@ -0,0 +1,54 @@
+"""Unit test for the streaming lock-in amplifier."""
+
+import pytest
+import numpy as np
+from pyripherals.lockin import LockIn
+from pyripherals.peripherals.DDR3 import DDR3
+
+pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
+
+FS = 1e6
+FREQUENCY = 20e3
+
+
+# Fixtures
+@pytest.fixture
+def ads():
+    t = np.arange(100000) / FS
+    rng = np.random.default_rng(0)
+    return {'A': 0.7 * np.cos(2 * np.pi * FREQUENCY * t + 0.3) + 0.1 * rng.standard_normal(len(t)),
+            'B': 0.2 * np.cos(2 * np.pi * FREQUENCY * t - 1.0) + 0.1 * rng.standard_normal(len(t))}
+
+
+# Tests
+def test_amplitude_and_phase(ads):
+    lockin = LockIn(FREQUENCY, FS, time_constant=1e-3)
+    times, iq = lockin.process(ads)
+    assert len(times) == len(iq['A']) == 100000 // lockin.decimation
+    assert np.abs(iq['A'][-1]) == pytest.approx(0.7, rel=0.02)
+    assert np.angle(iq['A'][-1]) == pytest.approx(0.3, abs=0.02)
+    assert np.abs(iq['B'][-1]) == pytest.approx(0.2, rel=0.05)
+    assert np.angle(iq['B'][-1]) == pytest.approx(-1.0, abs=0.05)
+
+
+def test_chunks_match_whole_record(ads):
+    times, iq = LockIn(FREQUENCY, FS, decimation=7).process(np.vstack([ads['A'], ads['B']]))
+
+    lockin = LockIn(FREQUENCY, FS, decimation=7)
+    chunks = [lockin.process(ads['A'][start:stop]) for start, stop in
+              [(0, 1), (1, 777), (777, 777), (777, 50000), (50000, 100000)]]
+    assert np.allclose(np.concatenate([c[0] for c in chunks]), times)
+    assert np.allclose(np.concatenate([c[1] for c in chunks]), iq[0])
+    assert lockin.samples == 100000
+
+    lockin.reset()
+    assert np.allclose(lockin.process(ads['A'])[1], iq[0])
+
+
+def test_from_ddr3(monkeypatch):
+    monkeypatch.setattr(DDR3, 'SAMPLE_SIZE', 1024)
+    lockin = LockIn.from_ddr3(20e3, source='AD7961')
+    assert lockin.frequency == DDR3.closest_frequency(20e3)
+    assert lockin.fs == pytest.approx(1 / DDR3.ADC_PERIOD)
+    with pytest.raises(ValueError):
+        LockIn.from_ddr3(20e3, source='DAC80508')
@@ -0,0 +1,77 @@
+"""Unit test for packing integers into bytes.
+
+The UID chip test uses pyripherals.simulator so no FPGA is needed.
+"""
+
+import os
+import pytest
+import numpy as np
+from random import getrandbits
+from pyripherals.core import FPGA, Endpoint
+from pyripherals.packing import pack_int, pack_array, unpack_array
+from pyripherals.utils import int_to_list
+from pyripherals.peripherals.UID_24AA025UID import UID_24AA025UID
+from pyripherals import simulator
+
+pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
+
+EP_DEFINES_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'examples', 'ep_defines.v')
+
+
+# Tests
+@pytest.mark.parametrize('integer, byteorder, num_bytes, expected', [
+    (0, 'little', None, [0]),
+    (0x1234, 'little', None, [0x34, 0x12]),
+    (0x1234, 'big', None, [0x12, 0x34]),
+    (0x1234, 'little', 4, [0x34, 0x12, 0, 0]),
+    (0x1234, 'big', 4, [0, 0, 0x12, 0x34]),
+    (0x1234, 'little', 1, False),
+    (0, 'little', 0, False),
+    (-1, 'little', None, False),
+])
+def test_pack_int(integer, byteorder, num_bytes, expected):
+    assert pack_int(integer, num_bytes=num_bytes, byteorder=byteorder) == expected
+    assert int_to_list(integer, byteorder=byteorder, num_bytes=num_bytes) == expected
+    if expected is not False:
+        assert pack_int(integer, num_bytes, byteorder, out='bytes') == bytes(expected)
+        assert pack_int(integer, num_bytes, byteorder, out='array').tolist() == expected
+
+
+@pytest.mark.parametrize('num_bytes', range(1, 9))
+@pytest.mark.parametrize('byteorder', ['little', 'big'])
+def test_pack_array(num_bytes, byteorder):
+    values = np.array([getrandbits(8 * num_bytes) for _ in range(100)], dtype=np.uint64)
+    expected = b''.join(int(v).to_bytes(num_bytes, byteorder) for v in values)
+    assert pack_array(values, num_bytes, byteorder) == expected
+    assert pack_array(values, num_bytes, byteorder, out='bytearray') == bytearray(expected)
+    assert pack_array(values.tolist(), num_bytes, byteorder, out='list') == list(expected)
+    assert np.array_equal(unpack_array(expected, num_bytes, byteorder), values)
+    if num_bytes < 8:
+        assert pack_array(np.append(values, 1 << (8 * num_bytes)), num_bytes, byteorder) is False
+    assert pack_array([-1], num_bytes, byteorder) is False
+
+
+def test_pack_array_does_not_share_memory():
+    values = np.arange(8, dtype='<u2')
+    packed = pack_array(values, 2, out='array')
+    packed[:] = 0xff
+    assert values.tolist() == list(range(8))
+
+
+def test_uid_write(monkeypatch):
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {})
+    endpoints = Endpoint.update_endpoints_from_defines(ep_defines_path=EP_DEFINES_PATH)
+    device = simulator.I2CDevice()
+    sim = simulator.FrontPanelSimulator(endpoints=endpoints, i2c_devices={UID_24AA025UID.ADDRESS_HEADER: device})
+    f = FPGA(bitfile=None, endpoints=endpoints['GP'], frontpanel=sim)
+    f.init_device()
+    uid = UID_24AA025UID(fpga=f, addr_pins=0, endpoints=endpoints['I2CDAQ'])
+
+    # A 40 byte image is written in 16 byte pages
+    image = pack_array(np.arange(20), 2, byteorder='big')
+    assert uid.write_bytes(image, word_address=0x10)
+    assert device.memory[0x10:0x38] == image
+    assert uid.write(0x0102030405060708090a0b0c0d0e0f1011, word_address=0x70, num_bytes=17)
+    assert device.memory[0x70:0x80] == bytes(range(0x11, 0x01, -1))
+    assert device.memory[0x00] == 0x01
+    assert uid.write(0x1234, num_bytes=1) is False
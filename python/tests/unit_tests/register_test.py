@@ -9,8 +9,12 @@ January 2022
 import pytest
 import os
 from random import randint
+import threading
 import pandas as pd
-from pyripherals.core import Register
+from pyripherals.core import Register, ChipRegisters, RegisterMap, FPGA, Endpoint
+from pyripherals.peripherals.TMF8801 import TMF8801
+from pyripherals.peripherals.DAC53401 import DAC53401
+from pyripherals import simulator
 
 pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
 
@@ -83,3 +87,143 @@ def test_str(address, default, bit_index_high, bit_index_low, bit_width):
 def test_get_chip_registers(gotten_regs, test_regs):
     for expected in test_regs:
         assert expected in gotten_regs
+
+
+def test_registers_cache(test_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(Register, 'registers_cache_dir', str(tmp_path / 'cache'))
+    monkeypatch.setattr(Register, '_workbooks', {})
+    expected = Register.get_chip_registers(sheet='CHIP1', workbook_path=test_file)
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+
+    # Later loads come from memory, then from the cache file, without reading the workbook
+    def read_excel(*args, **kwargs):
+        raise AssertionError('Workbook read again')
+    monkeypatch.setattr(pd, 'read_excel', read_excel)
+    assert Register.get_chip_registers(sheet='CHIP1', workbook_path=test_file) == expected
+    monkeypatch.setattr(Register, '_workbooks', {})
+    assert Register.get_chip_registers(sheet='CHIP1', workbook_path=test_file) == expected
+    assert len(Register.get_chip_registers(sheet='CHIP2', workbook_path=test_file)) == num_test_params // num_chips
+    with pytest.raises(ValueError):
+        Register.get_chip_registers(sheet='NOT_A_CHIP', workbook_path=test_file)
+
+
+def test_chip_registers(test_file, monkeypatch):
+    calls = []
+    get_chip_registers = Register.get_chip_registers
+
+    def counted(sheet, workbook_path):
+        calls.append(sheet)
+        return get_chip_registers(sheet, workbook_path)
+    monkeypatch.setattr(Register, 'get_chip_registers', counted)
+
+    class Chip:
+        registers = ChipRegisters('CHIP3', workbook_path=test_file)
+
+    # Nothing is read until the registers are used
+    assert calls == []
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(Chip().registers)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ['CHIP3']
+    assert all(registers is Chip.registers for registers in results)
+    assert Chip.registers == get_chip_registers(sheet='CHIP3', workbook_path=test_file)
+
+
+# Part of the DAC53401 sheet: 16-bit registers, MSB first
+dac_regs = {
+    'DEVICE_ID': Register(address=0xd0, default=0xc, bit_index_high=5, bit_index_low=2, bit_width=4),
+    'VERSION_ID': Register(address=0xd0, default=0xc, bit_index_high=1, bit_index_low=0, bit_width=2),
+    'SLEW_RATE': Register(address=0xd1, default=0x1f0, bit_index_high=8, bit_index_low=5, bit_width=4),
+    'REF_EN': Register(address=0xd1, default=0x1f0, bit_index_high=2, bit_index_low=2, bit_width=1),
+    'DAC_SPAN': Register(address=0xd1, default=0x1f0, bit_index_high=1, bit_index_low=0, bit_width=2),
+    'SW_RESET': Register(address=0xd3, default=0x8, bit_index_high=3, bit_index_low=0, bit_width=4),
+}
+# Part of the TMF8801 sheet: byte registers, wider fields LSB first
+tmf_regs = {
+    'CPU_RESET': Register(address=0xe0, default=0, bit_index_high=7, bit_index_low=7, bit_width=1),
+    'PON': Register(address=0xe0, default=0, bit_index_high=0, bit_index_low=0, bit_width=1),
+    'ID': Register(address=0xe3, default=0, bit_index_high=7, bit_index_low=0, bit_width=8),
+    'SYS_CLOCK': Register(address=0x24, default=0, bit_index_high=31, bit_index_low=0, bit_width=32),
+    'TEMPERATURE': Register(address=0x28, default=0, bit_index_high=7, bit_index_low=0, bit_width=8),
+}
+
+
+def test_register_map_pack():
+    register_map = RegisterMap(dac_regs, word_bytes=2, byte_order='big')
+    assert register_map.defaults == {0xd0: 0xc, 0xd1: 0x1f0, 0xd3: 0x8}
+    words = register_map.pack({'REF_EN': 1, 'DAC_SPAN': 0b10, 'SW_RESET': 0b1010})
+    assert words == {0xd1: 0x1f6, 0xd3: 0xa}
+    # Other fields keep their current values
+    assert register_map.pack({'SLEW_RATE': 0}, {0xd1: 0xffff}) == {0xd1: 0xfe1f}
+    assert register_map.blocks(words, max_words=1) == [(0xd1, b'\x01\xf6'), (0xd3, b'\x00\x0a')]
+    assert register_map.ranges([0xd3, 0xd0, 0xd1]) == [(0xd0, 2), (0xd3, 1)]
+
+
+def test_register_map_unpack():
+    register_map = RegisterMap(tmf_regs, word_bytes=1, byte_order='little')
+    words = register_map.pack({'SYS_CLOCK': 0x12345678, 'TEMPERATURE': 0x20})
+    assert words == {0x24: 0x78, 0x25: 0x56, 0x26: 0x34, 0x27: 0x12, 0x28: 0x20}
+    assert register_map.blocks(words) == [(0x24, bytes([0x78, 0x56, 0x34, 0x12, 0x20]))]
+    assert register_map.unpack(bytes([0x78, 0x56, 0x34, 0x12, 0x20]), 0x24) == {'SYS_CLOCK': 0x12345678,
+                                                                                 'TEMPERATURE': 0x20}
+    # Fields not entirely in the data are left out
+    assert register_map.unpack([0x56, 0x34, 0x12, 0x20], 0x25) == {'TEMPERATURE': 0x20}
+    assert register_map.decode({0xe0: 0x81, 0xe3: 0x07}) == {'CPU_RESET': 1, 'PON': 1, 'ID': 7}
+
+    # Fields are packed as 64 bit integers
+    wide = {'WIDE': Register(address=0x00, default=0, bit_index_high=71, bit_index_low=0, bit_width=72)}
+    with pytest.raises(ValueError):
+        RegisterMap(wide, word_bytes=1)
+
+
+@pytest.fixture
+def i2c_fpga(monkeypatch):
+    ep_defines_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'examples', 'ep_defines.v')
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {})
+    endpoints = Endpoint.update_endpoints_from_defines(ep_defines_path=ep_defines_path)
+    sim = simulator.FrontPanelSimulator(endpoints=endpoints)
+    f = FPGA(bitfile=None, endpoints=endpoints['GP'], frontpanel=sim)
+    f.init_device()
+    return f, endpoints
+
+
+class DAC(DAC53401):
+    registers = dac_regs
+
+
+class TMF(TMF8801):
+    registers = tmf_regs
+
+
+def test_dac53401_write_fields(i2c_fpga):
+    f, endpoints = i2c_fpga
+    dac = DAC(fpga=f, addr_pins=0, endpoints=endpoints['I2CDC'])
+    device = simulator.I2CDevice()
+    f.xem.add_i2c_device(DAC53401.ADDRESS_HEADER, device)
+    device.memory[0xd1:0xd3] = b'\x01\xf0'
+
+    dac.write_fields({'REF_EN': 1, 'DAC_SPAN': 0b11})
+    assert device.memory[0xd1:0xd3] == b'\x01\xf7'
+    dac.write(0b0101, 'SLEW_RATE')
+    assert device.memory[0xd1:0xd3] == b'\x00\xb7'
+    assert dac.read('REF_EN') == 1
+    assert dac.read_fields(['SLEW_RATE', 'DAC_SPAN']) == {'SLEW_RATE': 0b0101, 'DAC_SPAN': 0b11}
+
+
+def test_tmf8801_write_fields(i2c_fpga):
+    f, endpoints = i2c_fpga
+    tmf = TMF(fpga=f, addr_pins=0, endpoints=endpoints['I2CDC'])
+    device = simulator.I2CDevice()
+    f.xem.add_i2c_device(TMF8801.ADDRESS, device)
+    device.memory[0xe0] = 0x40
+
+    tmf.write_fields({'CPU_RESET': 1, 'PON': 1})
+    assert device.memory[0xe0] == 0xc1
+    tmf.write_fields({'SYS_CLOCK': 0x12345678, 'TEMPERATURE': 0x20})
+    assert device.memory[0x24:0x29] == bytes([0x78, 0x56, 0x34, 0x12, 0x20])
+    assert tmf.read('SYS_CLOCK') == 0x12345678
+    assert tmf.read('SYS_CLOCK', number_of_bytes=2) == 0x5678
+    assert tmf.read_fields(['PON', 'TEMPERATURE']) == {'PON': 1, 'TEMPERATURE': 0x20}
@@ -0,0 +1,125 @@
+"""Unit test for the FrontPanel simulator.
+
+Runs FPGA, I2CController, and DDR3 against pyripherals.simulator using the
+endpoints in examples/ep_defines.v.
+"""
+
+import os
+import pytest
+import numpy as np
+from pyripherals.core import FPGA, Endpoint
+from pyripherals.peripherals.I2CController import I2CController
+from pyripherals.peripherals.DDR3 import DDR3
+from pyripherals import simulator
+
+pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
+
+EP_DEFINES_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'examples', 'ep_defines.v')
+
+
+# Fixtures
+@pytest.fixture
+def endpoints(monkeypatch):
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {})
+    return Endpoint.update_endpoints_from_defines(ep_defines_path=EP_DEFINES_PATH)
+
+
+@pytest.fixture
+def sim(endpoints):
+    return simulator.FrontPanelSimulator(endpoints=endpoints, timing=simulator.TimingModel(call_latency=1e-4, bandwidth=100e6, sleep=False))
+
+
+@pytest.fixture
+def fpga(sim, endpoints) -> FPGA:
+    f = FPGA(bitfile=None, endpoints=endpoints['GP'], frontpanel=sim)
+    assert f.init_device() is f
+    return f
+
+
+# Tests
+def test_init_device(fpga: FPGA, sim):
+    assert fpga.xem is sim.devices[0]
+    assert fpga.device_info.serialNumber == 'SIM00001'
+    assert fpga.bitfile_version == 1
+    assert FPGA(bitfile='not_a_file.bit', endpoints={}, frontpanel=sim).init_device() is False
+
+
+def test_wires_and_triggers(fpga: FPGA):
+    fpga.set_wire(0x01, 0x1234)
+    assert fpga.xem.wire_ins[0x01] == 0x1234
+    fpga.xem.set_wire_out(0x21, 0xABCD)
+    assert fpga.read_wire(0x21) == 0xABCD
+
+    done = Endpoint(address=0x60, bit_index_low=7, bit_width=1, gen_bit=False, gen_address=False)
+    fpga.xem.fire_trigger_out(0x60, 7)
+    assert fpga.read_trig(done)
+    assert not fpga.read_trig(done)
+
+    fpga.send_trig(Endpoint(address=0x40, bit_index_low=3, bit_width=1, gen_bit=False, gen_address=False))
+    assert fpga.xem.trigger_in_counts[(0x40, 3)] == 1
+
+
+def test_i2c_write_read(fpga: FPGA, endpoints):
+    device = fpga.xem.add_i2c_device(0x40)
+    i2c = I2CController(fpga=fpga, addr_pins=0, endpoints=endpoints['I2CDC'])
+    assert i2c.i2c_write_long(0x40, [0x02], 3, [0x11, 0x22, 0x33])
+    assert device.memory[2:5] == bytearray([0x11, 0x22, 0x33])
+    assert i2c.i2c_read_long(0x40, [0x03], 2) == [0x22, 0x33]
+
+    # Nothing at this address, the bus reads high
+    assert i2c.i2c_read_long(0x50, [0x00], 1) == [0xff]
+
+
+def test_i2c_pipe_read(fpga: FPGA, endpoints):
+    device = fpga.xem.add_i2c_device(0xA0)
+    device.memory[0:16] = bytes(range(16))
+    i2c = I2CController(fpga=fpga, addr_pins=0, endpoints=endpoints['I2CDAQ'])
+    buf, e = i2c.i2c_read_long(0xA0, [0x00], 16, data_transfer='pipe')
+    assert e == 16
+    assert buf == bytearray(range(16))
+
+
+def test_ddr3_frames(fpga: FPGA, endpoints, monkeypatch):
+    monkeypatch.setattr(DDR3, 'SAMPLE_SIZE', 1024)
+    ddr = DDR3(fpga, endpoints=endpoints['DDR3'])
+    ddr.data_arrays[0] = np.arange(1024, dtype=np.uint16)
+    ddr.write_channels()
+    ddr.repeat_setup()
+
+    d, e = ddr.read_adc(blk_multiples=10)
+    assert e == DDR3.BLOCK_SIZE * 10
+    chan_data = ddr.deswizzle(d)
+    adc_data, timestamp, dac_data, ads, ads_seq_cnt, error = ddr.data_to_names(chan_data)
+    assert not error
+    assert np.all(np.diff(timestamp) == 5)
+    expected = simulator.default_adc_signal(1, np.arange(d.size // 16)) & 0xffff
+    assert np.array_equal(adc_data[1], expected)
+    assert np.array_equal(dac_data[0], np.arange(d.size // 32))
+
+
+def test_ddr3_read_into_buffers(fpga: FPGA, endpoints, monkeypatch):
+    monkeypatch.setattr(DDR3, 'SAMPLE_SIZE', 1024)
+    ddr = DDR3(fpga, endpoints=endpoints['DDR3'])
+    buf = fpga.buffer_pool.get(DDR3.BLOCK_SIZE * 2)
+    out = np.empty(len(buf), dtype=np.uint32)
+    d, e = ddr.read_adc(blk_multiples=2, buf=buf, out=out)
+    assert d is out
+    assert e == len(buf)
+    assert np.array_equal(out, np.frombuffer(buf, dtype=np.uint8))
+    assert ddr.read_adc_block(buf=buf)[0] is buf
+
+
+def test_timing_model(fpga: FPGA):
+    fpga.xem.sim_time = 0
+    fpga.set_wire(0x01, 0x1)
+    buf, e = fpga.read_pipe_out(0xA1, data_len=1024)
+    assert e == 1024
+    # SetWireInValue, UpdateWireIns, ReadFromPipeOut
+    assert fpga.xem.sim_time == pytest.approx(3e-4 + 1024 / 100e6)
+    assert fpga.xem.calls['ReadFromPipeOut'] == 1
+
+
+def test_invalid_endpoints(fpga: FPGA):
+    assert fpga.xem.SetWireInValue(0x40, 1) == fpga.xem.InvalidEndpoint
+    assert fpga.xem.ReadFromBlockPipeOut(0xA6, 100, bytearray(1024)) == fpga.xem.InvalidBlockSize
+    assert fpga.xem.ReadFromPipeOut(0xA1, bytearray(10)) == fpga.xem.DataAlignmentError
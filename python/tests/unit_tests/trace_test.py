@@ -0,0 +1,81 @@
+"""Unit test for recording and replaying FrontPanel call traces.
+
+Records sessions on pyripherals.simulator so no FPGA is needed.
+"""
+
+import os
+import pytest
+import numpy as np
+from pyripherals.core import FPGA, Endpoint
+from pyripherals.peripherals.I2CController import I2CController
+from pyripherals.peripherals.DDR3 import DDR3
+from pyripherals.trace import TraceReplay, TraceMismatchError, Digest, read_trace
+from pyripherals import simulator
+
+pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
+
+EP_DEFINES_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'examples', 'ep_defines.v')
+
+
+# Fixtures
+@pytest.fixture
+def endpoints(monkeypatch):
+    monkeypatch.setattr(Endpoint, 'endpoints_from_defines', {})
+    monkeypatch.setattr(DDR3, 'SAMPLE_SIZE', 1024)
+    return Endpoint.update_endpoints_from_defines(ep_defines_path=EP_DEFINES_PATH)
+
+
+def session(fpga, endpoints):
+    """Return the results of a short I2C and DDR3 session."""
+
+    fpga.init_device()
+    i2c = I2CController(fpga=fpga, addr_pins=0, endpoints=endpoints['I2CDC'])
+    i2c.i2c_write_long(0x40, [0x00], 2, [0x12, 0x34])
+    data = i2c.i2c_read_long(0x40, [0x00], 2)
+    ddr = DDR3(fpga, endpoints=endpoints['DDR3'])
+    ddr.write_channels()
+    ddr.repeat_setup()
+    d, e = ddr.read_adc(blk_multiples=4)
+    return data, d
+
+
+@pytest.fixture
+def trace_path(tmp_path, endpoints):
+    path = str(tmp_path / 'session.trace')
+    sim = simulator.FrontPanelSimulator(endpoints=endpoints, i2c_devices={0x40: simulator.I2CDevice()})
+    fpga = FPGA(bitfile=None, endpoints=endpoints['GP'], frontpanel=sim)
+    fpga.start_trace(path)
+    sim_data, sim_d = session(fpga, endpoints)
+    fpga.stop_trace()
+    return path, sim_data, sim_d
+
+
+# Tests
+def test_replay_matches_recording(trace_path, endpoints):
+    path, sim_data, sim_d = trace_path
+    fpga = FPGA(bitfile=None, endpoints=endpoints['GP'], frontpanel=TraceReplay(path))
+    data, d = session(fpga, endpoints)
+    assert data == sim_data == [0x12, 0x34]
+    assert np.array_equal(d, sim_d)
+    assert fpga.xem.index == len(fpga.xem.entries)
+
+
+def test_read_trace(trace_path):
+    path, sim_data, sim_d = trace_path
+    entries = list(read_trace(path))
+    assert entries[0].method == 'OpenBySerial'
+    reads = [e for e in entries if e.method == 'ReadFromBlockPipeOut']
+    assert len(reads) == 1
+    assert reads[0].kwargs['data'] == bytes(sim_d.astype(np.uint8))
+    # Writes only keep a digest by default
+    write = [e for e in entries if e.method == 'WriteToBlockPipeIn'][0]
+    assert isinstance(write.kwargs['data'], Digest)
+    assert write.kwargs['data'].length == 1024 * 16
+
+
+def test_replay_mismatch(trace_path, endpoints):
+    path = trace_path[0]
+    fpga = FPGA(bitfile=None, endpoints=endpoints['GP'], frontpanel=TraceReplay(path))
+    fpga.init_device()
+    with pytest.raises(TraceMismatchError):
+        fpga.read_wire(0x21)
@@ -11,7 +11,8 @@ sys.path.insert(0, os.path.abspath('../../src'))
 
 import pytest
 import numpy as np
-from pyripherals.utils import from_voltage, to_voltage
+from pyripherals.utils import (from_voltage, to_voltage, sign_extend, custom_signed_to_int, ChannelConverter,
+                               calc_impedance, calc_impedance_at)
 
 pytestmark = [pytest.mark.usable, pytest.mark.no_fpga]
 
@@ -89,3 +90,87 @@ def test_voltage_conversion():
         assert all(difference < tolerance)
     else:
         assert difference < tolerance
+
+
+@pytest.mark.parametrize('num_bits, dtype', [(8, np.int8), (12, np.int16), (16, np.int16), (18, np.int32),
+                                             (32, np.int32), (40, np.int64)])
+def test_sign_extend(num_bits, dtype):
+    data = np.random.default_rng(num_bits).integers(0, 2 ** num_bits, size=1000, dtype=np.uint64)
+    expected = [v - 2 ** num_bits if v >> (num_bits - 1) else v for v in data.tolist()]
+    result = sign_extend(data, num_bits)
+    assert result.dtype == dtype
+    assert result.tolist() == expected
+    assert custom_signed_to_int(data, num_bits).tolist() == expected
+    assert custom_signed_to_int(data, num_bits).dtype == int
+    assert [sign_extend(v, num_bits) for v in data[:10].tolist()] == expected[:10]
+
+
+def test_sign_extend_in_place():
+    data = np.array([0x3fffb, 5, 0x20000, 0x1ffff], dtype=np.uint32)
+    out = data.view(np.int32)
+    assert sign_extend(data, 18, out=out) is out
+    assert data.view(np.int32).tolist() == [-5, 5, -2 ** 17, 2 ** 17 - 1]
+    with pytest.raises(TypeError):
+        sign_extend(data, 18, out=np.empty(4, dtype=np.int16))
+
+
+@pytest.mark.parametrize('num_bits, voltage_range, signed', [(16, 5, False), (16, 10, True), (10, 3.3, False),
+                                                             (18, 5, True)])
+def test_channel_converter(num_bits, voltage_range, signed):
+    converter = ChannelConverter(num_bits=num_bits, voltage_range=voltage_range, signed=signed)
+    codes = np.arange(2 ** num_bits)
+    voltage = to_voltage(codes, num_bits=num_bits, voltage_range=voltage_range, use_twos_comp=signed)
+    assert np.allclose(converter.to_voltage(codes), voltage)
+    assert converter.to_voltage(int(codes[-1])) == pytest.approx(voltage[-1])
+    back = converter.from_voltage(voltage)
+    assert back.dtype == converter.code_dtype
+    assert np.array_equal(back, codes)
+    assert converter.from_voltage(float(voltage[5])) == 5
+
+    # Full scale and beyond clip to the limits
+    assert converter.from_voltage(voltage_range) == converter.max_code
+    lowest = 2 ** (num_bits - 1) if signed else 0
+    assert list(converter.from_voltage(np.array([100., -100.]))) == [converter.max_code, lowest]
+
+
+def test_channel_converter_calibration():
+    converter = ChannelConverter(num_bits=16, voltage_range=10, signed=True, gain=1.02, offset=-0.03,
+                                 dtype=np.float32)
+    codes = np.array([0, 1, 0x7FFF, 0x8000, 0xFFFF], dtype=np.uint16)
+    voltage = converter.to_voltage(codes)
+    assert voltage.dtype == np.float32
+    assert np.allclose(voltage, 1.02 * np.array([0, 1, 0x7FFF, -0x8000, -1]) * 10 / 2 ** 16 - 0.03)
+    assert np.array_equal(converter.from_voltage(voltage), codes)
+
+    # Results go into out
+    out = np.empty(5, dtype=np.float32)
+    assert converter.to_voltage(codes, out=out) is out
+    codes_out = np.empty(5, dtype=np.int64)
+    assert converter.from_voltage(voltage, out=codes_out) is codes_out
+    assert np.array_equal(codes_out, codes)
+
+    # Without clipping only the low bits are kept
+    converter = ChannelConverter(num_bits=10, voltage_range=5)
+    assert list(converter.from_voltage(np.array([6., -1.]), clip=False)) == [1228 & 0x3FF, -205 & 0x3FF]
+    with pytest.raises(ValueError):
+        ChannelConverter(num_bits=40, voltage_range=5)
+
+
+@pytest.mark.parametrize('n', [1000, 1001, 4097])
+def test_calc_impedance_at(n):
+    fs = 1e6
+    t = np.arange(n) / fs
+    rng = np.random.default_rng(0)
+    v_in = np.sin(2 * np.pi * 20e3 * t) + 0.01 * rng.standard_normal(n)
+    v_out = 0.3 * np.sin(2 * np.pi * 20e3 * t + 0.4) + 0.01 * rng.standard_normal(n)
+
+    freqs = [0, 20e3, 123456, fs / 2]
+    impedance, bin_freqs = calc_impedance_at(v_in, v_out, 1e4, freqs, fs, chunk_size=300)
+    x_frequencies = np.fft.rfftfreq(n, 1 / fs)
+    bins = [np.argmin(np.abs(x_frequencies - f)) for f in freqs]
+    assert np.allclose(bin_freqs, x_frequencies[bins])
+    assert np.allclose(impedance, calc_impedance(v_in, v_out, 1e4)[bins])
+
+    z, frequency = calc_impedance_at(v_in, v_out, 1e4, 20e3, fs)
+    assert z == pytest.approx(impedance[1])
+    assert frequency == bin_freqs[1]